@@ -0,0 +1,72 @@
+# wta-scraper/benchmarks/bench_concurrent_fetch.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Measures the throughput of get_individual_hike_data() against a local stub of
+# www.wta.org at several concurrency levels. Every hike costs two requests (the hike
+# page and its trip report page), so pages per second is 2 * hikes / elapsed time.
+# The DataFrame returned at each concurrency level is checked against the sequential
+# (max_workers = 1) result.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_concurrent_fetch.py [--hikes 60] [--latency 0.05]
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+from stub_server import start_stub_server
+
+
+def run(hike_urls, max_workers):
+    """Returns (elapsed seconds, DataFrame) for one get_individual_hike_data() run."""
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        hike_data = wta.get_individual_hike_data(hike_urls, max_workers = max_workers)
+    return time.perf_counter() - start, hike_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--hikes', type = int, default = 60)
+    parser.add_argument('--latency', type = float, default = 0.05,
+                        help = 'seconds of simulated network latency per request')
+    parser.add_argument('--workers', type = int, nargs = '+', default = [1, 2, 4, 8, 16, 32])
+    parser.add_argument('--rate', type = float, default = None,
+                        help = 'per-host requests per second (default: unlimited)')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(num_hikes = args.hikes, latency = args.latency)
+    hike_urls = [server.site.hike_url(hike) for hike in server.site.catalog]
+    wta.RATE_LIMITER.requests_per_second = args.rate
+
+    print('{0} hikes, {1:.0f} ms latency, rate limit: {2}'.format(
+        args.hikes, args.latency * 1000, args.rate or 'none'))
+    print('{0:>8}  {1:>10}  {2:>10}  {3:>8}  {4}'.format(
+        'workers', 'seconds', 'pages/s', 'speedup', 'same output'))
+
+    baseline = None
+    for max_workers in args.workers:
+        # Let the scheduler send as many requests to the stub as there are workers:
+        wta.RATE_LIMITER.max_concurrency = max_workers
+        wta.RATE_LIMITER.reset()
+        elapsed, hike_data = run(hike_urls, max_workers)
+        if baseline is None:
+            baseline = (elapsed, hike_data)
+        same = hike_data.reset_index(drop = True).equals(baseline[1].reset_index(drop = True))
+        print('{0:>8}  {1:>10.2f}  {2:>10.1f}  {3:>7.1f}x  {4}'.format(
+            max_workers, elapsed, 2 * len(hike_urls) / elapsed, baseline[0] / elapsed, same))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
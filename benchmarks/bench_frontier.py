@@ -0,0 +1,150 @@
+# wta-scraper/benchmarks/bench_frontier.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Measures the fetches saved by canonicalizing and deduplicating hike URLs with a
+# UrlFrontier and, by caching permanent redirects with a RedirectCache. A local stub
+# of www.wta.org links its hikes the untidy ways a real site does (see
+# start_stub_server()): some links in alias forms, some hikes listed twice and some
+# renamed hikes linked under an old slug that redirects to the new one. The same
+# catalog is scraped three ways:
+#   - raw links: every link on the hike results pages is fetched as it is, with
+#     redirects followed every time, as the scraper did before.
+#   - frontier: the links go through discover_hike_urls() and its UrlFrontier, with
+#     an empty redirect cache, as in a first run.
+#   - frontier, warm: the same again with the redirect cache saved by the first run.
+# For each, the hike URLs fetched, the requests and redirects the stub served, the
+# rows scraped and the distinct hikes among them are printed.
+#
+# Then the memory used to remember --urls hike URLs is compared, in a set and in a
+# BloomFilter sized for them.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_frontier.py [--hikes 600] [--alias-rate 0.1]
+#                                        [--overlap 3] [--renamed-rate 0.05]
+#                                        [--urls 200000]
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+from stub_server import start_stub_server
+
+
+def discover_raw_links(url):
+    """Returns every hike link on the hike results pages, as linked."""
+
+    first_page_tree = wta.get_html_tree(url)
+    hike_links = wta.extract_hike_links(first_page_tree)
+    for page_url in wta.extract_results_page_urls(first_page_tree)[1 : ]:
+        hike_links.extend(wta.extract_hike_links(wta.get_html_tree(page_url)))
+    return hike_links
+
+
+def run(server, redirect_cache):
+    """Returns (hike URLs, requests, redirects, rows, hikes, seconds) of a scrape."""
+
+    wta.SESSION = None
+    wta.METRICS.reset()
+    wta.REDIRECT_CACHE = redirect_cache
+    request_count = server.request_count
+    redirect_count = server.redirect_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if redirect_cache is None:
+            hike_urls = discover_raw_links(wta.HIKES_URL)
+        else:
+            _, hike_urls = wta.discover_hike_urls(wta.HIKES_URL)
+        hike_data = wta.get_individual_hike_data(hike_urls)
+    elapsed = time.perf_counter() - start
+    if redirect_cache is not None:
+        redirect_cache.save()
+    wta.REDIRECT_CACHE = None
+    return (len(hike_urls), server.request_count - request_count,
+            server.redirect_count - redirect_count, len(hike_data),
+            hike_data['TITLE'].nunique(), elapsed)
+
+
+def set_nbytes(urls):
+    """Returns the bytes of a set of URLs, counting the strings it holds."""
+
+    seen = set(urls)
+    return sys.getsizeof(seen) + sum(sys.getsizeof(url) for url in seen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--hikes', type = int, default = 600)
+    parser.add_argument('--alias-rate', type = float, default = 0.1,
+                        help = 'share of hike links given in an alias form')
+    parser.add_argument('--overlap', type = int, default = 3,
+                        help = 'hikes listed again at the top of the next results page')
+    parser.add_argument('--renamed-rate', type = float, default = 0.05,
+                        help = 'share of hikes linked under an old, redirected slug')
+    parser.add_argument('--urls', type = int, default = 200000,
+                        help = 'hike URLs remembered in the memory comparison')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(num_hikes = args.hikes, page_size = 2000,
+                                         alias_rate = args.alias_rate, overlap = args.overlap,
+                                         renamed_rate = args.renamed_rate)
+    wta.HIKES_URL = base_url + '/go-outside/hikes'
+    wta.RATE_LIMITER.requests_per_second = None
+    print('{0} hikes, {1:.0%} alias links, {2} hikes listed twice per page, '
+          '{3:.0%} renamed'.format(args.hikes, args.alias_rate, args.overlap,
+                                   args.renamed_rate))
+
+    print('\n{0:<16}  {1:>9}  {2:>8}  {3:>9}  {4:>6}  {5:>6}  {6:>7}'.format(
+        'mode', 'hike URLs', 'requests', 'redirects', 'rows', 'hikes', 'seconds'))
+    with tempfile.TemporaryDirectory() as folder:
+        redirect_path = os.path.join(folder, 'wta_redirects.json')
+        baseline = None
+        for label, redirect_cache in [('raw links', None),
+                                      ('frontier', wta.RedirectCache(redirect_path)),
+                                      ('frontier, warm', 'warm')]:
+            if redirect_cache == 'warm':
+                redirect_cache = wta.RedirectCache(redirect_path)
+            result = run(server, redirect_cache)
+            baseline = baseline or result
+            print('{0:<16}  {1:>9}  {2:>8}  {3:>9}  {4:>6}  {5:>6}  {6:>7.2f}'.format(
+                label, *result))
+            if result is not baseline:
+                print('{0:<16}  {1:>9}  {2:>8}  {3:>9}'.format(
+                    '  avoided', baseline[0] - result[0], baseline[1] - result[1],
+                    baseline[2] - result[2]))
+    server.shutdown()
+
+    urls = ['https://www.wta.org/go-hiking/hikes/hike-{0:07d}'.format(number)
+            for number in range(args.urls)]
+    bloom_filter = wta.BloomFilter(args.urls)
+    start = time.perf_counter()
+    for url in urls:
+        bloom_filter.add(url)
+    bloom_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    seen = set()
+    for url in urls:
+        seen.add(url)
+    set_seconds = time.perf_counter() - start
+    false_duplicates = sum(url + '-new' in bloom_filter for url in urls)
+
+    print('\n{0} URLs remembered   {1:>10}  {2:>11}  {3:>9}'.format(
+        args.urls, 'KB', 'bytes / URL', 'us / add'))
+    for label, size, seconds in [('set', set_nbytes(urls), set_seconds),
+                                 ('BloomFilter', bloom_filter.nbytes, bloom_seconds)]:
+        print('{0:<22}  {1:>10.1f}  {2:>11.1f}  {3:>9.2f}'.format(
+            label, size / 1000, size / args.urls, seconds / args.urls * 1e6))
+    print('BloomFilter false duplicates: {0} of {1} new URLs ({2:.1e}, {3} hashes)'.format(
+        false_duplicates, args.urls, false_duplicates / args.urls, bloom_filter.hash_count))
+
+
+if __name__ == '__main__':
+    main()
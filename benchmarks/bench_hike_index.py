@@ -0,0 +1,132 @@
+# wta-scraper/benchmarks/bench_hike_index.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Compares HikeIndex lookups with the brute-force pandas approach, which measures the
+# haversine distance to every hike and filters every row, for two kinds of queries:
+#   - nearby: hikes within --radius km of a random point with under --max-gain feet
+#     of gain.
+#   - filter: hikes with under --max-gain feet of gain and a rating of at least
+#     --min-rating.
+# The hike data is read from a CSV snapshot (by default the most recent one in
+# Results) and, with --scale, copied that many times with jittered coordinates to
+# measure a larger catalog. Both approaches must return the same hikes.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_hike_index.py [--snapshot PATH] [--scale 10] [--queries 200]
+#*************************************************************************************
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Results')
+
+
+def load_hike_data(snapshot_path, scale, seed = 0):
+    """Returns typed hike data, copied scale times with jittered coordinates."""
+
+    hike_data = wta.apply_hike_data_schema(pd.read_csv(snapshot_path, dtype = str))
+    rand = np.random.default_rng(seed)
+    copies = [hike_data]
+    for copy_number in range(1, scale):
+        copy = hike_data.copy()
+        copy['LATITUDE'] += rand.normal(0, 0.2, len(copy))
+        copy['LONGITUDE'] += rand.normal(0, 0.2, len(copy))
+        copy['URL'] = copy['URL'] + '#' + str(copy_number)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index = True)
+
+
+def brute_force_nearby(hike_data, latitude, longitude, radius_km, max_gain):
+    """Returns the positions of the matching hikes, nearest first, with pandas."""
+
+    distances = wta.haversine_km(np.radians(latitude), np.radians(longitude),
+                                 np.radians(hike_data['LATITUDE']),
+                                 np.radians(hike_data['LONGITUDE']))
+    valid = (hike_data['LATITUDE'].abs() <= 90) & (hike_data['LONGITUDE'].abs() <= 180)
+    matches = hike_data[valid & (distances <= radius_km) & (hike_data['GAIN'] <= max_gain)]
+    return matches.assign(DISTANCE_KM = distances[matches.index]).sort_values(
+        'DISTANCE_KM', kind = 'stable')
+
+
+def brute_force_filter(hike_data, max_gain, min_rating):
+    """Returns the matching hikes, in row order, with pandas."""
+
+    return hike_data[(hike_data['GAIN'] <= max_gain) & (hike_data['RATING'] >= min_rating)]
+
+
+def time_queries(function, queries):
+    """Returns (microseconds per query, results) for a list of argument tuples."""
+
+    start = time.perf_counter()
+    results = [function(*query) for query in queries]
+    return (time.perf_counter() - start) / len(queries) * 1e6, results
+
+
+def main():
+    snapshots = sorted(glob.glob(os.path.join(RESULTS_PATH, '*_wta_hike_data.csv')))
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--snapshot', default = snapshots[-1] if snapshots else None)
+    parser.add_argument('--scale', type = int, default = 1,
+                        help = 'copies of the snapshot to index (default: 1)')
+    parser.add_argument('--queries', type = int, default = 200)
+    parser.add_argument('--radius', type = float, default = 30, help = 'kilometers')
+    parser.add_argument('--max-gain', type = float, default = 1000, help = 'feet')
+    parser.add_argument('--min-rating', type = float, default = 4)
+    args = parser.parse_args()
+
+    hike_data = load_hike_data(args.snapshot, args.scale)
+    start = time.perf_counter()
+    index = wta.HikeIndex(hike_data)
+    build_ms = (time.perf_counter() - start) * 1000
+    print('{0} hikes from {1}, index built in {2:.1f} ms'.format(
+        len(hike_data), os.path.basename(args.snapshot), build_ms))
+
+    # Random points across Washington:
+    rand = np.random.default_rng(1)
+    points = list(zip(rand.uniform(45.6, 49.0, args.queries),
+                      rand.uniform(-124.5, -117.0, args.queries)))
+
+    print('{0:<32}  {1:>12}  {2:>12}  {3:>8}  {4}'.format(
+        'query', 'pandas us', 'index us', 'speedup', 'same hikes'))
+
+    nearby_queries = [(latitude, longitude, args.radius, args.max_gain) for latitude, longitude in points]
+    old_us, old_results = time_queries(lambda *query: brute_force_nearby(hike_data, *query),
+                                       nearby_queries)
+    new_us, new_results = time_queries(
+        lambda latitude, longitude, radius, max_gain: index.nearby(
+            latitude, longitude, radius, gain = (None, max_gain)), nearby_queries)
+    positions_us, _ = time_queries(
+        lambda latitude, longitude, radius, max_gain: index.nearby_positions(
+            latitude, longitude, radius, gain = (None, max_gain)), nearby_queries)
+    same = all(list(old['URL']) == list(new['URL']) for old, new in zip(old_results, new_results))
+    label = 'nearby {0:g} km, gain <= {1:g}'.format(args.radius, args.max_gain)
+    print('{0:<32}  {1:>12.1f}  {2:>12.1f}  {3:>7.1f}x  {4}'.format(
+        label, old_us, new_us, old_us / new_us, same))
+    print('{0:<32}  {1:>12}  {2:>12.1f}  {3:>7.1f}x'.format(
+        '  (row positions only)', '', positions_us, old_us / positions_us))
+
+    filter_queries = [(args.max_gain, args.min_rating)] * args.queries
+    old_us, old_results = time_queries(lambda *query: brute_force_filter(hike_data, *query),
+                                       filter_queries)
+    new_us, new_results = time_queries(
+        lambda max_gain, min_rating: index.filter(gain = (None, max_gain),
+                                                  rating = (min_rating, None)), filter_queries)
+    same = list(old_results[0]['URL']) == list(new_results[0]['URL'])
+    label = 'filter gain <= {0:g}, rating >= {1:g}'.format(args.max_gain, args.min_rating)
+    print('{0:<32}  {1:>12.1f}  {2:>12.1f}  {3:>7.1f}x  {4}'.format(
+        label, old_us, new_us, old_us / new_us, same))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+# wta-scraper/benchmarks/bench_hike_table.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Compares the memory used to hold a snapshot as a pandas DataFrame with a HikeTable.
+# The hike data is read from a CSV snapshot (by default the most recent one in
+# Results) and, with --scale, copied that many times to measure a larger catalog.
+#
+# First, the in-process size of one copy is printed: the DataFrame of text values
+# that get_individual_hike_data() returns, the typed DataFrame of
+# apply_hike_data_schema() and, the HikeTable, along with a check that the
+# HikeTable decodes back to the same typed hike data.
+#
+# Then --processes worker processes each load the snapshot at the same time, the way
+# the workers of a service would, and every byte of it is read. The memory each
+# worker adds is measured as its proportional set size (Pss, from
+# /proc/self/smaps_rollup), which splits pages shared by several processes between
+# them: a memory-mapped HikeTable is one copy in the page cache, shared by every
+# worker. The modes compared are:
+#   - dataframe: pd.read_csv() and apply_hike_data_schema() in each worker.
+#   - table: HikeTable.load() with its arrays read into each worker's memory.
+#   - table mmap: HikeTable.load() with its arrays memory-mapped.
+# The shared memory measurement needs Linux. Memory a worker had already freed is
+# reused before it grows, which hides small snapshots, hence the default --scale.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_hike_table.py [--snapshot PATH] [--scale 20]
+#                                          [--processes 4]
+#*************************************************************************************
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Results')
+SMAPS_PATH = '/proc/self/smaps_rollup'
+MODES = ['dataframe', 'table', 'table mmap']
+
+
+def load_hike_data(snapshot_path, scale):
+    """Returns the text hike data of a snapshot, copied scale times with distinct
+    URLs."""
+
+    hike_data = pd.read_csv(snapshot_path, dtype = str)
+    copies = [hike_data]
+    for copy_number in range(1, scale):
+        copy = hike_data.copy()
+        copy['URL'] = copy['URL'] + '-' + str(copy_number)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index = True)
+
+
+def same_hike_data(actual, expected):
+    """Returns whether two typed DataFrames hold the same values."""
+
+    try:
+        pd.testing.assert_frame_equal(actual, expected, check_dtype = False)
+    except AssertionError:
+        return False
+    return True
+
+
+def read_pss():
+    """Returns the proportional set size of this process, in bytes."""
+
+    with open(SMAPS_PATH) as smaps_file:
+        for line in smaps_file:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def load_in_worker(mode, csv_path, table_path, barrier, results):
+    """Loads the snapshot in a worker process and, reports the memory it added and
+    the seconds it took."""
+
+    # Importing pandas and NumPy before measuring, so only the snapshot is counted:
+    wta.pd.DataFrame, wta.np.ndarray
+    before = read_pss()
+    start = time.perf_counter()
+    if mode == 'dataframe':
+        snapshot = wta.apply_hike_data_schema(pd.read_csv(csv_path, dtype = str))
+    else:
+        snapshot = wta.HikeTable.load(table_path, mmap_mode = 'r' if mode == 'table mmap' else None)
+        # Reading every byte of the table, as queries over all of it would:
+        for array in snapshot.arrays.values():
+            np.add.reduce(array.view('uint8'), dtype = 'uint64')
+    elapsed = time.perf_counter() - start
+
+    barrier.wait()
+    results.put((read_pss() - before, elapsed))
+    # Staying alive until every worker has measured, so shared pages stay shared:
+    barrier.wait()
+    del snapshot
+
+
+def measure_workers(mode, csv_path, table_path, processes):
+    """Returns the (total bytes, mean seconds) of processes workers loading the
+    snapshot at once."""
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [context.Process(target = load_in_worker,
+                               args = (mode, csv_path, table_path, barrier, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    measurements = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return (sum(size for size, _ in measurements),
+            sum(seconds for _, seconds in measurements) / processes)
+
+
+def main():
+    snapshots = sorted(glob.glob(os.path.join(RESULTS_PATH, '*_wta_hike_data.csv')))
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--snapshot', default = snapshots[-1] if snapshots else None)
+    parser.add_argument('--scale', type = int, default = 20,
+                        help = 'copies of the snapshot, to measure a larger catalog')
+    parser.add_argument('--processes', type = int, default = 4,
+                        help = 'worker processes loading the snapshot at once')
+    args = parser.parse_args()
+
+    hike_data = load_hike_data(args.snapshot, args.scale)
+    typed_data = wta.apply_hike_data_schema(hike_data)
+    table = wta.HikeTable(hike_data)
+    print('{0} hikes from {1}'.format(len(hike_data), os.path.basename(args.snapshot)))
+
+    print('\n{0:<22}  {1:>10}  {2:>9}'.format('in process', 'KB', 'vs text'))
+    text_bytes = hike_data.memory_usage(deep = True).sum()
+    for label, size in [('DataFrame, text', text_bytes),
+                        ('DataFrame, typed', typed_data.memory_usage(deep = True).sum()),
+                        ('HikeTable', table.nbytes)]:
+        print('{0:<22}  {1:>10.1f}  {2:>8.1f}x'.format(label, size / 1000, text_bytes / size))
+    print('Same typed hike data: {0}'.format(same_hike_data(table.to_dataframe(), typed_data)))
+
+    if not os.path.exists(SMAPS_PATH):
+        print('\n{0} is not available, skipping the shared memory measurement'.format(SMAPS_PATH))
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, 'hike_data.csv')
+        hike_data.to_csv(csv_path, index = False)
+        table_path = table.save(os.path.join(folder, 'hike_table'))
+
+        print('\n{0} workers{1:<12}  {2:>10}  {3:>12}  {4:>9}'.format(
+            args.processes, '', 'total KB', 'KB / worker', 'load ms'))
+        for mode in MODES:
+            total, seconds = measure_workers(mode, csv_path, table_path, args.processes)
+            print('{0:<22}  {1:>10.1f}  {2:>12.1f}  {3:>9.2f}'.format(
+                mode, total / 1000, total / args.processes / 1000, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# wta-scraper/benchmarks/bench_import.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Measures the start-up cost of the scraper with 'python -X importtime'. Each case
+# runs in a fresh interpreter, --repeat times, and the median is printed:
+#
+#   - lazy: 'import wta_scraper.scraper', where pandas, numpy, Requests and lxml are
+#     imported on first use (see LazyModule).
+#   - eager: the same import followed by every package the scraper used to import
+#     at start-up, which is what 'import WTA_Hike_Scraper' cost before.
+#   - the 'wta-scraper --help' and 'wta-scraper stats' commands, end to end.
+#
+# For the imports, the cumulative import time reported by -X importtime is printed
+# along with the three slowest top-level packages. The commands are timed from
+# process start to exit.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_import.py [--repeat 5]
+#*************************************************************************************
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_PACKAGES = ['numpy', 'pandas', 'requests', 'requests.adapters', 'urllib3',
+                  'urllib3.util.retry', 'lxml.etree', 'lxml.html', 'bs4']
+IMPORT_CASES = [('lazy', 'import wta_scraper.scraper'),
+                ('eager', 'import wta_scraper.scraper; ' + '; '.join(
+                    'import ' + package for package in EAGER_PACKAGES))]
+COMMAND_CASES = [('--help', ['--help']), ('stats', ['stats'])]
+
+
+def import_times(code):
+    """Returns the cumulative import time of every top-level import, in
+    milliseconds, from 'python -X importtime -c code'."""
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd = ROOT_PATH,
+                            capture_output = True, text = True, check = True)
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S.*)$', line)
+        if match is not None and not match.group(2).startswith(' '):
+            times[match.group(2)] = times.get(match.group(2), 0) + int(match.group(1)) / 1000
+    return times
+
+
+def command_seconds(arguments, results_path):
+    """Returns the seconds 'python -m wta_scraper arguments' takes, start to exit."""
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-m', 'wta_scraper', '--results-path', results_path]
+                   + arguments, cwd = ROOT_PATH, stdout = subprocess.DEVNULL, check = True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--repeat', type = int, default = 5)
+    args = parser.parse_args()
+
+    print('{0:<8}  {1:>9}  {2}'.format('import', 'ms', 'slowest packages (ms)'))
+    for label, code in IMPORT_CASES:
+        runs = [import_times(code) for _ in range(args.repeat)]
+        total = statistics.median(sum(value for name, value in times.items() if name != 'site')
+                                  for times in runs)
+        slowest = sorted((item for item in runs[-1].items() if item[0] != 'site'),
+                         key = lambda item: -item[1])[ : 3]
+        print('{0:<8}  {1:>9.1f}  {2}'.format(label, total, ', '.join(
+            '{0} {1:.0f}'.format(name, value) for name, value in slowest)))
+
+    print('\n{0:<8}  {1:>9}'.format('command', 'ms'))
+    with tempfile.TemporaryDirectory() as results_path:
+        for label, arguments in COMMAND_CASES:
+            seconds = statistics.median(command_seconds(arguments, results_path)
+                                        for _ in range(args.repeat))
+            print('{0:<8}  {1:>9.1f}'.format(label, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
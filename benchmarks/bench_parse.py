@@ -0,0 +1,167 @@
+# wta-scraper/benchmarks/bench_parse.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Compares the CPU time and memory needed to parse saved HTML fixtures with the
+# original extraction path (BeautifulSoup + html5lib, prettify(), splitlines() and a
+# line-by-line scan with fixed line offsets) against the single-pass lxml extractors
+# in wta_scraper/scraper.py. Both paths must extract the same data fields; the new
+# extractors keep raw text, so their fields are compared once converted by
+# normalize_hike_data(). Memory is the peak Python heap allocation reported by
+# tracemalloc while parsing one page.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_parse.py [--repeat 20]
+#*************************************************************************************
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+import WTA_Hike_Scraper as wta
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def legacy_rows(content):
+    """The original get_html_rows() parsing: html5lib, prettify() and splitlines()."""
+
+    return BeautifulSoup(content, 'html5lib').prettify().splitlines()
+
+
+def legacy_hike_fields(content):
+    """The original line-offset scan of a hike page."""
+
+    rows = legacy_rows(content)
+    fields = dict.fromkeys(wta.HIKE_PAGE_COLUMNS)
+    for itr, row in enumerate(rows):
+        if '"documentFirstHeading"' in row:
+            fields['TITLE'] = rows[itr + 1].lstrip()
+        if '"hike-region"' in row:
+            fields['REGION'] = rows[itr + 3].lstrip()
+        if '"distance"' in row:
+            distance = rows[itr + 2].lstrip()
+            fields['DISTANCE'] = float(distance[ : distance.find(' mile')])
+            if ',' in distance:
+                fields['DIST_TYPE'] = distance[distance.find(', ') + 2 : ]
+            elif 'of trails' in distance:
+                fields['DIST_TYPE'] = distance[distance.find('of trails') + 3 : ]
+            else:
+                fields['DISTANCE'] = 'ERROR'
+        if 'Gain:' in row:
+            fields['GAIN'] = float(rows[itr + 2].lstrip())
+        if 'Highest Point:' in row:
+            fields['HIGHEST'] = float(rows[itr + 2].lstrip())
+        if '"current-rating"' in row:
+            rating = rows[itr + 1].lstrip()
+            fields['RATING'] = float(rating[ : rating.find(' out of')])
+        if '"rating-count"' in row:
+            count = rows[itr + 1].lstrip()
+            fields['RATING_COUNT'] = int(count[count.find('(') + 1 : count.find(' vote')])
+        if '<script type="application/ld+json">' in row:
+            try:
+                hike_json = json.loads(rows[itr + 1].lstrip())
+                fields['LATITUDE'] = hike_json['geo']['latitude']
+                fields['LONGITUDE'] = hike_json['geo']['longitude']
+            except (ValueError, KeyError):
+                pass
+    return fields
+
+
+def legacy_report_fields(content):
+    """The original line-offset scan of a trip report page."""
+
+    rows = legacy_rows(content)
+    fields = dict.fromkeys(wta.REPORT_PAGE_COLUMNS)
+    report_dates = []
+    for itr, row in enumerate(rows):
+        if '"count-data"' in row:
+            fields['REPORT_COUNT'] = int(rows[itr + 1].lstrip())
+        if '"elapsed-time"' in row:
+            report_dates.append(datetime.strptime(
+                row[row.find('title="') + 7 : row.find('">')], '%b %d, %Y'))
+    if report_dates:
+        fields['REPORT_DATE'] = report_dates[0]
+    return fields
+
+
+def legacy_hike_links(content):
+    """The original line scan of a hike results page."""
+
+    return [row[row.find('https') : row.find('" title=')]
+            for row in legacy_rows(content) if 'listitem-title' in row]
+
+
+def typed_fields(fields):
+    """Returns extracted data fields converted to column types by
+    normalize_hike_data(), with missing values as None."""
+
+    if not isinstance(fields, dict):
+        return fields
+    row = wta.normalize_hike_data(pd.DataFrame([fields]).reindex(
+        columns = wta.HIKE_DATA_COLUMNS))[0][list(fields)]
+    return row.astype(object).where(row.notna(), None).iloc[0].to_dict()
+
+
+def new_hike_fields(content):
+    return wta.extract_hike_fields(wta.parse_html(content))
+
+
+def new_report_fields(content):
+    return wta.extract_report_fields(wta.parse_html(content))
+
+
+def new_hike_links(content):
+    return wta.extract_hike_links(wta.parse_html(content))
+
+
+FIXTURES = [
+    ('hike_page.html', legacy_hike_fields, new_hike_fields),
+    ('trip_report_page.html', legacy_report_fields, new_report_fields),
+    ('hike_results_page.html', legacy_hike_links, new_hike_links),
+]
+
+
+def measure(function, content, repeat):
+    """Returns (milliseconds per page, peak KiB allocated) for one parse path."""
+
+    seconds = min(timeit.repeat(lambda: function(content), number = 1, repeat = repeat))
+    tracemalloc.start()
+    function(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--repeat', type = int, default = 20)
+    args = parser.parse_args()
+
+    print('{0:<24}  {1:>8}  {2:>12}  {3:>12}  {4:>12}  {5:>12}  {6:>8}  {7}'.format(
+        'fixture', 'KiB', 'old ms/page', 'new ms/page', 'old peak KiB', 'new peak KiB',
+        'speedup', 'same fields'))
+
+    for file_name, legacy, new in FIXTURES:
+        with open(os.path.join(FIXTURES_PATH, file_name), 'rb') as fixture:
+            content = fixture.read()
+
+        same = typed_fields(legacy(content)) == typed_fields(new(content))
+        old_ms, old_peak = measure(legacy, content, args.repeat)
+        new_ms, new_peak = measure(new, content, args.repeat)
+        print('{0:<24}  {1:>8.1f}  {2:>12.2f}  {3:>12.2f}  {4:>12.0f}  {5:>12.0f}  {6:>7.1f}x  {7}'.format(
+            file_name, len(content) / 1024, old_ms, new_ms, old_peak, new_peak,
+            old_ms / new_ms, same))
+
+
+if __name__ == '__main__':
+    main()
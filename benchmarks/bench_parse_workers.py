@@ -0,0 +1,77 @@
+# wta-scraper/benchmarks/bench_parse_workers.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Measures how hike throughput scales with the number of parse worker processes
+# (PARSE_WORKERS) against a local stub of www.wta.org with no network latency and
+# large pages, so that parsing, not fetching, is the bottleneck. 0 workers parses
+# pages in the fetching threads, under the GIL. The hike data produced with each
+# number of workers and chunk size is checked against the 0-worker result. Throughput
+# can only scale up to the number of CPU cores available.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_parse_workers.py [--hikes 200] [--page-size 100000]
+#                                             [--workers 0 1 2 4] [--chunk-sizes 16]
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+from stub_server import start_stub_server
+
+
+def run(hike_urls, parse_workers, chunk_size):
+    """Returns (elapsed seconds, DataFrame) for one run of hike records."""
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        hike_records = wta.iter_hike_records(hike_urls, parse_workers = parse_workers,
+                                             chunk_size = chunk_size)
+        hike_data = wta.pd.DataFrame([hike_record.as_dict() for hike_record in hike_records],
+                                     columns = wta.HIKE_DATA_COLUMNS)
+    return time.perf_counter() - start, hike_data
+
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    default_workers = [n for n in (0, 1, 2, 4, 8, 16, 32) if n <= max(1, cpu_count)]
+
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--hikes', type = int, default = 200)
+    parser.add_argument('--page-size', type = int, default = 100000,
+                        help = 'bytes of filler markup on each hike page')
+    parser.add_argument('--workers', type = int, nargs = '+', default = default_workers)
+    parser.add_argument('--chunk-sizes', type = int, nargs = '+', default = [16])
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(num_hikes = args.hikes, page_size = args.page_size)
+    hike_urls = [server.site.hike_url(hike) for hike in server.site.catalog]
+    wta.RATE_LIMITER.requests_per_second = None
+
+    print('{0} hikes, {1} KiB pages, {2} CPU cores'.format(
+        args.hikes, args.page_size // 1024, cpu_count))
+    print('{0:>8}  {1:>6}  {2:>10}  {3:>10}  {4:>8}  {5}'.format(
+        'workers', 'chunk', 'seconds', 'hikes/s', 'speedup', 'same output'))
+
+    baseline = None
+    for parse_workers in args.workers:
+        for chunk_size in (args.chunk_sizes if parse_workers else [None]):
+            elapsed, hike_data = run(hike_urls, parse_workers, chunk_size or wta.PARSE_CHUNK_SIZE)
+            if baseline is None:
+                baseline = (elapsed, hike_data)
+            print('{0:>8}  {1:>6}  {2:>10.2f}  {3:>10.1f}  {4:>7.1f}x  {5}'.format(
+                parse_workers, chunk_size or '-', elapsed, len(hike_urls) / elapsed,
+                baseline[0] / elapsed, hike_data.equals(baseline[1])))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# wta-scraper/benchmarks/bench_report_modes.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Compares the number of requests and the run time of a full run against a local stub
+# of www.wta.org for each way of gathering trip report data:
+#   - per-hike: one '@@related_tripreport_listing' request per hike.
+#   - bulk: a walk of the whole site-wide trip report listing (first run).
+#   - bulk since: a walk of the listing back to the date of a previous snapshot.
+#   - skip: no trip report data.
+# The trip report counts and dates of the bulk runs are checked against the
+# per-hike run.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_report_modes.py [--hikes 300] [--latency 0.02] [--rate 50]
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import WTA_Hike_Scraper as wta
+from stub_server import start_stub_server
+
+
+def run(server, results_path, report_mode):
+    """Returns (requests sent, elapsed seconds, snapshot DataFrame) for one run."""
+
+    wta.set_results_path(results_path)
+    request_count = server.request_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        wta.main(report_mode = report_mode)
+    elapsed = time.perf_counter() - start
+    hike_data = pd.read_csv(wta.snapshot_file_path(wta.DATE, 'csv'))
+    return server.request_count - request_count, elapsed, hike_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--hikes', type = int, default = 300)
+    parser.add_argument('--latency', type = float, default = 0.02,
+                        help = 'seconds of simulated network latency per request')
+    parser.add_argument('--rate', type = float, default = None,
+                        help = 'per-host requests per second (default: unlimited)')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(num_hikes = args.hikes, latency = args.latency)
+    wta.HIKES_URL = base_url + '/go-outside/hikes'
+    wta.TRIP_REPORTS_URL = base_url + '/go-hiking/trip-reports'
+    wta.RATE_LIMITER.requests_per_second = args.rate
+
+    print('{0} hikes, {1:.0f} ms latency, rate limit: {2}'.format(
+        args.hikes, args.latency * 1000, args.rate or 'none'))
+    print('{0:<12}  {1:>9}  {2:>9}  {3:>9}  {4}'.format(
+        'mode', 'requests', 'seconds', 'speedup', 'same report data'))
+
+    report_columns = ['URL', 'REPORT_COUNT', 'REPORT_DATE']
+    results_paths = []
+    baseline = None
+    for label, report_mode in [('per-hike', 'per-hike'), ('bulk', 'bulk'),
+                               ('bulk since', 'bulk'), ('skip', 'skip')]:
+        results_path = tempfile.mkdtemp()
+        results_paths.append(results_path)
+        if label == 'bulk since':
+            # Seeding the run with the per-hike snapshot, dated the day of the newest
+            # trip report on the stub:
+            shutil.copy(os.path.join(results_paths[0], '{0}_wta_hike_data.csv'.format(wta.DATE)),
+                        os.path.join(results_path, '2021-04-25_wta_hike_data.csv'))
+
+        request_count, elapsed, hike_data = run(server, results_path, report_mode)
+        if baseline is None:
+            baseline = (elapsed, hike_data)
+        same = ('-' if report_mode == 'skip'
+                else hike_data[report_columns].equals(baseline[1][report_columns]))
+        print('{0:<12}  {1:>9}  {2:>9.2f}  {3:>8.1f}x  {4}'.format(
+            label, request_count, elapsed, baseline[0] / elapsed, same))
+
+    server.shutdown()
+    for results_path in results_paths:
+        shutil.rmtree(results_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# wta-scraper/benchmarks/bench_scheduler.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Runs get_individual_hike_data() against a local stub of www.wta.org that throttles
+# like a busy site: requests beyond --max-in-flight at once are answered with '429
+# Too Many Requests' and a Retry-After header. The run is repeated with and without
+# the scheduler's throttle handling (AIMD concurrency limits and Retry-After pauses),
+# and the number of throttled requests, the run time and the lowest concurrency
+# limit the scheduler settled on are compared. A last run checks that a robots.txt
+# Request-rate caps the request rate. The data of every run is checked against the
+# first one.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_scheduler.py [--hikes 60] [--max-in-flight 3]
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+from stub_server import start_stub_server
+
+
+def run(server, hike_urls, adaptive):
+    """Returns (elapsed seconds, requests sent, requests throttled, DataFrame,
+    scheduler report) for one get_individual_hike_data() run."""
+
+    wta.THROTTLE_STATUS_CODES = THROTTLE_STATUS_CODES if adaptive else []
+    wta.AIMD_DECREASE_FACTOR = AIMD_DECREASE_FACTOR if adaptive else 1
+    wta.RATE_LIMITER.reset()
+    wta.METRICS.reset()
+    request_count = server.request_count
+    throttled_count = server.throttled_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        hike_data = wta.get_individual_hike_data(hike_urls)
+    elapsed = time.perf_counter() - start
+    host = server.site.base_url.split('//')[1]
+    return (elapsed, server.request_count - request_count,
+            server.throttled_count - throttled_count,
+            hike_data.drop(columns = 'URL').reset_index(drop = True),
+            wta.RATE_LIMITER.report()[host])
+
+
+THROTTLE_STATUS_CODES = wta.THROTTLE_STATUS_CODES
+AIMD_DECREASE_FACTOR = wta.AIMD_DECREASE_FACTOR
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--hikes', type = int, default = 60)
+    parser.add_argument('--latency', type = float, default = 0.02,
+                        help = 'seconds of simulated network latency per request')
+    parser.add_argument('--max-in-flight', type = int, default = 3,
+                        help = 'requests the stub serves at once before answering 429')
+    parser.add_argument('--retry-after', type = int, default = 1)
+    parser.add_argument('--request-rate', type = int, default = 20,
+                        help = 'requests per second asked for by robots.txt')
+    args = parser.parse_args()
+
+    wta.RATE_LIMITER.requests_per_second = None
+    wta.RETRY_BACKOFF_JITTER = 0
+
+    server, base_url = start_stub_server(num_hikes = args.hikes, latency = args.latency,
+                                         max_in_flight = args.max_in_flight,
+                                         retry_after = args.retry_after)
+    hike_urls = [server.site.hike_url(hike) for hike in server.site.catalog]
+    print('{0} hikes, {1} workers, {2:.0f} ms latency, 429 beyond {3} requests in flight'.format(
+        args.hikes, wta.MAX_WORKERS, args.latency * 1000, args.max_in_flight))
+    print('{0:<22}  {1:>9}  {2:>9}  {3:>9}  {4:>9}  {5}'.format(
+        'scheduler', 'requests', '429s', 'seconds', 'min limit', 'same output'))
+
+    baseline = None
+    for label, adaptive in [('fixed concurrency', False), ('AIMD', True)]:
+        elapsed, requests_sent, throttled, hike_data, host = run(server, hike_urls, adaptive)
+        if baseline is None:
+            baseline = hike_data
+        print('{0:<22}  {1:>9}  {2:>9}  {3:>9.2f}  {4:>9}  {5}'.format(
+            label, requests_sent, throttled, elapsed, host['min_concurrency_limit'],
+            hike_data.equals(baseline)))
+    server.shutdown()
+
+    # A robots.txt Request-rate caps the request rate, even with no rate limit set:
+    robots_txt = 'User-agent: *\nRequest-rate: {0}/1\n'.format(args.request_rate)
+    server, base_url = start_stub_server(num_hikes = args.hikes, latency = args.latency,
+                                         robots_txt = robots_txt)
+    hike_urls = [server.site.hike_url(hike) for hike in server.site.catalog]
+    elapsed, requests_sent, throttled, hike_data, host = run(server, hike_urls, True)
+    print('\nrobots.txt Request-rate: {0}/1 (at most {0} requests/s)'.format(args.request_rate))
+    print(' > {0} requests in {1:.2f} s: {2:.1f} requests/s, same output: {3}'.format(
+        requests_sent, elapsed, requests_sent / elapsed, hike_data.equals(baseline)))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# wta-scraper/benchmarks/bench_streaming.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Compares downloading hike pages and trip report pages in full with streaming them
+# through the incremental parser (fetch_page_streamed()), which closes each page once
+# its data fields are found. Both runs fetch the same hikes from a local stub of
+# www.wta.org whose response bodies are paced to a bandwidth, so that the bytes not
+# read are also time not spent. For each mode, the bytes read by the scraper and
+# sent by the stub, the new connections opened and the time per page are printed,
+# and the streamed hike data is checked against the full download.
+#
+# Closing a page early also closes its connection, so the next request to the host
+# opens a new one: use --connect-latency to weigh that cost against the bytes saved.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_streaming.py [--hikes 100] [--page-size 30000]
+#                                         [--bandwidth 2000000] [--latency 0.02]
+#                                         [--connect-latency 0.0]
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+from stub_server import start_stub_server
+
+
+def run(server, hike_urls, stream):
+    """Returns (pages, bytes read, bytes sent, connections, seconds, hike data)."""
+
+    wta.SESSION = None
+    wta.METRICS.reset()
+    bytes_sent = server.bytes_sent
+    connection_count = server.connection_count
+    request_count = server.request_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        hike_data = wta.get_individual_hike_data(hike_urls, stream = stream)
+    elapsed = time.perf_counter() - start
+    return (server.request_count - request_count,
+            wta.METRICS.counters.get('bytes_downloaded', 0),
+            server.bytes_sent - bytes_sent,
+            server.connection_count - connection_count,
+            elapsed, hike_data.reset_index(drop = True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--hikes', type = int, default = 100)
+    parser.add_argument('--page-size', type = int, default = 30000,
+                        help = 'bytes of filler markup after the data fields of each hike page')
+    parser.add_argument('--bandwidth', type = float, default = 2000000,
+                        help = 'bytes per second sent on each connection')
+    parser.add_argument('--latency', type = float, default = 0.02,
+                        help = 'seconds of simulated network latency per request')
+    parser.add_argument('--connect-latency', type = float, default = 0.0,
+                        help = 'seconds of simulated handshake latency per new connection')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(num_hikes = args.hikes, latency = args.latency,
+                                         page_size = args.page_size,
+                                         connect_latency = args.connect_latency,
+                                         bandwidth = args.bandwidth)
+    wta.HIKES_URL = base_url + '/go-outside/hikes'
+    wta.RATE_LIMITER.requests_per_second = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, hike_urls = wta.discover_hike_urls(wta.HIKES_URL)
+
+    print('{0} hikes, {1} bytes of filler, {2:.0f} KB/s, {3:.0f} ms latency, '
+          '{4:.0f} ms connect latency'.format(args.hikes, args.page_size,
+                                              args.bandwidth / 1000, args.latency * 1000,
+                                              args.connect_latency * 1000))
+    print('{0:<8}  {1:>6}  {2:>12}  {3:>12}  {4:>11}  {5:>9}  {6}'.format(
+        'mode', 'pages', 'KB read/page', 'KB sent/page', 'connections', 'ms/page',
+        'same hike data'))
+
+    baseline = None
+    for label, stream in [('full', False), ('stream', True)]:
+        pages, bytes_read, bytes_sent, connections, elapsed, hike_data = run(
+            server, hike_urls, stream)
+        if baseline is None:
+            baseline = (pages, bytes_read, bytes_sent, elapsed, hike_data)
+        print('{0:<8}  {1:>6}  {2:>12.1f}  {3:>12.1f}  {4:>11}  {5:>9.2f}  {6}'.format(
+            label, pages, bytes_read / pages / 1000, bytes_sent / pages / 1000, connections,
+            elapsed / pages * 1000, hike_data.equals(baseline[4])))
+
+    print('Saved per page: {0:.1f} KB read, {1:.1f} KB sent, {2:.2f} ms'.format(
+        (baseline[1] - bytes_read) / pages / 1000, (baseline[2] - bytes_sent) / pages / 1000,
+        (baseline[3] - elapsed) / pages * 1000))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,536 @@
+# wta-scraper/benchmarks/bench_suite.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# A deterministic, offline benchmark suite for pytest-benchmark. Every benchmark runs
+# the scraper against a replay of the recorded corpus in benchmarks/corpus (see
+# replay_server.py), so results do not depend on wta.org or the network. Alongside
+# the timings, the hike data produced is checked against the golden output recorded
+# with the corpus, so a change that makes the scraper faster but changes its output
+# fails the suite.
+#
+# Benchmarks
+# ------------------------------------------------------------------------------------
+#   - get_hike_results_urls_list()
+#   - get_individual_hike_urls()
+#   - get_individual_hike_data(), parsing in the fetching threads and in parse
+#     worker processes.
+#   - main(), end to end, with and without injected server errors, and resuming the
+#     hikes that could not be retrieved.
+#   - refresh_hikes(), given a stored hike in an alias form and, after a crawl that
+#     only wrote a Parquet snapshot.
+#   - canonicalize_url(), on the ways a hike can be linked.
+#   - HikeIndex.nearby(), across the antimeridian and around the poles, against the
+#     distance to every hike.
+#   - a HikeTable save and load round trip.
+#   - WorkQueue leases: expiry, WORK_MAX_ATTEMPTS and hikes put back as pending.
+#   - diff_hike_data() and, a HistoryStore round trip of several snapshots.
+#   - HistoryStore.add_snapshot(), given values that are only written differently.
+#   - importing wta_scraper.scraper, in a fresh interpreter. Its heavy dependencies
+#     must not be imported until they are used (see bench_import.py).
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 -m pytest benchmarks/bench_suite.py
+#   python3 -m pytest benchmarks/bench_suite.py --benchmark-autosave
+#   python3 -m pytest benchmarks/bench_suite.py --benchmark-compare
+#
+# Set BENCH_LATENCY (seconds per request, default 0.005) to simulate network round
+# trips. After an intended change to the scraper's output, re-record the golden
+# output with 'python3 benchmarks/record_corpus.py'.
+#*************************************************************************************
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+from replay_server import GOLDEN_PATH, start_replay_server
+
+LATENCY = float(os.environ.get('BENCH_LATENCY', '0.005'))
+ROUNDS = 3
+# Packages that importing wta_scraper.scraper must leave for first use:
+LAZY_PACKAGES = ['bs4', 'lxml', 'numpy', 'pandas', 'pyarrow', 'requests', 'urllib3']
+
+
+@pytest.fixture(scope = 'module')
+def replay():
+    server, base_url = start_replay_server(latency = LATENCY)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope = 'module')
+def faulty_replay():
+    # 5% of the requests fail with '503 Service Unavailable' or a dropped connection.
+    servers = [start_replay_server(latency = LATENCY, error_rate = 0.05, error_status = status,
+                                   seed = 1)[0]
+               for status in (503, 0)]
+    yield servers
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def scraper(replay, tmp_path, monkeypatch):
+    """Points the scraper at the replay server and a temporary results folder."""
+
+    point_scraper_at(replay, tmp_path, monkeypatch)
+    return replay
+
+
+def point_scraper_at(server, results_path, monkeypatch):
+    base_url = server.site.base_url
+    monkeypatch.setattr(wta, 'HIKES_URL', base_url + '/go-outside/hikes')
+    monkeypatch.setattr(wta, 'TRIP_REPORTS_URL', base_url + '/go-hiking/trip-reports')
+    # Keeping every store, journal and report in the temporary results folder:
+    for name in ['RESULTS_PATH', 'STATE_STORE_PATH', 'RESPONSE_CACHE_PATH', 'HISTORY_STORE_PATH',
+                 'CHECKPOINT_PATH', 'WORK_QUEUE_PATH', 'SHARD_PATH',
+                 'REDIRECT_CACHE_PATH']:
+        monkeypatch.setattr(wta, name, getattr(wta, name))
+    wta.set_results_path(str(results_path))
+    monkeypatch.setattr(wta.RATE_LIMITER, 'requests_per_second', None)
+    # Retry injected errors right away:
+    monkeypatch.setattr(wta, 'RETRY_BACKOFF_FACTOR', 0)
+    monkeypatch.setattr(wta, 'RETRY_BACKOFF_JITTER', 0)
+    monkeypatch.setattr(wta, 'SESSION', None)
+
+
+def load_golden(base_url):
+    """Returns the golden hike data with its URLs pointed at the replay server."""
+
+    golden = pd.read_csv(GOLDEN_PATH, dtype = str)
+    golden['URL'] = golden['URL'].str.replace('https://www.wta.org', base_url, regex = False)
+    return golden
+
+
+def assert_matches_golden(hike_data, base_url, golden = None):
+    """Checks hike data, as text or typed values, against the golden output or, the
+    given rows of it."""
+
+    expected = wta.apply_hike_data_schema(load_golden(base_url) if golden is None else golden)
+    actual = wta.apply_hike_data_schema(hike_data.astype(object).where(hike_data.notna(), None))
+    pd.testing.assert_frame_equal(actual.reset_index(drop = True),
+                                  expected.reset_index(drop = True), check_dtype = False)
+
+
+def quietly(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def run_main():
+    """Runs main() and, returns its CSV snapshot."""
+
+    quietly(wta.main)
+    return pd.read_csv(wta.snapshot_file_path(wta.DATE, 'csv'), dtype = str)
+
+
+def test_get_hike_results_urls_list(benchmark, scraper):
+    results_urls = benchmark(quietly, wta.get_hike_results_urls_list, wta.HIKES_URL)
+
+    recorded_pages = [key for key in scraper.site.responses
+                      if key.startswith('/go-outside/hikes?')]
+    assert len(results_urls) == len(recorded_pages)
+
+
+def test_get_individual_hike_urls(benchmark, scraper):
+    results_urls = [wta.HIKES_URL] + quietly(wta.get_hike_results_urls_list, wta.HIKES_URL)
+    hike_urls = benchmark(quietly, wta.get_individual_hike_urls, results_urls)
+
+    assert sorted(hike_urls) == sorted(load_golden(scraper.site.base_url)['URL'])
+
+
+def test_get_individual_hike_data(benchmark, scraper):
+    hike_urls = list(load_golden(scraper.site.base_url)['URL'])
+    hike_data = benchmark.pedantic(quietly, args = (wta.get_individual_hike_data, hike_urls),
+                                   rounds = ROUNDS)
+
+    assert_matches_golden(hike_data, scraper.site.base_url)
+
+
+def test_hike_data_with_parse_workers(benchmark, scraper):
+    # The parse timings recorded in the parse worker processes reach the run's metrics:
+    hike_urls = list(load_golden(scraper.site.base_url)['URL'])
+    wta.METRICS.reset()
+    quietly(wta.get_individual_hike_data, hike_urls, parse_workers = 0)
+    expected = {name: wta.METRICS.timers[name]['count'] for name in ['parse', 'extract']}
+    wta.METRICS.reset()
+
+    hike_data = benchmark.pedantic(quietly, args = (wta.get_individual_hike_data, hike_urls),
+                                   kwargs = {'parse_workers': 2}, rounds = 1)
+
+    assert_matches_golden(hike_data, scraper.site.base_url)
+    assert {name: wta.METRICS.timers[name]['count'] for name in expected} == expected
+    assert expected['parse'] > 0
+
+
+def test_main(benchmark, scraper):
+    snapshot = benchmark.pedantic(run_main, rounds = ROUNDS)
+
+    assert_matches_golden(snapshot, scraper.site.base_url)
+
+
+def test_main_with_new_results_path(benchmark, replay, tmp_path, monkeypatch):
+    # A results folder that does not exist yet, as with '--results-path /data/wta':
+    results_path = tmp_path / 'data' / 'wta'
+    point_scraper_at(replay, results_path, monkeypatch)
+
+    def run_main_in_new_folder():
+        shutil.rmtree(tmp_path / 'data', ignore_errors = True)
+        quietly(wta.main, incremental = True, cache = True)
+        return pd.read_csv(wta.snapshot_file_path(wta.DATE, 'csv'), dtype = str)
+
+    snapshot = benchmark.pedantic(run_main_in_new_folder, rounds = 1)
+
+    assert_matches_golden(snapshot, replay.site.base_url)
+
+
+@pytest.mark.parametrize('error', ['503', 'dropped connection'])
+def test_main_with_injected_errors(benchmark, faulty_replay, tmp_path, monkeypatch, error):
+    server = faulty_replay[0 if error == '503' else 1]
+    point_scraper_at(server, tmp_path, monkeypatch)
+    snapshot = benchmark.pedantic(run_main, rounds = 1)
+
+    assert server.error_count > 0
+    assert_matches_golden(snapshot, server.site.base_url)
+
+
+@pytest.mark.parametrize('error_status', [503, 0], ids = ['503', 'dropped connection'])
+def test_hike_data_with_retries_exhausted(benchmark, tmp_path, monkeypatch, error_status):
+    # Errors on 30% of the requests and a single retry, so some hikes fail every try:
+    server = start_replay_server(latency = LATENCY, error_rate = 0.3,
+                                 error_status = error_status, seed = 2)[0]
+    point_scraper_at(server, tmp_path, monkeypatch)
+    monkeypatch.setattr(wta, 'RETRY_TOTAL', 1)
+    golden = load_golden(server.site.base_url)
+    wta.METRICS.reset()
+    try:
+        hike_data = benchmark.pedantic(quietly, args = (wta.get_individual_hike_data,
+                                                        golden['URL'].tolist()), rounds = 1)
+    finally:
+        server.shutdown()
+
+    # The hikes that could not be retrieved have no row, the others match the golden:
+    failed_count = wta.METRICS.counters['hike_fetch_errors']
+    assert 0 < failed_count == len(golden) - len(hike_data)
+    assert hike_data['TITLE'].notna().all()
+    retrieved = hike_data.sort_values('URL')
+    assert_matches_golden(retrieved, server.site.base_url,
+                          golden[golden['URL'].isin(retrieved['URL'])].sort_values('URL'))
+
+
+def test_main_resumes_failed_hikes(benchmark, tmp_path, monkeypatch):
+    # A run whose failed hikes are left out, interrupted before its snapshot is written.
+    # Errors are injected once the hike URLs are discovered:
+    server = start_replay_server(latency = LATENCY, seed = 2)[0]
+    point_scraper_at(server, tmp_path, monkeypatch)
+    monkeypatch.setattr(wta, 'RETRY_TOTAL', 1)
+    golden = load_golden(server.site.base_url)
+    discover_hike_urls = wta.discover_hike_urls
+
+    def discover_then_fail(*args, **kwargs):
+        discovered = discover_hike_urls(*args, **kwargs)
+        server.error_rate = 0.3
+        return discovered
+
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(wta, 'discover_hike_urls', discover_then_fail)
+            patch.setattr(wta, 'finalize_hike_data', interrupt)
+            with pytest.raises(KeyboardInterrupt):
+                quietly(wta.main)
+        failed_count = wta.METRICS.counters['hike_fetch_errors']
+        partial_data = pd.read_csv(wta.snapshot_file_path(wta.DATE, 'csv') + '.partial',
+                                   dtype = str)
+        journaled_urls = wta.CheckpointJournal(wta.CHECKPOINT_PATH).load()['done']
+
+        # Resuming once the site is back:
+        server.error_rate = 0
+        benchmark.pedantic(quietly, args = (wta.main,), kwargs = {'resume': True}, rounds = 1)
+        snapshot = pd.read_csv(wta.snapshot_file_path(wta.DATE, 'csv'), dtype = str)
+    finally:
+        server.shutdown()
+
+    # The failed hikes were neither written nor journaled, and the resumed run
+    # fetched them again:
+    assert 0 < failed_count == len(golden) - len(partial_data)
+    assert partial_data['TITLE'].notna().all()
+    assert journaled_urls == set(partial_data['URL'])
+    assert wta.METRICS.counters.get('hike_fetch_errors', 0) == 0
+    assert_matches_golden(snapshot, server.site.base_url)
+
+
+def test_refresh_with_alias_url(benchmark, scraper):
+    # A stored hike given in an alias form, with a trailing slash and tracking parameter:
+    run_main()
+    golden = load_golden(scraper.site.base_url)
+    hike_url = golden['URL'][0]
+    alias_url = hike_url.replace('/go-hiking/hikes/', '/go-outside/hikes/') + '/?utm_source=x'
+    assert wta.select_refresh_urls(golden, [alias_url, hike_url]) == [hike_url]
+
+    hike_data = benchmark.pedantic(quietly, args = (wta.refresh_hikes, [alias_url]),
+                                   rounds = 1)
+
+    # The hike's stored row was replaced rather than a new row added:
+    assert wta.METRICS.counters['refreshed_hikes'] == 1
+    assert_matches_golden(hike_data, scraper.site.base_url)
+
+
+def test_refresh_after_parquet_crawl(benchmark, scraper):
+    # A crawl that wrote no CSV snapshot is refreshed from the history store:
+    pytest.importorskip('pyarrow')
+    quietly(wta.main, output_formats = ['parquet'])
+    assert not os.path.exists(wta.snapshot_file_path(wta.DATE, 'csv'))
+    hike_url = load_golden(scraper.site.base_url)['URL'][0]
+
+    hike_data = benchmark.pedantic(quietly, args = (wta.refresh_hikes, [hike_url]),
+                                   kwargs = {'output_formats': ['parquet']}, rounds = 1)
+
+    assert wta.METRICS.counters['refreshed_hikes'] == 1
+    assert_matches_golden(hike_data, scraper.site.base_url)
+
+
+@pytest.mark.parametrize('url, canonical_url', [
+    # Origins: scheme and host case, default ports and the site's other origins.
+    ('HTTP://WTA.org:80/go-hiking/hikes/mount-si',
+     'https://www.wta.org/go-hiking/hikes/mount-si'),
+    ('https://www.wta.org:443/go-hiking/hikes/mount-si',
+     'https://www.wta.org/go-hiking/hikes/mount-si'),
+    ('http://127.0.0.1:8080/go-hiking/hikes/mount-si/',
+     'http://127.0.0.1:8080/go-hiking/hikes/mount-si'),
+    ('https://wta.org', 'https://www.wta.org/'),
+    # Paths: the go-outside alias of a hike, repeated and trailing slashes.
+    ('https://www.wta.org/go-outside/hikes/mount-si/',
+     'https://www.wta.org/go-hiking/hikes/mount-si'),
+    ('https://www.wta.org//go-hiking//hikes/mount-si',
+     'https://www.wta.org/go-hiking/hikes/mount-si'),
+    ('https://www.wta.org/go-outside/hikes?b_start:int=30',
+     'https://www.wta.org/go-outside/hikes?b_start:int=30'),
+    # Fragments and query parameters: tracking parameters dropped, the others sorted.
+    ('https://www.wta.org/go-hiking/hikes/mount-si#trip-reports',
+     'https://www.wta.org/go-hiking/hikes/mount-si'),
+    ('https://www.wta.org/go-hiking/hikes/mount-si?utm_source=x&b=2&fbclid=1&a=1&q=',
+     'https://www.wta.org/go-hiking/hikes/mount-si?a=1&b=2&q='),
+])
+def test_canonicalize_url(benchmark, url, canonical_url):
+    assert benchmark(wta.canonicalize_url, url) == canonical_url
+    assert wta.canonicalize_url(canonical_url) == canonical_url
+
+
+def build_hike_coordinates(seed = 0):
+    """Returns hike data with only coordinates: spread over the globe, clustered
+    across the antimeridian and around both poles, plus a missing one."""
+
+    rand = np.random.default_rng(seed)
+    latitudes = [rand.uniform(-90, 90, 2000)]
+    longitudes = [rand.uniform(-180, 180, 2000)]
+    for latitude, longitude, spread in [(0, 180, 1), (65, -180, 1), (90, 0, 2), (-90, 0, 2)]:
+        latitudes.append(np.clip(latitude + rand.uniform(-spread, spread, 500), -90, 90))
+        longitudes.append((longitude + rand.uniform(-180 if abs(latitude) == 90 else -spread,
+                                                    180 if abs(latitude) == 90 else spread,
+                                                    500) + 180) % 360 - 180)
+    hike_data = pd.DataFrame({'LATITUDE': np.concatenate(latitudes),
+                              'LONGITUDE': np.concatenate(longitudes)})
+    hike_data.loc[len(hike_data)] = [np.nan, np.nan]
+    for column in wta.HIKE_DATA_COLUMNS:
+        if column not in hike_data:
+            hike_data[column] = None
+    hike_data['URL'] = ['hike-{0}'.format(number) for number in range(len(hike_data))]
+    return hike_data[wta.HIKE_DATA_COLUMNS]
+
+
+@pytest.mark.parametrize('latitude, longitude, radius_km', [
+    (0.0, 179.9, 60), (0.0, -179.9, 60), (65.0, 180.0, 80), (89.9, 10.0, 150),
+    (-89.5, -170.0, 120), (90.0, 0.0, 50), (47.6, -122.3, 500)],
+    ids = ['antimeridian east', 'antimeridian west', 'antimeridian north', 'north pole',
+           'south pole', 'at the pole', 'mid latitude'])
+def test_hike_index_nearby(benchmark, latitude, longitude, radius_km):
+    hike_data = build_hike_coordinates()
+    hike_index = wta.HikeIndex(hike_data)
+
+    nearby = benchmark(hike_index.nearby, latitude, longitude, radius_km)
+
+    # Against the distance to every hike:
+    distances = wta.haversine_km(np.radians(latitude), np.radians(longitude),
+                                 np.radians(hike_data['LATITUDE'].to_numpy(dtype = float)),
+                                 np.radians(hike_data['LONGITUDE'].to_numpy(dtype = float)))
+    within = hike_data['URL'][distances <= radius_km]
+    assert len(within) > 0
+    assert sorted(nearby['URL']) == sorted(within)
+    assert nearby['DISTANCE_KM'].is_monotonic_increasing
+
+
+def test_hike_table_round_trip(benchmark, tmp_path):
+    # The golden hikes, plus a hike with only a URL and one whose URL has no slash:
+    golden = load_golden('https://www.wta.org')
+    hike_data = pd.concat([golden, pd.DataFrame([
+        {'URL': 'https://www.wta.org/go-hiking/hikes/unnamed'},
+        {'TITLE': 'Lake 22', 'REGION': 'Snoqualmie Region', 'REPORT_COUNT': '40000',
+         'URL': 'lake-22'}])], ignore_index = True)[wta.HIKE_DATA_COLUMNS]
+    table_path = str(tmp_path / 'hike_table')
+
+    def save_and_load():
+        wta.HikeTable(wta.apply_hike_data_schema(hike_data)).save(table_path)
+        return wta.HikeTable.load(table_path)
+
+    hike_table = benchmark.pedantic(save_and_load, rounds = 1)
+
+    # Every value reads back, from arrays mapped rather than copied:
+    assert len(hike_table) == len(hike_data)
+    assert all(isinstance(array, np.memmap) for array in hike_table.arrays.values())
+    assert_matches_golden(hike_table.to_dataframe(), None, hike_data)
+    positions = np.array([len(hike_data) - 1, 0])
+    assert_matches_golden(hike_table.to_dataframe(positions), None, hike_data.iloc[positions])
+    assert hike_table.row(len(golden)) == dict(dict.fromkeys(wta.HIKE_DATA_COLUMNS),
+                                               URL = 'https://www.wta.org/go-hiking/hikes/unnamed')
+    assert hike_table.row(0)['DISTANCE'] == float(golden['DISTANCE'][0])
+
+
+def test_work_queue_leases(benchmark, tmp_path):
+    queue = wta.WorkQueue(str(tmp_path / 'work_queue.sqlite'))
+    try:
+        assert queue.publish('2021-04-25', ['a', 'b', 'c', 'a']) == 3
+
+        # A lease that expires, as a crashed worker's does, is leased again in crawl
+        # order and, the worker that lost it can neither renew nor complete it:
+        lost_id, lost_urls = queue.lease('crashed', 2, lease_seconds = -1)
+        lease_id, lease_urls = benchmark.pedantic(queue.lease, args = ('worker', 2),
+                                                  rounds = 1)
+        assert lost_urls == lease_urls == ['a', 'b']
+        assert not queue.renew(lost_id) and queue.complete(lost_id) == 0
+        assert queue.renew(lease_id) and queue.complete(lease_id) == 2
+
+        # A hike whose every lease expires fails after WORK_MAX_ATTEMPTS leases:
+        for _ in range(wta.WORK_MAX_ATTEMPTS):
+            assert queue.lease('crashed', 2, lease_seconds = -1)[1] == ['c']
+        assert queue.lease('worker', 2)[1] == []
+        assert queue.counts() == {'pending': 0, 'leased': 0, 'done': 2, 'failed': 1}
+
+        # Hikes a lease did not finish are put back as pending:
+        queue.publish('2021-05-02', ['d', 'e'])
+        lease_id, _ = queue.lease('worker', 2)
+        assert queue.complete(lease_id, ['e']) == 1
+        assert queue.counts() == {'pending': 1, 'leased': 0, 'done': 1, 'failed': 0}
+        assert queue.lease('worker', 2)[1] == ['d']
+    finally:
+        queue.close()
+
+
+def test_diff_hike_data(benchmark):
+    golden = load_golden('https://www.wta.org')
+    old_data = golden.head(5)
+    new_data = old_data.copy()
+    # Written differently, but equal:
+    new_data.loc[0, 'DISTANCE'] = '10.30'
+    new_data.loc[0, 'LONGITUDE'] = repr(float(new_data.loc[0, 'LONGITUDE']) + 1e-9)
+    # Changed, and a float changed by more than DIFF_FLOAT_TOLERANCE:
+    new_data.loc[1, 'GAIN'] = '600.0'
+    new_data.loc[3, 'LATITUDE'] = repr(float(new_data.loc[3, 'LATITUDE']) + 1e-3)
+    # Removed and added:
+    new_data = pd.concat([new_data.drop(index = 2), golden.iloc[[5]]])
+
+    delta, summary = benchmark.pedantic(wta.diff_hike_data, args = (old_data, new_data),
+                                        rounds = 1)
+
+    assert summary == {'added': 1, 'removed': 1, 'changed': 2, 'unchanged': 2,
+                       'fields': {'GAIN': 1, 'LATITUDE': 1}}
+    delta = delta.set_index('URL')
+    assert delta['CHANGE'].to_dict() == {golden['URL'][1]: 'changed',
+                                         golden['URL'][2]: 'removed',
+                                         golden['URL'][3]: 'changed',
+                                         golden['URL'][5]: 'added'}
+    # Changed hikes hold only their changed fields, removed hikes none:
+    changed = delta.loc[golden['URL'][1]]
+    assert changed['CHANGED_FIELDS'] == 'GAIN' and changed['GAIN'] == '600.0'
+    assert changed.drop(['CHANGE', 'CHANGED_FIELDS', 'GAIN']).isna().all()
+    assert delta.loc[golden['URL'][2]].drop('CHANGE').isna().all()
+    assert delta.loc[golden['URL'][5], 'TITLE'] == golden['TITLE'][5]
+
+
+def test_history_store_round_trip(benchmark, tmp_path):
+    # A snapshot, the same with a hike changed and one removed, then ten hikes added:
+    golden = load_golden('https://www.wta.org')
+    snapshots = {'2021-04-25': golden.iloc[ : 50]}
+    snapshots['2021-05-02'] = snapshots['2021-04-25'].drop(index = 1)
+    snapshots['2021-05-02'].loc[0, 'GAIN'] = '900.0'
+    snapshots['2021-05-09'] = pd.concat([snapshots['2021-05-02'], golden.iloc[50 : ]])
+    history_store = wta.HistoryStore(str(tmp_path / 'history.sqlite'))
+
+    def add_snapshots():
+        return [history_store.add_snapshot(hike_data, snapshot_date)
+                for snapshot_date, hike_data in snapshots.items()]
+
+    try:
+        changes = benchmark.pedantic(add_snapshots, rounds = 1)
+
+        assert changes[1 : ] == [{'added': 0, 'removed': 1, 'changed': 1, 'unchanged': 48},
+                                 {'added': 10, 'removed': 0, 'changed': 0, 'unchanged': 49}]
+        assert history_store.snapshot_dates() == list(snapshots)
+        assert history_store.row_count() == 50 + 1 + 10
+        # Every snapshot reads back as it was added:
+        for snapshot_date, hike_data in snapshots.items():
+            assert history_store.snapshot_hike_count(snapshot_date) == len(hike_data)
+            assert_matches_golden(history_store.load_snapshot(snapshot_date), None,
+                                  hike_data.sort_values('TITLE'))
+
+        # Removing the latest snapshot reopens the rows it closed:
+        history_store.remove_latest_snapshot()
+        assert history_store.snapshot_dates() == list(snapshots)[ : 2]
+        assert history_store.row_count() == 50 + 1
+        assert_matches_golden(history_store.load_snapshot('2021-05-02'), None,
+                              snapshots['2021-05-02'].sort_values('TITLE'))
+        assert history_store.load_snapshot('2021-05-09') is None
+    finally:
+        history_store.close()
+
+
+def test_history_store_with_equal_values(benchmark, tmp_path):
+    # The same hikes written with values diff_hike_data() treats as equal:
+    golden = load_golden('https://www.wta.org')
+    rewritten = golden.copy()
+    rewritten['DISTANCE'] = pd.to_numeric(rewritten['DISTANCE']).map('{0:.2f}'.format,
+                                                                     na_action = 'ignore')
+    rewritten['LONGITUDE'] = (pd.to_numeric(rewritten['LONGITUDE']) + 1e-9).astype(str)
+    history_store = wta.HistoryStore(str(tmp_path / 'history.sqlite'))
+    history_store.add_snapshot(golden, '2021-04-25')
+
+    changes = benchmark.pedantic(history_store.add_snapshot, args = (rewritten, '2021-04-26'),
+                                 rounds = 1)
+    row_count = history_store.row_count()
+    history_store.close()
+
+    assert changes == {'added': 0, 'removed': 0, 'changed': 0, 'unchanged': len(golden)}
+    assert row_count == len(golden)
+
+
+def import_scraper():
+    """Imports wta_scraper.scraper in a fresh interpreter and, returns the lazily
+    imported packages it imported anyway."""
+
+    code = ('import sys, wta_scraper.scraper; '
+            'print(" ".join(name for name in {0!r} if name in sys.modules))'.format(LAZY_PACKAGES))
+    result = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True,
+                            check = True,
+                            cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return result.stdout.split()
+
+
+def test_import(benchmark):
+    imported = benchmark.pedantic(import_scraper, rounds = ROUNDS)
+
+    assert imported == []
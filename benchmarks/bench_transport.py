@@ -0,0 +1,85 @@
+# wta-scraper/benchmarks/bench_transport.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Measures how much connection reuse speeds up get_individual_hike_data(). The shared
+# keep-alive session from get_session() is compared with the original transport,
+# which opened a new connection for every request (a bare requests.get() call). The
+# stub server adds a delay to every new connection to stand in for the TCP and TLS
+# handshakes of a real HTTPS connection to www.wta.org.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/bench_transport.py [--hikes 60] [--connect-latency 0.05]
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import WTA_Hike_Scraper as wta
+from stub_server import start_stub_server
+
+
+class NewConnectionPerRequest:
+    """Stands in for the shared session with the original bare requests.get() call."""
+
+    def get(self, url, **kwargs):
+        return requests.get(url, **kwargs)
+
+
+def run(server, hike_urls, session, max_workers):
+    """Returns (elapsed seconds, connections opened) for one run."""
+
+    wta.SESSION = session
+    connections = server.connection_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        wta.get_individual_hike_data(hike_urls, max_workers = max_workers)
+    return time.perf_counter() - start, server.connection_count - connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--hikes', type = int, default = 60)
+    parser.add_argument('--latency', type = float, default = 0.02,
+                        help = 'seconds of simulated latency per request')
+    parser.add_argument('--connect-latency', type = float, default = 0.05,
+                        help = 'seconds of simulated handshake latency per new connection')
+    parser.add_argument('--workers', type = int, nargs = '+', default = [1, 8])
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(num_hikes = args.hikes, latency = args.latency,
+                                         connect_latency = args.connect_latency)
+    hike_urls = [server.site.hike_url(hike) for hike in server.site.catalog]
+    wta.RATE_LIMITER.requests_per_second = None
+
+    print('{0} hikes, {1:.0f} ms latency per request, {2:.0f} ms per new connection'.format(
+        args.hikes, args.latency * 1000, args.connect_latency * 1000))
+    print('{0:>8}  {1:<24}  {2:>8}  {3:>8}  {4:>12}  {5:>8}'.format(
+        'workers', 'transport', 'seconds', 'pages/s', 'connections', 'speedup'))
+
+    for max_workers in args.workers:
+        fresh_seconds, fresh_connections = run(server, hike_urls, NewConnectionPerRequest(),
+                                               max_workers)
+        wta.SESSION = None
+        pooled_seconds, pooled_connections = run(server, hike_urls, wta.get_session(),
+                                                 max_workers)
+        for name, seconds, connections in [
+                ('new connection/request', fresh_seconds, fresh_connections),
+                ('pooled keep-alive', pooled_seconds, pooled_connections)]:
+            print('{0:>8}  {1:<24}  {2:>8.2f}  {3:>8.1f}  {4:>12}  {5:>7.1f}x'.format(
+                max_workers, name, seconds, 2 * len(hike_urls) / seconds, connections,
+                fresh_seconds / seconds))
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# wta-scraper/benchmarks/record_corpus.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Records a corpus of WTA pages for replay_server.py and, writes the hike data the
+# scraper produces from it as the golden output checked by bench_suite.py. The
+# recorder retrieves every hike results page, every hike page and trip report page
+# listed on them, and the first pages of the site-wide trip report listing.
+#
+# By default the pages are recorded from the deterministic stub in stub_server.py,
+# with links rewritten to 'https://www.wta.org', which is how the committed corpus
+# in benchmarks/corpus was made. Use --origin to record from the live site instead.
+# Requests are paced by REQUESTS_PER_SECOND, and --max-pages keeps the corpus small.
+# Results pages beyond --max-pages are not recorded and are answered with '404 Not
+# Found' on replay.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   python3 benchmarks/record_corpus.py [--stub-hikes 60]
+#   python3 benchmarks/record_corpus.py --origin https://www.wta.org --max-pages 2
+#*************************************************************************************
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WTA_Hike_Scraper as wta
+from replay_server import CORPUS_PATH, GOLDEN_PATH, start_replay_server, write_corpus
+from stub_server import start_stub_server
+
+STUB_ORIGIN = 'https://www.wta.org'
+
+
+def record(origin, max_pages, report_pages, rewrite_from = None):
+    """Returns the recorded responses of a site, in the order they were retrieved."""
+
+    def get(url):
+        resp = wta.fetch_response(url)
+        body = resp.text
+        if rewrite_from is not None:
+            url = url.replace(rewrite_from, origin)
+            body = body.replace(rewrite_from, origin)
+        print(' > {0} {1}'.format(resp.status_code, url))
+        return {'url': url, 'status': resp.status_code, 'body': body}, resp
+
+    source = rewrite_from or origin
+    responses = []
+
+    # Hike results pages and the hike URLs listed on them:
+    response, resp = get(source + '/go-outside/hikes')
+    responses.append(response)
+    first_page_tree = wta.parse_html(resp.content, source + '/go-outside/hikes')
+    hike_urls = wta.extract_hike_links(first_page_tree)
+    for page_url in wta.extract_results_page_urls(first_page_tree)[1 : max_pages]:
+        response, resp = get(page_url)
+        responses.append(response)
+        hike_urls.extend(wta.extract_hike_links(wta.parse_html(resp.content, page_url)))
+
+    # Hike pages and their trip report pages:
+    for hike_url in hike_urls:
+        responses.append(get(hike_url)[0])
+        responses.append(get(hike_url + '/@@related_tripreport_listing')[0])
+
+    # The site-wide trip report listing:
+    response, resp = get(source + '/go-hiking/trip-reports')
+    responses.append(response)
+    listing_tree = wta.parse_html(resp.content, source + '/go-hiking/trip-reports')
+    for page_url in wta.extract_results_page_urls(listing_tree)[1 : report_pages]:
+        responses.append(get(page_url)[0])
+
+    return responses
+
+
+def write_golden(corpus_path, golden_path):
+    """Runs main() against a replay of the corpus and, writes its CSV snapshot with
+    replay URLs rewritten to the recorded origin."""
+
+    server, base_url = start_replay_server(corpus_path)
+    results_path = tempfile.mkdtemp()
+    wta.HIKES_URL = base_url + '/go-outside/hikes'
+    wta.set_results_path(results_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        wta.main()
+
+    with open(wta.snapshot_file_path(wta.DATE, 'csv')) as snapshot_file:
+        snapshot = snapshot_file.read()
+    with open(golden_path, 'w') as golden_file:
+        golden_file.write(snapshot.replace(base_url, server.site.origin))
+
+    server.shutdown()
+    shutil.rmtree(results_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__)
+    parser.add_argument('--origin', default = None,
+                        help = 'record from this site instead of the stub, '
+                               'e.g. https://www.wta.org')
+    parser.add_argument('--stub-hikes', type = int, default = 60)
+    parser.add_argument('--stub-page-size', type = int, default = 2000,
+                        help = 'bytes of filler markup on each stub page')
+    parser.add_argument('--max-pages', type = int, default = None,
+                        help = 'number of hike results pages to record (default: all)')
+    parser.add_argument('--report-pages', type = int, default = None,
+                        help = 'number of trip report listing pages to record (default: all)')
+    parser.add_argument('--output', default = CORPUS_PATH)
+    parser.add_argument('--golden', default = GOLDEN_PATH)
+    args = parser.parse_args()
+
+    if args.origin is None:
+        server, base_url = start_stub_server(num_hikes = args.stub_hikes,
+                                             page_size = args.stub_page_size)
+        wta.RATE_LIMITER.requests_per_second = None
+        responses = record(STUB_ORIGIN, args.max_pages, args.report_pages,
+                           rewrite_from = base_url)
+        origin = STUB_ORIGIN
+        server.shutdown()
+    else:
+        origin = args.origin.rstrip('/')
+        responses = record(origin, args.max_pages, args.report_pages)
+
+    write_corpus(args.output, origin, responses)
+    print('Corpus Written: {0} ({1} Responses)'.format(args.output, len(responses)))
+
+    write_golden(args.output, args.golden)
+    print('Golden Output Written: {0}'.format(args.golden))
+
+
+if __name__ == '__main__':
+    main()
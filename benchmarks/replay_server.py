@@ -0,0 +1,134 @@
+# wta-scraper/benchmarks/replay_server.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Replays a recorded corpus of WTA pages over local HTTP, so the scraper can be run
+# and benchmarked end to end without the live wta.org site. A corpus is a gzipped
+# JSON Lines file written by record_corpus.py: the first line holds the origin the
+# pages were recorded from, e.g. 'https://www.wta.org', and every other line holds
+# one recorded response (URL, status and body). Links to the recorded origin are
+# rewritten to the replay server, so every link the scraper follows stays local.
+# Requests for URLs that were not recorded are answered with '404 Not Found'.
+#
+# The replay server reuses the stub server's handler, so it supports the same
+# per-request and per-connection latency, ETags and '304 Not Modified' and, error
+# injection (server errors or dropped connections for a share of the requests).
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   server, base_url = start_replay_server(CORPUS_PATH, latency = 0.02,
+#                                          error_rate = 0.05)
+#   ...
+#   server.shutdown()
+#*************************************************************************************
+import gzip
+import json
+import os
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from stub_server import start_site_server
+
+CORPUS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+# The recorded corpus and the hike data the scraper is expected to produce from it:
+CORPUS_PATH = os.path.join(CORPUS_FOLDER, 'wta_corpus.jsonl.gz')
+GOLDEN_PATH = os.path.join(CORPUS_FOLDER, 'golden_hike_data.csv')
+
+
+def corpus_key(path, query):
+    """Returns the lookup key of a request path and parsed query string. Query
+    parameters are sorted, so equivalent URLs share one key."""
+
+    params = sorted((name, value) for name, values in query.items() for value in values)
+    return path.rstrip('/') + ('?' + urlencode(params, safe = ':') if params else '')
+
+
+def url_key(url):
+    """Returns the lookup key of an absolute or relative URL."""
+
+    parsed = urlparse(url)
+    return corpus_key(parsed.path, parse_qs(parsed.query))
+
+
+#*************************************************************************************
+# Class: ReplaySite
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Serves the responses of a recorded corpus, keyed by path and query string.
+#*************************************************************************************
+class ReplaySite:
+    """Serves the responses of a recorded corpus."""
+
+    def __init__(self, corpus_path = CORPUS_PATH):
+        self.origin, self.responses = load_corpus(corpus_path)
+        self.base_url = ''
+
+    def url(self, recorded_url):
+        """Returns the replay URL of a URL recorded in the corpus."""
+
+        return recorded_url.replace(self.origin, self.base_url, 1)
+
+    def render(self, path, query):
+        """Returns (status, body) for a request path and parsed query string."""
+
+        response = self.responses.get(corpus_key(path, query))
+        if response is None:
+            return 404, '<html><body><h1>Not Found</h1></body></html>'
+        return response['status'], response['body'].replace(self.origin, self.base_url)
+
+
+#*************************************************************************************
+# Method: load_corpus(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Reads a recorded corpus and, returns its origin along with its responses keyed by
+# corpus_key().
+#*************************************************************************************
+def load_corpus(corpus_path = CORPUS_PATH):
+    """Returns (origin, responses keyed by corpus_key()) for a recorded corpus."""
+
+    responses = {}
+    with gzip.open(corpus_path, 'rt', encoding = 'utf-8') as corpus_file:
+        origin = json.loads(corpus_file.readline())['origin']
+        for line in corpus_file:
+            response = json.loads(line)
+            responses[url_key(response['url'])] = response
+    return origin, responses
+
+
+#*************************************************************************************
+# Method: write_corpus(String, String, Iterable)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Writes recorded responses, dictionaries holding a 'url', 'status' and 'body', to a
+# corpus file.
+#*************************************************************************************
+def write_corpus(corpus_path, origin, responses):
+    """Writes recorded responses to a gzipped JSON Lines corpus file."""
+
+    os.makedirs(os.path.dirname(corpus_path), exist_ok = True)
+    # mtime = 0 keeps the file byte-identical when the same pages are recorded again.
+    with open(corpus_path, 'wb') as raw_file, \
+         gzip.GzipFile(fileobj = raw_file, mode = 'wb', mtime = 0) as gzip_file:
+        gzip_file.write((json.dumps({'origin': origin}) + '\n').encode('utf-8'))
+        for response in responses:
+            gzip_file.write((json.dumps(response, sort_keys = True) + '\n').encode('utf-8'))
+
+
+#*************************************************************************************
+# Method: start_replay_server(String, Float, Float, Float, Integer, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Starts a ReplaySite server on a free local port in a background thread and returns
+# the server along with its base URL. Call server.shutdown() when finished.
+#*************************************************************************************
+def start_replay_server(corpus_path = CORPUS_PATH, latency = 0.0, connect_latency = 0.0,
+                        error_rate = 0.0, error_status = 503, seed = 0):
+    """Starts a local replay of a recorded corpus and returns (server, base_url)."""
+
+    return start_site_server(ReplaySite(corpus_path), latency = latency,
+                             connect_latency = connect_latency, error_rate = error_rate,
+                             error_status = error_status, seed = seed)
@@ -0,0 +1,527 @@
+# wta-scraper/benchmarks/stub_server.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# A local stand-in for www.wta.org used by the benchmark scripts. The stub generates
+# a deterministic catalog of fake hikes and serves the three kinds of pages the
+# scraper reads: hike results listings (paginated with 'b_start:int' offsets),
+# individual hike pages, '@@related_tripreport_listing' pages and the site-wide trip
+# report listing (newest first, also paginated). The markup mirrors
+# the parts of WTA's HTML that wta_scraper.scraper depends on. Responses carry an
+# ETag and conditional requests for unchanged pages are answered with '304 Not
+# Modified'. A fixed latency can be added to every response to simulate network
+# round trips and, to every new connection to simulate TCP and TLS handshakes. A
+# share of the responses can be replaced with server errors or dropped connections.
+# The stub can also throttle like a busy site: a robots.txt asking for a crawl delay,
+# and '429 Too Many Requests' for requests beyond a number in flight at once. With a
+# bandwidth, response bodies are sent in pieces paced to that many bytes per second,
+# and a client that closes the connection early stops the rest from being sent.
+# The listings can also link hikes the untidy ways a real site does: a share of the
+# links in alias forms ('/go-outside/hikes/<hike>', which redirects to
+# '/go-hiking/hikes/<hike>', a trailing slash or tracking parameters), hikes listed
+# again on the next page and, renamed hikes linked under an old slug that redirects
+# permanently to the new one. Redirects are sent with a 'Location' header.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   server, base_url = start_stub_server(num_hikes = 100, latency = 0.05)
+#   ...
+#   server.shutdown()
+#*************************************************************************************
+import json
+import random
+import socket
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Number of hikes listed on each hike results page, as on WTA's website:
+RESULTS_PER_PAGE = 30
+# Number of trip reports listed on each page of the site-wide trip report listing:
+REPORTS_PER_PAGE = 100
+# Number of page links shown on either side of the active page in the pagination:
+PAGINATION_WINDOW = 4
+# Number of bytes sent at a time when a response body is paced to a bandwidth:
+BANDWIDTH_PIECE_SIZE = 4096
+
+REGIONS = ['Central Cascades', 'Central Washington', 'Eastern Washington',
+           'Issaquah Alps', 'Mount Rainier Area', 'North Cascades',
+           'Olympic Peninsula', 'Puget Sound and Islands', 'Snoqualmie Region',
+           'South Cascades', 'Southwest Washington']
+DIST_TYPES = ['roundtrip', 'one-way', 'of trails']
+WORDS = ['lake', 'ridge', 'peak', 'falls', 'creek', 'meadow', 'butte', 'pass',
+         'trail', 'loop', 'lookout', 'basin', 'point', 'canyon', 'river']
+
+
+#*************************************************************************************
+# Method: build_catalog(Integer, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Builds a deterministic list of fake hikes. Each hike is a dictionary holding the
+# values the scraper is expected to extract from its pages.
+#*************************************************************************************
+def build_catalog(num_hikes, seed = 0):
+    """Returns a deterministic list of fake hikes."""
+
+    rand = random.Random(seed)
+    catalog = []
+    for number in range(num_hikes):
+        words = rand.sample(WORDS, 2)
+        title = '{0} {1} {2}'.format(words[0].title(), words[1].title(), number)
+        report_count = rand.choice([0, 1, 3, 12, 36, 140])
+        latest = date(2021, 4, 25) - timedelta(days = rand.randint(0, 2000))
+        catalog.append({
+            'slug': '{0}-{1}-{2}'.format(words[0], words[1], number),
+            'title': title,
+            'region': rand.choice(REGIONS),
+            'distance': round(rand.uniform(0.5, 30.0), 1),
+            'dist_type': rand.choice(DIST_TYPES),
+            'gain': float(rand.randint(0, 6000)),
+            'highest': float(rand.randint(100, 9000)),
+            'rating': round(rand.uniform(0, 5) * 4) / 4,
+            'rating_count': rand.randint(0, 200),
+            'latitude': round(rand.uniform(45.6, 48.9), 6),
+            'longitude': round(rand.uniform(-124.6, -117.1), 6),
+            'report_count': report_count,
+            'latest_report': latest,
+            'report_dates': [latest - timedelta(days = 9 * i)
+                             for i in range(min(report_count, 10))],
+        })
+    return catalog
+
+
+def _filler(rand, size):
+    """Returns roughly 'size' bytes of navigation and body markup."""
+
+    parts = []
+    total = 0
+    while total < size:
+        part = '<li class="nav-item"><a href="/{0}/{1}">{2} {3}</a></li>\n'.format(
+            rand.choice(WORDS), rand.randint(0, 99999),
+            rand.choice(WORDS).title(), rand.choice(WORDS))
+        parts.append(part)
+        total += len(part)
+    return '<ul class="portal-nav">\n' + ''.join(parts) + '</ul>\n'
+
+
+#*************************************************************************************
+# Class: StubSite
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Renders the hike results, hike and trip report pages for a catalog of fake hikes.
+#*************************************************************************************
+class StubSite:
+    """Renders WTA-like pages for a deterministic catalog of fake hikes."""
+
+    def __init__(self, num_hikes, page_size = 30000, seed = 0, alias_rate = 0.0, overlap = 0,
+                 renamed_rate = 0.0):
+        self.catalog = build_catalog(num_hikes, seed)
+        self.by_slug = {hike['slug']: hike for hike in self.catalog}
+        self.page_size = page_size
+        self.seed = seed
+        self.base_url = ''
+        self.alias_rate = alias_rate
+        self.overlap = overlap
+
+        # Renamed hikes are still listed under their old slug:
+        rand = random.Random(seed + 1)
+        self.old_slugs = {hike['slug']: 'old-' + hike['slug'] for hike in self.catalog
+                          if renamed_rate and rand.random() < renamed_rate}
+        self.renamed = {old_slug: self.by_slug[slug] for slug, old_slug in self.old_slugs.items()}
+
+    def hike_url(self, hike):
+        return '{0}/go-hiking/hikes/{1}'.format(self.base_url, hike['slug'])
+
+    def listed_url(self, hike, rand):
+        """Returns the URL a hike is linked with on the hike results pages."""
+
+        url = '{0}/go-hiking/hikes/{1}'.format(self.base_url,
+                                               self.old_slugs.get(hike['slug'], hike['slug']))
+        if self.alias_rate and rand.random() < self.alias_rate:
+            url = rand.choice([url.replace('/go-hiking/', '/go-outside/'), url + '/',
+                               url + '?utm_source=newsletter&utm_medium=email'])
+        return url
+
+    def results_url(self, page):
+        if page == 1:
+            return '{0}/go-outside/hikes'.format(self.base_url)
+        return '{0}/go-outside/hikes?b_start:int={1}'.format(
+            self.base_url, (page - 1) * RESULTS_PER_PAGE)
+
+    def trip_reports_url(self, page):
+        if page == 1:
+            return '{0}/go-hiking/trip-reports'.format(self.base_url)
+        return '{0}/go-hiking/trip-reports?b_start:int={1}'.format(
+            self.base_url, (page - 1) * REPORTS_PER_PAGE)
+
+    def last_page(self):
+        return max(1, -(-len(self.catalog) // RESULTS_PER_PAGE))
+
+    def all_reports(self):
+        """Returns (report date, hike) for every trip report, newest first."""
+
+        if not hasattr(self, '_all_reports'):
+            reports = [(hike['latest_report'] - timedelta(days = 9 * i), hike)
+                       for hike in self.catalog for i in range(hike['report_count'])]
+            reports.sort(key = lambda report: (report[0], report[1]['slug']), reverse = True)
+            self._all_reports = reports
+        return self._all_reports
+
+    def render_pagination(self, page, last_page, page_url, per_page):
+        links = []
+        if page > 1:
+            links.append('<li class="previous"><a href="{0}">&laquo; previous</a></li>'.format(
+                page_url(page - 1)))
+        for number in range(max(1, page - PAGINATION_WINDOW),
+                            min(last_page, page + PAGINATION_WINDOW) + 1):
+            if number == page:
+                links.append('<li class="active"><span>{0}</span></li>'.format(number))
+            else:
+                links.append('<li><a href="{0}">{1}</a></li>'.format(page_url(number), number))
+        if page + PAGINATION_WINDOW < last_page:
+            links.append('<li class="last"><a href="{0}">{1}</a></li>'.format(
+                page_url(last_page), last_page))
+        if page < last_page:
+            links.append('<li class="next"><a href="{0}">next {1} items &raquo;</a></li>'.format(
+                page_url(page + 1), per_page))
+
+        return '<nav class="pagination"><ul>\n' + '\n'.join(links) + '\n</ul></nav>\n'
+
+    def render_results(self, b_start):
+        rand = random.Random(self.seed + b_start)
+        page = b_start // RESULTS_PER_PAGE + 1
+        hikes = self.catalog[b_start : b_start + RESULTS_PER_PAGE]
+        # Listing the last hikes of the previous page again, as a listing that shifts
+        # while it is paged through does:
+        if self.overlap and b_start:
+            hikes = self.catalog[max(0, b_start - self.overlap) : b_start] + hikes
+        link_rand = random.Random(self.seed * 7919 + b_start)
+
+        items = ''.join(
+            '<div class="search-result-item">\n'
+            '<h3><a class="listitem-title" href="{0}" title="{1}"><span>{1}</span></a></h3>\n'
+            '<div class="region">{2}</div>\n'
+            '</div>\n'.format(self.listed_url(hike, link_rand), hike['title'], hike['region'])
+            for hike in hikes)
+
+        return ('<!DOCTYPE html>\n<html><head><title>Hiking Guide</title></head><body>\n'
+                + _filler(rand, self.page_size // 2)
+                + '<div id="search-result-listing">\n' + items + '</div>\n'
+                + self.render_pagination(page, self.last_page(), self.results_url,
+                                         RESULTS_PER_PAGE)
+                + _filler(rand, self.page_size // 2)
+                + '</body></html>\n')
+
+    def render_trip_reports(self, b_start):
+        page = b_start // REPORTS_PER_PAGE + 1
+        reports = self.all_reports()
+        last_page = max(1, -(-len(reports) // REPORTS_PER_PAGE))
+
+        items = ''.join(
+            '<div class="item">\n'
+            '<h3 class="listitem-title"><a href="{0}/go-hiking/trip-reports/trip_report-{1}.{2}">'
+            'Trip Report</a></h3>\n'
+            '<div class="hike-name"><a href="{3}">{4}</a></div>\n'
+            '<span class="elapsed-time" title="{5}">{5}</span>\n'
+            '</div>\n'.format(self.base_url, report_date.isoformat(), hike['slug'],
+                              self.hike_url(hike), hike['title'],
+                              report_date.strftime('%b %d, %Y').replace(' 0', ' '))
+            for report_date, hike in reports[b_start : b_start + REPORTS_PER_PAGE])
+
+        return ('<!DOCTYPE html>\n<html><head><title>Trip Reports</title></head><body>\n'
+                + '<div id="trip-reports">\n' + items + '</div>\n'
+                + self.render_pagination(page, last_page, self.trip_reports_url,
+                                         REPORTS_PER_PAGE)
+                + '</body></html>\n')
+
+    def render_hike(self, hike):
+        rand = random.Random(self.seed + zlib.crc32(hike['slug'].encode()))
+        ld_json = json.dumps({'@context': 'http://schema.org', '@type': 'Place',
+                              'name': hike['title'],
+                              'geo': {'@type': 'GeoCoordinates',
+                                      'latitude': hike['latitude'],
+                                      'longitude': hike['longitude']}})
+        if hike['dist_type'] == 'of trails':
+            distance = '{0} miles of trails'.format(hike['distance'])
+        else:
+            distance = '{0} miles, {1}'.format(hike['distance'], hike['dist_type'])
+
+        return ('<!DOCTYPE html>\n<html><head><title>{title}</title>\n'
+                '<script type="application/ld+json">{ld_json}</script>\n'
+                '</head><body>\n'
+                '<h1 class="documentFirstHeading">{title}</h1>\n'
+                '<div class="hike-stats">\n'
+                '<div class="hike-stat" id="hike-region"><span><span>{region}</span> &gt; Subregion</span></div>\n'
+                '<div class="hike-stat" id="distance"><span>{distance}</span></div>\n'
+                '<div class="hike-stat"><div>Gain: <span>{gain:g}</span> feet</div>'
+                '<div>Highest Point: <span>{highest:g}</span> feet</div></div>\n'
+                '</div>\n'
+                '<div class="hike-rating"><div class="current-rating">{rating} out of 5</div>'
+                '<div class="rating-count">({rating_count} votes)</div></div>\n'
+                '<div id="hike-body-text">\n{filler}</div>\n'
+                '</body></html>\n').format(
+                    title = hike['title'], ld_json = ld_json, region = hike['region'],
+                    distance = distance, gain = hike['gain'], highest = hike['highest'],
+                    rating = hike['rating'], rating_count = hike['rating_count'],
+                    filler = _filler(rand, self.page_size))
+
+    def render_reports(self, hike):
+        rand = random.Random(self.seed + zlib.crc32(hike['slug'].encode()) + 1)
+        items = ''.join(
+            '<div class="item">\n'
+            '<h3 class="listitem-title"><a href="{0}/go-hiking/trip-reports/trip_report-{1}">{2}</a></h3>\n'
+            '<span class="elapsed-time" title="{3}">{3}</span>\n'
+            '<p class="report-text">{4}</p>\n'
+            '</div>\n'.format(self.base_url, report_date.isoformat(), hike['title'],
+                              report_date.strftime('%b %d, %Y').replace(' 0', ' '),
+                              ' '.join(rand.choice(WORDS) for _ in range(120)))
+            for report_date in hike['report_dates'])
+
+        return ('<!DOCTYPE html>\n<html><head><title>Trip Reports</title></head><body>\n'
+                '<div class="trip-report-count"><span class="count-data">{0}</span> Trip Reports</div>\n'
+                '<div id="trip-reports">\n{1}</div>\n'
+                '</body></html>\n').format(hike['report_count'], items)
+
+    def render(self, path, query):
+        """Returns (status, body) for a request path and parsed query string. For a
+        redirect, the body is the URL redirected to."""
+
+        if path.rstrip('/') == '/go-outside/hikes':
+            b_start = int(query.get('b_start:int', ['0'])[0])
+            return 200, self.render_results(b_start)
+
+        if path.rstrip('/') == '/go-hiking/trip-reports':
+            b_start = int(query.get('b_start:int', ['0'])[0])
+            return 200, self.render_trip_reports(b_start)
+
+        # Redirecting the older '/go-outside/hikes/<hike>' paths:
+        if path.startswith('/go-outside/hikes/') and path.rstrip('/') != '/go-outside/hikes':
+            return 301, '{0}/go-hiking/hikes/{1}'.format(self.base_url,
+                                                         path[len('/go-outside/hikes/'):])
+
+        if path.startswith('/go-hiking/hikes/'):
+            slug = path[len('/go-hiking/hikes/'):]
+            reports = slug.endswith('/@@related_tripreport_listing')
+            slug = slug.replace('/@@related_tripreport_listing', '').rstrip('/')
+            # Redirecting the old slugs of renamed hikes:
+            if slug in self.renamed:
+                return 301, self.hike_url(self.renamed[slug]) + (
+                    '/@@related_tripreport_listing' if reports else '')
+            hike = self.by_slug.get(slug)
+            if hike is not None:
+                return 200, self.render_reports(hike) if reports else self.render_hike(hike)
+
+        return 404, '<html><body><h1>Not Found</h1></body></html>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves StubSite pages over HTTP/1.1 with keep-alive."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, so send them without Nagle delays.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Called once per connection: simulate the TCP and TLS handshake round trips.
+        super().setup()
+        self.server.connection_count += 1
+        if self.server.connect_latency:
+            time.sleep(self.server.connect_latency)
+
+    def handle(self):
+        # A client that stops reading a response early resets the connection.
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass
+
+    def do_GET(self):
+        with self.server.in_flight_lock:
+            self.server.in_flight += 1
+            self.server.max_in_flight_seen = max(self.server.max_in_flight_seen,
+                                                 self.server.in_flight)
+            throttle = (self.server.max_in_flight is not None
+                        and self.server.in_flight > self.server.max_in_flight)
+        try:
+            self.respond(throttle)
+        finally:
+            with self.server.in_flight_lock:
+                self.server.in_flight -= 1
+
+    def respond(self, throttle):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        self.server.request_count += 1
+        # Throttle requests beyond max_in_flight, as a busy site would:
+        if throttle:
+            self.server.throttled_count += 1
+            self.send_response(429)
+            self.send_header('Retry-After', str(self.server.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if self.path == '/robots.txt' and self.server.robots_txt is not None:
+            payload = self.server.robots_txt.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        # Inject errors into a share of the responses:
+        if self.server.error_rate and self.server.inject_error():
+            self.server.error_count += 1
+            if not self.server.error_status:
+                # Drop the connection without a response.
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            self.send_response(self.server.error_status)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        parsed = urlparse(self.path)
+        status, body = self.server.site.render(parsed.path, parse_qs(parsed.query))
+        if status in (301, 302, 307, 308):
+            self.server.redirect_count += 1
+            self.send_response(status)
+            self.send_header('Location', body)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        payload = body.encode('utf-8')
+        etag = '"{0:08x}"'.format(zlib.crc32(payload))
+
+        # Answer conditional requests for unchanged pages with '304 Not Modified'.
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.server.not_modified_count += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        if status == 200:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.send_body(payload)
+
+    def send_body(self, payload):
+        if not self.server.bandwidth:
+            self.wfile.write(payload)
+            self.server.bytes_sent += len(payload)
+            return
+        # Pace the body to the bandwidth, stopping when the client hangs up:
+        for start in range(0, len(payload), BANDWIDTH_PIECE_SIZE):
+            piece = payload[start : start + BANDWIDTH_PIECE_SIZE]
+            time.sleep(len(piece) / self.server.bandwidth)
+            try:
+                self.wfile.write(piece)
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+                return
+            self.server.bytes_sent += len(piece)
+
+    def log_message(self, format, *args):
+        pass
+
+
+#*************************************************************************************
+# Method: start_site_server(Object, Float, Float, Float, Integer, Integer, String, Integer,
+#                           Integer, Float)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Serves a site (any object with a 'base_url' attribute and a render(path, query)
+# method) on a free local port in a background thread and returns the server along
+# with its base URL. A share of the responses, 'error_rate', can be replaced with
+# 'error_status' errors (sent with 'Retry-After: 0') or, with an error_status of 0,
+# with dropped connections. Errors are drawn from a random generator seeded with
+# 'seed', so the same requests fail on every run. 'robots_txt' is served as the
+# site's robots.txt, e.g. with a Crawl-delay line and, with 'max_in_flight', requests
+# beyond that many at once are answered with '429 Too Many Requests' and a
+# 'Retry-After' of 'retry_after' seconds. With a 'bandwidth', in bytes per second,
+# response bodies are paced to it and, server.bytes_sent counts the body bytes that
+# were actually sent. Call server.shutdown() when finished.
+#*************************************************************************************
+def start_site_server(site, latency = 0.0, connect_latency = 0.0, error_rate = 0.0,
+                      error_status = 503, seed = 0, robots_txt = None,
+                      max_in_flight = None, retry_after = 1, bandwidth = None):
+    """Serves a site locally and returns (server, base_url)."""
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.connect_latency = connect_latency
+    server.error_rate = error_rate
+    server.error_status = error_status
+    server.connection_count = 0
+    server.request_count = 0
+    server.not_modified_count = 0
+    server.error_count = 0
+    server.redirect_count = 0
+    server.robots_txt = robots_txt
+    server.max_in_flight = max_in_flight
+    server.retry_after = retry_after
+    server.in_flight = 0
+    server.max_in_flight_seen = 0
+    server.throttled_count = 0
+    server.bandwidth = bandwidth
+    server.bytes_sent = 0
+    server.in_flight_lock = threading.Lock()
+    error_random = random.Random(seed)
+    error_lock = threading.Lock()
+
+    def inject_error():
+        with error_lock:
+            return error_random.random() < server.error_rate
+
+    server.inject_error = inject_error
+    server.site = site
+    base_url = 'http://127.0.0.1:{0}'.format(server.server_address[1])
+    server.site.base_url = base_url
+
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    return server, base_url
+
+
+#*************************************************************************************
+# Method: start_stub_server(Integer, Float, Integer, Integer, Float, Float, Integer,
+#                           String, Integer, Integer, Float, Float, Integer, Float)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Starts a StubSite server on a free local port in a background thread and returns
+# the server along with its base URL. 'alias_rate' is the share of hike links given
+# in an alias form, 'overlap' the number of hikes listed again at the top of the next
+# results page and, 'renamed_rate' the share of hikes linked under an old slug that
+# redirects to their new one. server.redirect_count counts the redirects sent. Call
+# server.shutdown() when finished.
+#*************************************************************************************
+def start_stub_server(num_hikes = 100, latency = 0.0, page_size = 30000, seed = 0,
+                      connect_latency = 0.0, error_rate = 0.0, error_status = 503,
+                      robots_txt = None, max_in_flight = None, retry_after = 1,
+                      bandwidth = None, alias_rate = 0.0, overlap = 0, renamed_rate = 0.0):
+    """Starts a local stub of www.wta.org and returns (server, base_url)."""
+
+    site = StubSite(num_hikes, page_size, seed, alias_rate = alias_rate, overlap = overlap,
+                    renamed_rate = renamed_rate)
+    return start_site_server(site, latency = latency,
+                             connect_latency = connect_latency, error_rate = error_rate,
+                             error_status = error_status, seed = seed,
+                             robots_txt = robots_txt, max_in_flight = max_in_flight,
+                             retry_after = retry_after, bandwidth = bandwidth)
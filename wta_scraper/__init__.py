@@ -0,0 +1,27 @@
+# wta-scraper/wta_scraper/__init__.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# The wta_scraper package. The scraper itself lives in wta_scraper.scraper and, the
+# 'wta-scraper' command line in wta_scraper.cli. The names of the scraper module are
+# also available from the package, e.g. 'wta_scraper.main()', and are looked up on
+# first use so that importing the package stays cheap.
+#*************************************************************************************
+import importlib
+
+__version__ = '2.0.0'
+
+
+def __getattr__(name):
+    """Returns a name of the wta_scraper.scraper module, importing it on first use."""
+
+    if name.startswith('__'):
+        raise AttributeError("module 'wta_scraper' has no attribute '{0}'".format(name))
+
+    scraper = importlib.import_module(__name__ + '.scraper')
+    if name == 'scraper':
+        return scraper
+    try:
+        return getattr(scraper, name)
+    except AttributeError:
+        raise AttributeError("module 'wta_scraper' has no attribute '{0}'".format(name)) from None
@@ -0,0 +1,9 @@
+# wta-scraper/wta_scraper/__main__.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# Runs the 'wta-scraper' command line with 'python3 -m wta_scraper'.
+#*************************************************************************************
+from wta_scraper.cli import main
+
+main()
@@ -0,0 +1,283 @@
+# wta-scraper/wta_scraper/cli.py
+#*************************************************************************************
+# File Description
+# ------------------------------------------------------------------------------------
+# The 'wta-scraper' command line. Each command calls the matching function in
+# wta_scraper.scraper:
+#
+#       Command                                      Description
+# ----------------------------------  ------------------------------------------------
+# crawl (default)                     Scrapes every hike into a new snapshot, main().
+#
+# refresh                             Scrapes some hikes again and merges them into
+#                                     the latest snapshot, refresh_hikes().
+#
+# export                              Writes a stored snapshot in other formats,
+#                                     export_snapshot().
+#
+# stats                               Summarizes the snapshots, run report, work
+#                                     queue and checkpoint in RESULTS_PATH,
+#                                     get_run_stats().
+#
+# coordinate / work / merge           Run a distributed crawl, coordinate_crawl(),
+#                                     run_worker() and merge_shards().
+#
+# diff / history                      Compare snapshots and, show or rebuild the
+#                                     history store.
+#
+# Importing this module and building the parser does not import pandas, numpy,
+# Requests or lxml (see LazyModule), so '--help', 'stats' and argument errors answer
+# right away.
+#
+# Usage
+# ------------------------------------------------------------------------------------
+#   wta-scraper [--results-path PATH] [COMMAND] [OPTIONS]
+#   python3 -m wta_scraper [--results-path PATH] [COMMAND] [OPTIONS]
+#*************************************************************************************
+import argparse
+import json
+import os
+import sys
+
+from wta_scraper import scraper
+
+COMMANDS = ['crawl', 'refresh', 'export', 'stats', 'coordinate', 'work', 'merge', 'diff',
+            'history']
+# The commands that write to the results folder, which is created for them. The
+# others only read it, so a mistyped '--results-path' does not leave a folder behind:
+WRITING_COMMANDS = ['crawl', 'refresh', 'export', 'coordinate', 'work', 'merge', 'history']
+
+
+#*************************************************************************************
+# Method: build_parser()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the argument parser of the 'wta-scraper' command line, with a sub-parser
+# for each of COMMANDS.
+#*************************************************************************************
+def build_parser():
+    """Returns the argument parser of the 'wta-scraper' command line."""
+
+    parser = argparse.ArgumentParser(prog = 'wta-scraper',
+                                     description = 'Washington Trails Association Web Scraper')
+    parser.add_argument('--results-path', default = None,
+                        help = 'the folder snapshots, stores and reports are kept in '
+                               '(default: $WTA_RESULTS_PATH or ./Results)')
+    commands = parser.add_subparsers(dest = 'command',
+                                     metavar = '{{{0}}}'.format(','.join(COMMANDS)))
+
+    # Options shared by the commands that fetch hikes, 'crawl', 'refresh' and 'work':
+    fetch_options = argparse.ArgumentParser(add_help = False)
+    fetch_options.add_argument('--incremental', action = 'store_true',
+                               help = 'skip re-parsing pages that have not changed since the '
+                                      'previous run')
+    fetch_options.add_argument('--cache', action = 'store_true',
+                               help = 'reuse fresh responses from the on-disk response cache')
+    fetch_options.add_argument('--progress', action = 'store_true',
+                               help = 'display a live progress line with throughput and ETA')
+    fetch_options.add_argument('--parse-workers', type = int, default = scraper.PARSE_WORKERS,
+                               help = 'parse pages in this many worker processes '
+                                      '(default: parse in the fetching threads)')
+    fetch_options.add_argument('--stream', action = 'store_true', default = scraper.STREAM_PAGES,
+                               help = 'stream hike and trip report pages and stop reading '
+                                      'each one once its data fields are found')
+    report_group = fetch_options.add_mutually_exclusive_group()
+    report_group.add_argument('--bulk-reports', dest = 'report_mode', action = 'store_const',
+                              const = 'bulk', default = 'per-hike',
+                              help = 'harvest trip report data from the site-wide trip '
+                                     'report listing instead of one page per hike')
+    report_group.add_argument('--skip-reports', dest = 'report_mode', action = 'store_const',
+                              const = 'skip',
+                              help = 'do not gather trip report counts and dates')
+
+    # Options shared by the commands that write snapshots, 'crawl', 'refresh', 'export'
+    # and 'merge':
+    output_options = argparse.ArgumentParser(add_help = False)
+    output_options.add_argument('--format', dest = 'output_formats', nargs = '+',
+                                choices = sorted(scraper.WRITERS), default = None,
+                                help = 'snapshot formats to write (default: {0})'.format(
+                                    ' '.join(scraper.OUTPUT_FORMATS)))
+
+    crawl_parser = commands.add_parser('crawl', parents = [fetch_options, output_options],
+                                       help = 'scrape every hike into a new snapshot (default)')
+    crawl_parser.add_argument('--resume', action = 'store_true',
+                              help = 'continue an interrupted run from its last committed hike')
+
+    refresh_parser = commands.add_parser('refresh', parents = [fetch_options, output_options],
+                                         help = 'scrape some hikes again and merge them into '
+                                                'the latest snapshot')
+    refresh_parser.add_argument('urls', nargs = '*', metavar = 'URL',
+                                help = 'hike URLs to refresh')
+    refresh_parser.add_argument('--urls-file', default = None,
+                                help = 'a file listing hike URLs to refresh, one per line')
+    refresh_parser.add_argument('--region', dest = 'regions', nargs = '+', default = None,
+                                help = 'refresh the hikes of these regions')
+    refresh_parser.add_argument('--stale-days', type = int, default = None,
+                                help = 'refresh hikes whose latest trip report is more than '
+                                       'this many days old')
+
+    export_parser = commands.add_parser('export', parents = [output_options],
+                                        help = 'write a stored snapshot in other formats')
+    export_parser.add_argument('snapshot_date', nargs = '?', default = None, metavar = 'DATE',
+                               help = 'the snapshot date (default: most recent)')
+
+    stats_parser = commands.add_parser('stats',
+                                       help = 'summarize the snapshots, run report, work queue '
+                                              'and checkpoint in the results folder')
+    stats_parser.add_argument('--json', action = 'store_true',
+                              help = 'print the summary as JSON')
+
+    commands.add_parser('coordinate',
+                        help = 'discover every hike and publish it to the work queue of a '
+                               'distributed crawl')
+    work_parser = commands.add_parser('work', parents = [fetch_options],
+                                      help = 'scrape hikes leased from the work queue into '
+                                             'record shards until none are left')
+    work_parser.add_argument('--worker-id', default = None,
+                             help = 'the name of this worker (default: host name and process ID)')
+    work_parser.add_argument('--lease-size', type = int, default = scraper.WORK_LEASE_SIZE,
+                             help = 'hikes leased at once (default: {0})'.format(
+                                 scraper.WORK_LEASE_SIZE))
+    work_parser.add_argument('--lease-seconds', type = float, default = scraper.WORK_LEASE_SECONDS,
+                             help = 'seconds before a lease that is not renewed expires '
+                                    '(default: {0})'.format(scraper.WORK_LEASE_SECONDS))
+    commands.add_parser('merge', parents = [output_options],
+                        help = 'combine the record shards of a distributed crawl into its '
+                               'snapshot')
+
+    diff_parser = commands.add_parser('diff',
+                                      help = 'list the hikes added, removed or changed '
+                                             'between two snapshots')
+    diff_parser.add_argument('old_date', nargs = '?', default = None,
+                             help = 'the older snapshot date (default: second most recent)')
+    diff_parser.add_argument('new_date', nargs = '?', default = None,
+                             help = 'the newer snapshot date (default: most recent)')
+    diff_parser.add_argument('--output', dest = 'delta_path', default = None,
+                             help = 'path of the delta file (default: in RESULTS_PATH)')
+    diff_parser.add_argument('--no-delta', dest = 'delta_path', action = 'store_const',
+                             const = '', help = 'print the summary without writing a delta file')
+
+    history_parser = commands.add_parser('history', help = 'show or rebuild the history store')
+    history_parser.add_argument('--rebuild', action = 'store_true',
+                                help = 'rebuild the history store from every CSV snapshot')
+
+    return parser
+
+
+#*************************************************************************************
+# Method: insert_default_command(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the arguments with 'crawl' inserted after the global options when no
+# command is given, e.g. 'wta-scraper --resume' runs 'wta-scraper crawl --resume'.
+#*************************************************************************************
+def insert_default_command(argv):
+    """Returns the arguments with 'crawl' inserted when no command is given."""
+
+    argv = list(argv)
+    index = 0
+    while index < len(argv) and argv[index] not in COMMANDS:
+        if argv[index] in ('-h', '--help'):
+            return argv
+        if argv[index] == '--results-path':
+            index += 2
+        elif argv[index].startswith('--results-path='):
+            index += 1
+        else:
+            break
+
+    if index >= len(argv) or argv[index] not in COMMANDS:
+        argv.insert(min(index, len(argv)), 'crawl')
+    return argv
+
+
+#*************************************************************************************
+# Method: main(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The entry point of the 'wta-scraper' command. Parses the arguments and, runs the
+# command. A UsageError raised by a command, for example for a missing snapshot, is
+# reported as a usage error. Any other error is raised with its traceback.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# list            argv                The command line arguments or, None for
+#                                     sys.argv[1:].
+#*************************************************************************************
+def main(argv = None):
+    """Runs the 'wta-scraper' command line.
+
+    Arguments
+    ---------
+    1. argv {list} -- The command line arguments, or None for sys.argv[1:].
+    """
+
+    parser = build_parser()
+    args = parser.parse_args(insert_default_command(sys.argv[1 : ] if argv is None else argv))
+    if args.results_path is not None:
+        scraper.set_results_path(args.results_path)
+
+    try:
+        run_command(args)
+    except scraper.UsageError as error:
+        parser.error(str(error))
+
+
+def run_command(args):
+    """Runs the command of parsed command line arguments."""
+
+    # Creating the results folder before any store, journal or queue is opened in it:
+    if args.command in WRITING_COMMANDS:
+        os.makedirs(scraper.RESULTS_PATH, exist_ok = True)
+
+    if args.command == 'diff':
+        scraper.diff_snapshots(args.old_date, args.new_date, args.delta_path)
+    elif args.command == 'refresh':
+        urls = list(args.urls)
+        if args.urls_file is not None:
+            with open(args.urls_file) as urls_file:
+                urls.extend(line.strip() for line in urls_file
+                            if line.strip() and not line.startswith('#'))
+        scraper.refresh_hikes(urls = urls, regions = args.regions, stale_days = args.stale_days,
+                              incremental = args.incremental, cache = args.cache,
+                              output_formats = args.output_formats, progress = args.progress,
+                              report_mode = args.report_mode,
+                              parse_workers = args.parse_workers, stream = args.stream)
+    elif args.command == 'export':
+        scraper.export_snapshot(args.snapshot_date, output_formats = args.output_formats)
+    elif args.command == 'stats':
+        stats = scraper.get_run_stats()
+        if args.json:
+            print(json.dumps(stats, indent = 2))
+        else:
+            scraper.print_run_stats(stats)
+    elif args.command == 'coordinate':
+        scraper.coordinate_crawl()
+    elif args.command == 'work':
+        scraper.run_worker(worker_id = args.worker_id, lease_size = args.lease_size,
+                           lease_seconds = args.lease_seconds, incremental = args.incremental,
+                           cache = args.cache, progress = args.progress,
+                           report_mode = args.report_mode, parse_workers = args.parse_workers,
+                           stream = args.stream)
+    elif args.command == 'merge':
+        scraper.merge_shards(output_formats = args.output_formats)
+    elif args.command == 'history':
+        if args.rebuild:
+            scraper.rebuild_history_store()
+        else:
+            history_store = scraper.HistoryStore(scraper.HISTORY_STORE_PATH)
+            scraper.print_history_store(history_store)
+            history_store.close()
+    else:
+        scraper.main(incremental = args.incremental, cache = args.cache, resume = args.resume,
+                     output_formats = args.output_formats, progress = args.progress,
+                     report_mode = args.report_mode, parse_workers = args.parse_workers,
+                     stream = args.stream)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6741 @@
+# wta-scraper/wta_scraper/scraper.py
+#*************************************************************************************
+# Programmer: Yoshio Hasegawa
+# Class Name: None
+# Super Class: None
+#
+# Revision     Date                        Release Comment
+# --------  ----------  --------------------------------------------------------------
+#   1.0     5/1/2019   Initial Release
+#   2.0     10/17/2026 Packaged as wta_scraper, with the wta-scraper command line
+#
+# File Description
+# ------------------------------------------------------------------------------------
+# This is an ETL script that retrieves and organizes hike data from Washington Trails 
+# Association's (WTA) web domain. The primary sub-domain this script explores is, 
+# https://www.wta.org/go-outside/hikes. From this location, hike results page URLs 
+# are retrieved. Then, each individual hike URL is parsed out and stored. Each 
+# individual hike URL is used to gather information found on every hike page hosted 
+# on WTA's website. Finally, this data is formatted into a DataFrame and, that 
+# DataFrame is written to a CSV file. 
+#
+# This script was mostly created for exploratory research and personal interest in
+# local hike data. Washington is full of beautiful places to explore! I simply 
+# wanted to share this information with others :)
+#
+# Methods
+# ------------------------------------------------------------------------------------
+#       Name                                         Description
+# ----------------------------------  ------------------------------------------------
+# refresh_hikes()                     The 'refresh' command: scrapes a subset of hikes
+#                                     again and merges them into the latest snapshot.
+#
+# select_refresh_urls()               Chooses the hikes to refresh by URL, region or
+#                                     trip report staleness.
+#
+# coordinate_crawl()                  The 'coordinate' command: publishes every hike
+#                                     URL to the work queue of a distributed crawl.
+#
+# run_worker()                        The 'work' command: scrapes hikes leased from
+#                                     the work queue into record shards.
+#
+# merge_shards()                      The 'merge' command: combines the record shards
+#                                     into the crawl's snapshot.
+#
+# start_run() / finish_run()          Open and close the stores of a run, update the
+#                                     history store and write the run report.
+#
+# close_run_stores()                  Closes the state store and response cache and,
+#                                     saves the redirect cache.
+#
+# request_priority()                  Returns the scheduling priority of a URL.
+#
+# get_retry_class()                   Defines ThrottleAwareRetry once urllib3 is
+#                                     imported and, returns it.
+#
+# get_session()                       Returns the pooled, retrying Requests session
+#                                     shared by every request.
+#
+# fetch_response()                    Gets the requests response for a given URL.
+#
+# fetch_url()                         Gets the raw response body for a given URL.
+#
+# get_html_rows()                     Gets HTML code for a given website.
+#
+# get_html_tree()                     Gets the parsed HTML document for a given
+#                                     website.
+#
+# parse_html()                        Parses a raw response body into an HTML
+#                                     document tree.
+#
+# first_text()                        Returns the first non-blank text found within
+#                                     a list of elements.
+#
+# extract_hike_fields()               Pulls the data fields found on a hike page.
+#
+# extract_report_fields()             Pulls the data fields found on a trip report
+#                                     page.
+#
+# extract_hike_links()                Pulls the individual hike URLs listed on a
+#                                     hike results page.
+#
+# extract_trip_report_items()         Pulls the hike URL and date of each trip
+#                                     report on a trip report listing page.
+#
+# get_conditional_headers()           Returns the conditional request headers for a
+#                                     URL's stored state.
+#
+# fetch_page()                        Gets a page, along with its stored data fields
+#                                     when it has not changed.
+#
+# fetch_page_streamed()               Streams a page through an incremental parser
+#                                     and stops reading once its data fields are
+#                                     found.
+#
+# match_stream_markers()              Returns the data field markers found on an
+#                                     element as a page is streamed.
+#
+# store_page_fields()                 Saves a page's state and data fields for the
+#                                     next incremental run.
+#
+# get_page_fields()                   Gets a page's data fields, reusing the stored
+#                                     fields of unchanged pages.
+#
+# encode_record() / decode_record()   Converts extracted data fields to and from
+#                                     JSON.
+#
+# extract_results_page_urls()         Builds the URL of every hike results page from
+#                                     a results page's pagination.
+#
+# canonicalize_url()                  Returns the canonical form of a URL, so links
+#                                     to the same page compare equal.
+#
+# discover_hike_urls()                Returns every hike results page URL and every
+#                                     individual hike URL, fetching each results
+#                                     page once and concurrently.
+#
+# get_hike_results_urls_list()        Returns a list of URLs for hike results found 
+#                                     under this sub-domain:
+#                                     'https://www.wta.org/go-outside/hikes'.
+#
+# iter_individual_hike_urls()         Yields individual hike URLs found on hike
+#                                     results pages, one page at a time.
+#
+# get_individual_hike_urls()          Returns a list of individual hike URLs found on
+#                                     hike results pages on WTA's website.
+#
+# fetch_hike_pages()                  Gets a hike's pages without parsing them.
+#
+# parse_pages()                       Parses raw page bodies into data field values;
+#                                     runs in parse worker processes.
+#
+# parse_chunk()                       Runs parse_pages() in a parse worker process,
+#                                     returning the metrics it recorded as well.
+#
+# finish_hike_record()                Combines fetched and parsed data fields into a
+#                                     HikeRecord.
+#
+# get_hike_page_data()                Returns the hike data found on a single hike
+#                                     page and its trip report page.
+#
+# iter_ordered()                      Yields the results of an executor in order,
+#                                     with a bounded number in flight.
+#
+# iter_hike_records()                 Yields a HikeRecord for each individual hike,
+#                                     fetching hikes concurrently.
+#
+# iter_hike_records_multiprocess()    Yields a HikeRecord for each individual hike,
+#                                     parsing pages in worker processes.
+#
+# get_individual_hike_data()          Returns formatted hike data hosted on WTA's
+#                                     website.
+#
+# write_hike_records()                Appends HikeRecords to a CSV file in batches.
+#
+# iter_batches()                      Groups the items of an iterable into batches.
+#
+# get_finished_hike_urls()            Returns the hike URLs already written to a
+#                                     partial CSV file.
+#
+# hold_lease()                        Keeps a work queue lease from expiring while
+#                                     its hikes are scraped.
+#
+# finalize_hike_data()                Sorts streamed hike data by title and writes
+#                                     it with each requested snapshot writer.
+#
+# snapshot_file_path()                Returns the path of a single-file snapshot.
+#
+# hike_table_path()                   Returns the folder of a snapshot's HikeTable.
+#
+# shard_folder_path()                 Returns the folder of a distributed crawl's
+#                                     record shards.
+#
+# set_results_path()                  Moves RESULTS_PATH and every file kept in it.
+#
+# find_previous_snapshot()            Returns the most recent earlier CSV snapshot.
+#
+# build_trip_report_index()           Harvests the site-wide trip report listing
+#                                     into a TripReportIndex.
+#
+# normalize_hike_data()               Converts a batch of raw hike data to explicit
+#                                     column types, counting failures per field.
+#
+# apply_hike_data_schema()            Converts hike data to explicit column types.
+#
+# count_invalid_fields()              Records conversion failures in the run metrics.
+#
+# get_arrow_schema()                  Returns the Arrow schema of Parquet and Arrow
+#                                     snapshots.
+#
+# write_csv_snapshot()                The CSV and JSON snapshot writers.
+# write_json_snapshot()
+#
+# write_arrow_dataset()               Writes a Parquet or Arrow IPC dataset,
+#                                     partitioned by snapshot date and region.
+#
+# get_arrow_partitioning()            Returns the partitioning of snapshot datasets.
+#
+# write_parquet_snapshot()            The Parquet and Arrow IPC snapshot writers.
+# write_arrow_snapshot()
+#
+# write_table_snapshot()              The HikeTable snapshot writer.
+#
+# load_hike_snapshot()                Loads one snapshot from a Parquet or Arrow IPC
+#                                     dataset.
+#
+# load_snapshot_data()                Loads a snapshot as text from the history store
+#                                     or its CSV file.
+#
+# list_snapshot_dates()               Returns the dates of every available snapshot.
+#
+# diff_hike_data()                    Works out the hikes added, removed and changed
+#                                     between two snapshots in one vectorized pass.
+#
+# diff_snapshots()                    The 'diff' command: compares two snapshots and
+#                                     writes a delta file of the changed hikes.
+#
+# rebuild_history_store()             The 'history --rebuild' command: rebuilds the
+# print_history_store()               history store from every CSV snapshot.
+#
+# export_snapshot()                   The 'export' command: writes a stored snapshot
+#                                     in other formats.
+#
+# get_run_stats()                     The 'stats' command: summarizes the snapshots,
+# print_run_stats()                   run report, work queue and checkpoint in
+#                                     RESULTS_PATH.
+#
+# haversine_km()                      Returns great-circle distances in kilometers.
+#
+# wrap_longitudes()                   Splits a longitude range at the antimeridian.
+#
+# write_run_report()                  Writes the metrics recorded during a run to a
+#                                     JSON run report.
+#
+# Classes
+# ------------------------------------------------------------------------------------
+#       Name                                         Description
+# ----------------------------------  ------------------------------------------------
+# UsageError                          Raised when a command cannot run as asked.
+#
+# LazyModule                          Imports a package the first time one of its
+#                                     attributes is used.
+#
+# CrawlScheduler                      Schedules requests to each host with a token
+#                                     bucket, robots.txt crawl delays, AIMD
+#                                     concurrency limits and stage priorities.
+#
+# ThrottleAwareRetry                  Retries requests and reports throttled
+#                                     responses to the scheduler. Defined by
+#                                     get_retry_class().
+#
+# RunMetrics                          Records timers, stage timings and counters for
+#                                     the run report.
+#
+# ProgressDisplay                     Displays a live progress line with throughput
+#                                     and estimated time remaining.
+#
+# StateStore                          Keeps the per-URL state used by incremental
+#                                     runs.
+#
+# ResponseCache                       Caches compressed responses on disk with
+#                                     per-URL-pattern TTLs and LRU eviction.
+#
+# RedirectCache                       Remembers the targets of permanent redirects,
+#                                     so each one is followed once.
+#
+# BloomFilter                         A fixed-size, probabilistic set of strings.
+#
+# UrlFrontier                         Canonicalizes discovered hike URLs and drops
+#                                     duplicates.
+#
+# HikeRecord                          Holds the data of a single hike.
+#
+# TripReportIndex                     Holds trip report counts and latest dates,
+#                                     keyed by hike URL, harvested in bulk.
+#
+# CheckpointJournal                   Journals a crawl's frontier and finished hikes
+#                                     so that an interrupted run can be resumed.
+#
+# WorkQueue                           Leases hike URLs to the workers of a
+#                                     distributed crawl, with expiring leases.
+#
+# HistoryStore                        Keeps every snapshot as slowly changing rows
+#                                     keyed by hike URL and snapshot date.
+#
+# HikeIndex                           Answers nearby and range queries over a
+#                                     snapshot with a spatial grid and sorted
+#                                     numeric indexes.
+#
+# HikeTable                           Holds a snapshot in compact, dictionary-encoded
+#                                     arrays that can be memory-mapped from disk.
+#*************************************************************************************
+# Imported Packages:
+import bisect
+import csv
+import sys
+import json
+import hashlib
+import math
+import heapq
+import importlib
+import importlib.util
+import itertools
+import multiprocessing
+import os
+import re
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlsplit
+
+
+#*************************************************************************************
+# Class: UsageError
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Raised when a command cannot run as asked: no subset of hikes was chosen to refresh,
+# a snapshot date does not exist or, a step of a distributed crawl is run out of
+# order. The 'wta-scraper' command line reports it as a usage error. Any other
+# exception raised by a command is a failure and keeps its traceback. UsageError is a
+# ValueError, so code calling these methods from Python can catch either.
+#*************************************************************************************
+class UsageError(ValueError):
+    """A command was asked for in a way it cannot run."""
+
+
+#*************************************************************************************
+# Class: LazyModule
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Stands in for a heavy package, such as pandas, until one of its attributes is first
+# used. The package is imported then and, the LazyModule replaces itself in this
+# module's globals with the real package, so later uses cost nothing extra. Importing
+# this module therefore stays fast, and short commands such as 'stats' never load
+# pandas, Requests or lxml at all. Submodules that code uses as attributes of the
+# package, such as lxml.html, are imported along with it.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          name                The name of the package to import.
+#
+# String          alias               The global name the package is bound to here.
+#
+# list            submodules          Submodules to import along with the package.
+#*************************************************************************************
+class LazyModule:
+    """A package imported the first time one of its attributes is used.
+
+    Arguments
+    ---------
+    1. name {String} -- The name of the package to import.
+    2. alias {String} -- The global name the package is bound to here.
+    3. submodules {list} -- Submodules to import along with the package.
+    """
+
+    def __init__(self, name, alias = None, submodules = ()):
+        self._name = name
+        self._alias = alias or name
+        self._submodules = submodules
+
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self._name)
+        for submodule in self._submodules:
+            importlib.import_module(submodule)
+        globals()[self._alias] = module
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return '<LazyModule {0!r}>'.format(self._name)
+
+
+# Packages that take a long time to import are imported on first use:
+np = LazyModule('numpy', 'np')
+pd = LazyModule('pandas', 'pd')
+requests = LazyModule('requests', submodules = ['requests.adapters'])
+urllib3 = LazyModule('urllib3')
+lxml = LazyModule('lxml', submodules = ['lxml.etree', 'lxml.html'])
+
+# Initializing the current date for documentation purposes:
+DATE = datetime.now().date()
+# Initializing the URL of the first hike results page:
+HIKES_URL = 'https://www.wta.org/go-outside/hikes'
+# The site-wide trip report listing, newest first:
+TRIP_REPORTS_URL = 'https://www.wta.org/go-hiking/trip-reports'
+# Initializing the project results folder path, from the WTA_RESULTS_PATH environment
+# variable or, the 'Results' folder of the current directory. Use set_results_path()
+# to change it along with every path below that is kept in it:
+RESULTS_PATH = os.environ.get('WTA_RESULTS_PATH', os.path.join(os.getcwd(), 'Results'))
+# Initializing the path of the per-URL state store used by incremental runs:
+STATE_STORE_PATH = os.path.join(RESULTS_PATH, 'wta_state.sqlite')
+# Initializing the folder, size cap and time-to-live rules of the response cache.
+# The first pattern found in a URL sets how many seconds its response stays fresh:
+RESPONSE_CACHE_PATH = os.path.join(RESULTS_PATH, 'response_cache')
+# Initializing the path of the history store of every snapshot, used by 'diff':
+HISTORY_STORE_PATH = os.path.join(RESULTS_PATH, 'wta_history.sqlite')
+# Initializing the path of the checkpoint journal used to resume interrupted runs:
+CHECKPOINT_PATH = os.path.join(RESULTS_PATH, 'wta_crawl.checkpoint')
+# Initializing the path of the work queue shared by the coordinator and workers of a
+# distributed crawl and, the folder of the record shards the workers write:
+WORK_QUEUE_PATH = os.path.join(RESULTS_PATH, 'wta_work_queue.sqlite')
+SHARD_PATH = os.path.join(RESULTS_PATH, 'shards')
+# Initializing the path of the permanent redirect targets kept between runs:
+REDIRECT_CACHE_PATH = os.path.join(RESULTS_PATH, 'wta_redirects.json')
+RESPONSE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+RESPONSE_CACHE_TTLS = [(r'/go-outside/hikes/?(\?|$)', 60 * 60),
+                       (r'/go-hiking/trip-reports/?(\?|$)', 60 * 60),
+                       (r'/@@related_tripreport_listing', 24 * 60 * 60),
+                       (r'/go-(hiking|outside)/hikes/', 7 * 24 * 60 * 60)]
+# Initializing the number of hikes fetched at once by get_individual_hike_data():
+MAX_WORKERS = 8
+# Initializing how hike URLs are canonicalized by canonicalize_url() before they are
+# deduplicated: origins that serve the same site, path prefixes that are aliases of
+# another (regular expression, replacement) and, query parameters that do not change
+# the page (a regular expression matching their names):
+CANONICAL_ORIGINS = {'http://www.wta.org': 'https://www.wta.org',
+                     'http://wta.org': 'https://www.wta.org',
+                     'https://wta.org': 'https://www.wta.org'}
+CANONICAL_PATH_ALIASES = [(r'^/go-outside/hikes/(?=[^/])', '/go-hiking/hikes/')]
+CANONICAL_DROPPED_PARAMS = r'^(utm_\w+|fbclid|gclid|mc_[ce]id)$'
+# Initializing how a UrlFrontier remembers the hike URLs it has seen. None keeps them
+# in a set. A number of URLs keeps them in a BloomFilter sized for that many URLs,
+# which uses a fixed, much smaller amount of memory but drops about one new URL in
+# 1 / FRONTIER_BLOOM_ERROR_RATE as a false duplicate:
+FRONTIER_BLOOM_CAPACITY = None
+FRONTIER_BLOOM_ERROR_RATE = 1e-4
+# Initializing the number of hikes a worker leases from the work queue at once, the
+# seconds after which a lease that is not renewed expires and its hikes are leased
+# again, the number of leases a hike gets before it is given up on and, the seconds
+# an idle worker waits before asking for work again:
+WORK_LEASE_SIZE = 50
+WORK_LEASE_SECONDS = 300
+WORK_MAX_ATTEMPTS = 3
+WORK_POLL_SECONDS = 5
+# Initializing the number of processes that parse hike pages and, the number of hikes
+# sent to a parse process at once. A value of 0 parses pages in the fetching threads:
+PARSE_WORKERS = 0
+PARSE_CHUNK_SIZE = 16
+# Initializing whether hike pages and trip report pages are streamed: read in chunks
+# of STREAM_CHUNK_SIZE bytes through an incremental parser and, closed as soon as
+# every marker of STREAM_FIELD_MARKERS for the page kind has been seen. A marker is
+# an attribute value or label text that an extract_*() method looks for. Closing a
+# page early also closes its connection, so when no more than STREAM_DRAIN_BYTES are
+# left, they are read and dropped instead, keeping the connection for the next page:
+STREAM_PAGES = False
+STREAM_CHUNK_SIZE = 4 * 1024
+STREAM_DRAIN_BYTES = 16 * 1024
+STREAM_FIELD_MARKERS = {'hike': ['documentFirstHeading', 'hike-region', 'distance',
+                                 'Gain:', 'Highest Point:', 'current-rating',
+                                 'rating-count', 'application/ld+json'],
+                        'report': ['count-data', 'elapsed-time']}
+# Initializing the maximum number of requests per second sent to a single host and,
+# the number of requests a host's token bucket lets through at once after an idle
+# period. A value of None disables rate limiting:
+REQUESTS_PER_SECOND = 8
+REQUEST_BURST = 1
+# Initializing whether each host's robots.txt is read for Crawl-delay and Request-rate
+# lines, which slow its requests further when they ask for it:
+ROBOTS_TXT = True
+# Initializing how the number of requests in flight to a host adapts (AIMD). Each
+# host starts at MAX_WORKERS requests in flight. The limit is multiplied by
+# AIMD_DECREASE_FACTOR when the host answers with a THROTTLE_STATUS_CODES status, or
+# when its smoothed latency rises above AIMD_LATENCY_FACTOR times the lowest latency
+# seen (and above AIMD_MIN_LATENCY seconds). Otherwise it grows by AIMD_INCREASE
+# requests per round of successful requests, probing slowly for spare capacity:
+THROTTLE_STATUS_CODES = [429, 503]
+AIMD_DECREASE_FACTOR = 0.5
+AIMD_INCREASE = 0.25
+AIMD_LATENCY_FACTOR = 3
+AIMD_MIN_LATENCY = 1.0
+# Initializing the priority of requests by URL pattern (the first match wins). When
+# requests to a host are waiting, the lowest priority goes first: hike results pages,
+# then hike pages, then trip report pages:
+REQUEST_PRIORITIES = [(r'/go-outside/hikes/?(\?|$)', 0),
+                      (r'/@@related_tripreport_listing', 2),
+                      (r'/go-hiking/trip-reports/?(\?|$)', 2),
+                      (r'/go-(hiking|outside)/hikes/', 1)]
+DEFAULT_REQUEST_PRIORITY = 1
+# Initializing the connect and read timeouts, in seconds, of every request:
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 30
+# Initializing how failed requests are retried. Retry number n waits about
+# RETRY_BACKOFF_FACTOR * 2 ** (n - 1) seconds, plus up to RETRY_BACKOFF_JITTER
+# seconds of random jitter, unless the server sends a Retry-After header:
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 1
+RETRY_BACKOFF_JITTER = 1
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+# Initializing the column names (in order) of the final DataFrame:
+HIKE_DATA_COLUMNS = ['TITLE', 'REGION', 'DISTANCE', 'DIST_TYPE', 'GAIN', 'HIGHEST',
+                     'RATING', 'RATING_COUNT', 'LATITUDE', 'LONGITUDE',
+                     'REPORT_DATE', 'REPORT_COUNT', 'URL']
+# Initializing the columns found on a hike page and on a trip report page:
+HIKE_PAGE_COLUMNS = HIKE_DATA_COLUMNS[ : 10]
+REPORT_PAGE_COLUMNS = ['REPORT_DATE', 'REPORT_COUNT']
+# Initializing the columns holding dates:
+DATE_COLUMNS = ['REPORT_DATE']
+# Initializing the columns holding counts, decimals and categories:
+INTEGER_COLUMNS = ['RATING_COUNT', 'REPORT_COUNT']
+FLOAT_COLUMNS = ['DISTANCE', 'GAIN', 'HIGHEST', 'RATING', 'LATITUDE', 'LONGITUDE']
+CATEGORY_COLUMNS = ['REGION', 'DIST_TYPE']
+# Initializing the format of the trip report dates shown on WTA pages:
+REPORT_DATE_FORMAT = '%b %d, %Y'
+# How trip report counts and dates are gathered: 'per-hike' fetches each hike's
+# trip report page, 'bulk' harvests the site-wide trip report listing and, 'skip'
+# leaves REPORT_COUNT and REPORT_DATE empty.
+REPORT_MODES = ['per-hike', 'bulk', 'skip']
+# Initializing the largest difference between two floats that 'diff' treats as equal:
+DIFF_FLOAT_TOLERANCE = 1e-6
+# Initializing the snapshot formats written at the end of a run (see WRITERS) and,
+# the compression of Parquet and Arrow snapshots ('zstd', 'lz4' or None):
+OUTPUT_FORMATS = ['csv']
+OUTPUT_COMPRESSION = 'zstd'
+# Initializing the number of hike records written to disk at once:
+WRITE_BATCH_SIZE = 50
+# Initializing the size, in kilometers, of the grid cells of a HikeIndex, the mean
+# radius of the Earth and, the key stride between rows of grid cells:
+HIKE_INDEX_CELL_KM = 10
+EARTH_RADIUS_KM = 6371.0088
+GRID_ROW_STRIDE = 1 << 32
+
+
+#*************************************************************************************
+# Method: main()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Method Main, responsible for proper execution of this script.
+#
+# First, all hike results pages are retrieved and, each individual hike URL is
+# parsed out of them and stored. Then, with each individual hike URL, data for each
+# hike page hosted on WTA's website is extracted.
+# Each hike is streamed as a HikeRecord to a partial CSV file in batches, so the
+# hikes loaded so far survive a failed run. The hike URL frontier and each written
+# batch are recorded in a checkpoint journal, so an interrupted run can be resumed
+# without fetching finished hikes again. Whether the run succeeds or fails, the
+# stores opened by start_run() are closed with close_run_stores(). Hikes whose pages could not be retrieved are
+# neither written nor journaled, so they are left out of the snapshot and, a resumed
+# run fetches them again. Finally, the hike data is sorted by hike title and written
+# as a snapshot in each output format (CSV, JSON, Parquet or Arrow).
+# The snapshot's changes are added to the history store used by the 'diff' command.
+# Timings and counters recorded in METRICS are written to a JSON run report.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# None
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Boolean         incremental         If True, the state of every page fetched is kept
+#                                     in STATE_STORE_PATH and, pages that have not
+#                                     changed since the previous run are not parsed
+#                                     again.
+#
+# Boolean         cache               If True, responses are cached on disk in
+#                                     RESPONSE_CACHE_PATH and, fresh cached responses
+#                                     are reused instead of sending a request.
+#
+# Boolean         resume              If True, an interrupted run journaled in
+#                                     CHECKPOINT_PATH is continued from its last
+#                                     committed hike.
+#
+# list            output_formats      The snapshot formats to write, from WRITERS.
+#                                     None writes OUTPUT_FORMATS.
+#
+# Boolean         progress            If True, a live progress line with throughput
+#                                     and estimated time remaining is displayed.
+#
+# String          report_mode         How trip report data is gathered, from
+#                                     REPORT_MODES: 'per-hike', 'bulk' or 'skip'.
+#
+# Integer         parse_workers       The number of parse worker processes. 0 parses
+#                                     pages in the fetching threads.
+#
+# Boolean         stream              If True, hike pages and trip report pages are
+#                                     streamed and, closed once every data field has
+#                                     been found. See fetch_page_streamed().
+#*************************************************************************************
+def main(incremental = False, cache = False, resume = False, output_formats = None,
+         progress = False, report_mode = 'per-hike', parse_workers = PARSE_WORKERS,
+         stream = STREAM_PAGES):
+    """Method Main, responsible for proper execution of this script :)
+    
+    Instruction
+    -----------
+    Please edit the variable, RESULTS_PATH, which specifies the path for 
+    the output of the final DataFrame.
+
+    Arguments
+    ---------
+    1. incremental {Boolean} -- Reuse the data fields of unchanged pages.
+    2. cache {Boolean} -- Reuse fresh responses from the on-disk response cache.
+    3. resume {Boolean} -- Continue an interrupted run from its last committed hike.
+    4. output_formats {list} -- The snapshot formats to write, from WRITERS.
+    5. progress {Boolean} -- Display a live progress line.
+    6. report_mode {String} -- How trip report data is gathered, from REPORT_MODES.
+    7. parse_workers {Integer} -- The number of parse worker processes, or 0.
+    8. stream {Boolean} -- Stream pages, stopping once every data field is found.
+    
+    Raises
+    ------
+    None
+    
+    Returns
+    -------
+    None
+    """
+
+    start_run(incremental, cache)
+    try:
+        # Loading the checkpoint journal of an interrupted run:
+        journal = CheckpointJournal(CHECKPOINT_PATH)
+        checkpoint = journal.load() if resume else None
+        if resume and checkpoint is None:
+            print('No Interrupted Run Found, Starting a New Run...')
+
+        if checkpoint is not None:
+            # Continuing from the last committed hike of the interrupted run. Hikes are
+            # finished once they are journaled or, written to the partial CSV file.
+            snapshot_date = checkpoint['snapshot_date']
+            partial_file_path = snapshot_file_path(snapshot_date, 'csv') + '.partial'
+            all_individual_hike_urls = checkpoint['frontier']
+            finished_hike_urls = checkpoint['done'] | get_finished_hike_urls(partial_file_path)
+            print('\nResuming Run: {0} of {1} Hikes Already Loaded'.format(
+                len(finished_hike_urls), len(all_individual_hike_urls)))
+        else:
+            print('\nGetting All URLs to Hike Results Pages and Individual Hikes...')
+            # Retrieving every hike results page once, collecting all individual hike
+            # URLs along the way:
+            with METRICS.stage('discovery'):
+                all_hike_results_list_urls, all_individual_hike_urls = discover_hike_urls(
+                    HIKES_URL)
+            print('  >> All URLs to Hike Results Pages Found: {0} Total URLs'.format(
+                len(all_hike_results_list_urls)))
+            print('  >> All Individual Hike URLs Extracted: {0} Total URLs'.format(
+                len(all_individual_hike_urls)))
+
+            snapshot_date = DATE
+            partial_file_path = snapshot_file_path(snapshot_date, 'csv') + '.partial'
+            if os.path.exists(partial_file_path):
+                os.remove(partial_file_path)
+            finished_hike_urls = set()
+
+            # Journaling the discovered hike URL frontier:
+            journal.start(snapshot_date, all_individual_hike_urls)
+
+        remaining_hike_urls = [url for url in all_individual_hike_urls
+                               if url not in finished_hike_urls]
+
+        # Harvesting trip report counts and dates in bulk from the trip report listing:
+        report_index = None
+        if report_mode == 'bulk' and remaining_hike_urls:
+            print('\nGetting Trip Report Data...')
+            with METRICS.stage('trip_reports'):
+                report_index = build_trip_report_index(snapshot_date)
+            print('  >> Trip Reports Harvested: {0} Reports on {1} Pages'.format(
+                report_index.reports, report_index.pages))
+
+        # Retrieving, formatting and streaming all remaining individual hike data to a
+        # partial CSV file in batches. Each batch is journaled once it is on disk:
+        print('\nGetting Individual Hike Data...')
+        progress_display = ProgressDisplay(len(remaining_hike_urls)) if progress else None
+        try:
+            with METRICS.stage('hike_data'):
+                hike_records = iter_hike_records(remaining_hike_urls, progress = progress_display,
+                                                 report_index = report_index,
+                                                 skip_reports = report_mode == 'skip',
+                                                 parse_workers = parse_workers, stream = stream)
+                hike_count = write_hike_records(hike_records, partial_file_path,
+                                                on_batch = journal.record_done)
+        except (Exception, KeyboardInterrupt):
+            print('\n>> Run Interrupted, Continue With: wta-scraper --resume <<\n')
+            write_run_report(snapshot_date)
+            raise
+        if progress_display is not None:
+            progress_display.close()
+        print('\nAll Hikes Loaded!\n > ' + str(hike_count + len(finished_hike_urls))
+              + ' Hikes Successfully Loaded\n')
+        failed_count = METRICS.counters.get('hike_fetch_errors', 0)
+        if failed_count:
+            print(' > {0} Hikes Could Not Be Retrieved and Were Left Out\n'.format(failed_count))
+
+        # Writing the hike data, sorted by hike title, with each output format's writer:
+        with METRICS.stage('finalize'):
+            hike_data = finalize_hike_data(partial_file_path, snapshot_date,
+                                           output_formats or OUTPUT_FORMATS)
+        journal.remove()
+
+        finish_run(hike_data, snapshot_date)
+    finally:
+        close_run_stores()
+
+
+#*************************************************************************************
+# Method: refresh_hikes(list, list, Integer, Boolean, Boolean, list, Boolean, String,
+#                       Integer, Boolean)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Refreshes a subset of hikes and merges them into the latest snapshot, without
+# walking the hike results pages. The subset is chosen with select_refresh_urls():
+# a list of hike URLs, the hikes of some regions and/or, the hikes whose latest trip
+# report is older than stale_days days. Only those hikes are fetched, so a refresh
+# takes time in proportion to the subset rather than the catalog. Their new data
+# replaces their rows in the latest snapshot (hikes that are new to the snapshot are
+# added and, hikes whose page could not be read keep their old row) and, the merged
+# hike data is written as today's snapshot in each output format, then added to the
+# history store like any other snapshot. Rows are matched by canonical URL (see
+# canonicalize_url()), so a hike given in an alias form replaces its stored row.
+# The latest snapshot is read from the history store, so it is found whatever
+# output formats it was written in.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# DataFrame       The merged hike data, as text, or None when no hike was selected.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# list            urls                Hike URLs to refresh, or None.
+#
+# list            regions             Regions whose hikes are refreshed, or None.
+#
+# Integer         stale_days          Refresh hikes whose latest trip report is more
+#                                     than this many days old, or None.
+#
+# Boolean         incremental         See main().
+#
+# Boolean         cache               See main().
+#
+# list            output_formats      See main().
+#
+# Boolean         progress            See main().
+#
+# String          report_mode         See main().
+#
+# Integer         parse_workers       See main().
+#
+# Boolean         stream              See main().
+#*************************************************************************************
+def refresh_hikes(urls = None, regions = None, stale_days = None, incremental = False,
+                  cache = False, output_formats = None, progress = False,
+                  report_mode = 'per-hike', parse_workers = PARSE_WORKERS,
+                  stream = STREAM_PAGES):
+    """Refreshes a subset of hikes and merges them into the latest snapshot.
+
+    Arguments
+    ---------
+    1. urls {list} -- Hike URLs to refresh, or None.
+    2. regions {list} -- Regions whose hikes are refreshed, or None.
+    3. stale_days {Integer} -- Refresh hikes with no trip report in this many days.
+    4. incremental {Boolean} -- Reuse the data fields of unchanged pages.
+    5. cache {Boolean} -- Reuse fresh responses from the on-disk response cache.
+    6. output_formats {list} -- The snapshot formats to write, from WRITERS.
+    7. progress {Boolean} -- Display a live progress line.
+    8. report_mode {String} -- How trip report data is gathered, from REPORT_MODES.
+    9. parse_workers {Integer} -- The number of parse worker processes, or 0.
+    10. stream {Boolean} -- Stream pages, stopping once every data field is found.
+
+    Raises
+    ------
+    UsageError -- No subset was given or, there is no snapshot to refresh.
+
+    Returns
+    -------
+    DataFrame -- The merged hike data, as text, or None when no hike was selected.
+    """
+
+    if not urls and not regions and stale_days is None:
+        raise UsageError('Give hike URLs, a region or --stale-days to choose the hikes to refresh')
+
+    # Finding the latest snapshot in the history store, whatever its output formats,
+    # or as a CSV file:
+    history_store = HistoryStore(HISTORY_STORE_PATH) if os.path.exists(HISTORY_STORE_PATH) else None
+    try:
+        snapshot_dates = list_snapshot_dates(history_store)
+        if not snapshot_dates:
+            raise UsageError('No snapshot to refresh in {0}, run a crawl first'.format(
+                RESULTS_PATH))
+        latest_date = snapshot_dates[-1]
+        latest_data = load_snapshot_data(latest_date, history_store)
+    finally:
+        if history_store is not None:
+            history_store.close()
+
+    snapshot_date = DATE
+    refresh_urls = select_refresh_urls(latest_data, urls, regions, stale_days, snapshot_date)
+    if not refresh_urls:
+        print('No Hikes to Refresh in the {0} Snapshot'.format(latest_date))
+        return None
+
+    start_run(incremental, cache)
+    try:
+        print('Refreshing {0} of {1} Hikes in the {2} Snapshot...'.format(
+            len(refresh_urls), len(latest_data), latest_date))
+
+        # Harvesting trip report counts and dates in bulk from the trip report listing:
+        report_index = None
+        if report_mode == 'bulk':
+            with METRICS.stage('trip_reports'):
+                report_index = build_trip_report_index(snapshot_date)
+
+        # Retrieving the subset's hike data, as text, through a temporary CSV file:
+        print('\nGetting Individual Hike Data...')
+        refresh_path = snapshot_file_path(snapshot_date, 'csv') + '.refresh'
+        if os.path.exists(refresh_path):
+            os.remove(refresh_path)
+        progress_display = ProgressDisplay(len(refresh_urls)) if progress else None
+        with METRICS.stage('hike_data'):
+            hike_records = iter_hike_records(refresh_urls, progress = progress_display,
+                                             report_index = report_index,
+                                             skip_reports = report_mode == 'skip',
+                                             parse_workers = parse_workers, stream = stream)
+            write_hike_records(hike_records, refresh_path)
+        if progress_display is not None:
+            progress_display.close()
+        refreshed_data = pd.read_csv(refresh_path, dtype = str)
+        os.remove(refresh_path)
+
+        # Replacing the refreshed hikes' rows in the latest snapshot. Hikes whose page
+        # could not be read (no title found) keep their old row:
+        refreshed_data = refreshed_data[refreshed_data['TITLE'].notna()]
+        failed_count = len(refresh_urls) - len(refreshed_data)
+        METRICS.count('refreshed_hikes', len(refreshed_data))
+        METRICS.count('refresh_failures', failed_count)
+        latest_urls = latest_data['URL'].map(canonicalize_url, na_action = 'ignore')
+        refreshed_urls = refreshed_data['URL'].map(canonicalize_url, na_action = 'ignore')
+        new_count = int((~refreshed_urls.isin(latest_urls)).sum())
+        merged_data = pd.concat([latest_data[~latest_urls.isin(refreshed_urls)],
+                                 refreshed_data], ignore_index = True)
+        print('\n > {0} Hikes Refreshed ({1} New), {2} Could Not Be Read\n'.format(
+            len(refreshed_data), new_count, failed_count))
+
+        # Writing the merged hike data, sorted by hike title, as today's snapshot:
+        partial_file_path = snapshot_file_path(snapshot_date, 'csv') + '.partial'
+        merged_data[HIKE_DATA_COLUMNS].to_csv(partial_file_path, index = False)
+        with METRICS.stage('finalize'):
+            hike_data = finalize_hike_data(partial_file_path, snapshot_date,
+                                           output_formats or OUTPUT_FORMATS)
+
+        finish_run(hike_data, snapshot_date)
+        return hike_data
+    finally:
+        close_run_stores()
+
+
+#*************************************************************************************
+# Method: select_refresh_urls(DataFrame, list, list, Integer, Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Chooses the hikes to refresh from a snapshot. Regions and staleness are matched
+# against every row at once: a hike is chosen when its region starts with one of the
+# given regions (ignoring case) and, when stale_days is given, its latest trip report
+# is more than stale_days days older than the given date. Hikes with no trip report
+# date are not stale. When both filters are given, a hike must match both. Every
+# given URL is refreshed as well, even when it is not in the snapshot yet. URLs are
+# canonicalized with canonicalize_url(), so a hike given in an alias form is only
+# refreshed once, under its canonical URL.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# list            The canonical hike URLs to refresh, without duplicates.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       hike_data           The snapshot's hike data, as text.
+#
+# list            urls                Hike URLs to refresh, or None.
+#
+# list            regions             Regions whose hikes are refreshed, or None.
+#
+# Integer         stale_days          The age, in days, of a stale trip report, or
+#                                     None.
+#
+# Date            today               The date staleness is measured from.
+#*************************************************************************************
+def select_refresh_urls(hike_data, urls = None, regions = None, stale_days = None,
+                        today = DATE):
+    """Returns the URLs of the hikes to refresh.
+
+    Arguments
+    ---------
+    1. hike_data {DataFrame} -- The snapshot's hike data, as text.
+    2. urls {list} -- Hike URLs to refresh, or None.
+    3. regions {list} -- Regions whose hikes are refreshed, or None.
+    4. stale_days {Integer} -- The age, in days, of a stale trip report, or None.
+    5. today {Date} -- The date staleness is measured from.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list -- The canonical hike URLs to refresh, without duplicates.
+    """
+
+    selected = pd.Series(bool(regions) or stale_days is not None, index = hike_data.index)
+    if regions:
+        region_names = hike_data['REGION'].fillna('').str.casefold()
+        selected &= region_names.str.startswith(tuple(region.casefold() for region in regions))
+    if stale_days is not None:
+        report_dates = pd.to_datetime(hike_data['REPORT_DATE'], errors = 'coerce')
+        selected &= (report_dates < pd.Timestamp(today) - pd.Timedelta(days = stale_days)).fillna(False)
+
+    refresh_urls = list(hike_data.loc[selected, 'URL'].dropna()) + [url for url in urls or []
+                                                                     if url.strip()]
+    return list(dict.fromkeys(canonicalize_url(url) for url in refresh_urls))
+
+
+#*************************************************************************************
+# Method: coordinate_crawl()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The coordinator of a distributed crawl. Retrieves every hike results page with
+# discover_hike_urls(), as main() does, and publishes the individual hike URLs found
+# to the work queue in WORK_QUEUE_PATH, replacing any earlier crawl. Old record
+# shards of the same snapshot date are removed. Workers started with run_worker(),
+# on this machine or any other that shares RESULTS_PATH, then scrape the hikes and,
+# merge_shards() writes the snapshot once they are done. The coordinator writes its
+# own run report and, closes its stores even when discovery fails.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Integer         The number of hike URLs published.
+#*************************************************************************************
+def coordinate_crawl():
+    """Discovers every hike URL and publishes it to the work queue of a distributed
+    crawl.
+
+    Arguments
+    ---------
+    None
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Integer -- The number of hike URLs published.
+    """
+
+    start_run()
+    snapshot_date = DATE
+    try:
+        print('\nGetting All URLs to Hike Results Pages and Individual Hikes...')
+        with METRICS.stage('discovery'):
+            all_hike_results_list_urls, all_individual_hike_urls = discover_hike_urls(
+                HIKES_URL)
+        print('  >> All URLs to Hike Results Pages Found: {0} Total URLs'.format(
+            len(all_hike_results_list_urls)))
+
+        shard_folder = shard_folder_path(snapshot_date)
+        if os.path.exists(shard_folder):
+            shutil.rmtree(shard_folder)
+        os.makedirs(shard_folder)
+
+        queue = WorkQueue(WORK_QUEUE_PATH)
+        try:
+            url_count = queue.publish(snapshot_date, all_individual_hike_urls)
+        finally:
+            queue.close()
+        print('  >> Individual Hike URLs Published: {0} URLs to {1}'.format(
+            url_count, WORK_QUEUE_PATH))
+    finally:
+        report_path = os.path.join(RESULTS_PATH, '{0}_coordinator_run_report.json'.format(
+            snapshot_date))
+        write_run_report(snapshot_date, report_path)
+        close_run_stores()
+    print('\nStart Workers With: wta-scraper work')
+    print('Once They Finish: wta-scraper merge\n')
+
+    return url_count
+
+
+#*************************************************************************************
+# Method: run_worker(String, Integer, Float, Boolean, Boolean, Boolean, String,
+#                    Integer, Boolean)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A worker of a distributed crawl. Leases batches of lease_size hike URLs from the
+# work queue until none are left, scraping each batch with iter_hike_records() into
+# a record shard: a CSV file in the snapshot's shard folder, named after the lease.
+# A shard is written under a temporary name and renamed once complete, before its
+# lease is completed, so a worker that crashes leaves no shard behind and, its
+# hikes are leased again once the lease expires. Hikes whose pages could not be
+# retrieved are not written to the shard and, are put back in the queue when the
+# lease is completed, to be leased again up to WORK_MAX_ATTEMPTS times. While other
+# workers still hold leases, an idle worker waits WORK_POLL_SECONDS between requests
+# for work, so it can pick up the hikes of an expired lease. Each worker writes its
+# own run report and, closes its stores and queue, even when it fails.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Integer         The number of hikes the worker scraped.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          worker_id           The worker's name in the work queue. None uses
+#                                     the host name and process ID.
+#
+# Integer         lease_size          The number of hike URLs leased at once.
+#
+# Float           lease_seconds       The seconds after which a lease that is not
+#                                     renewed expires.
+#
+# Boolean         incremental         See main().
+#
+# Boolean         cache               See main().
+#
+# Boolean         progress            See main().
+#
+# String          report_mode         See main(). With 'bulk', each worker harvests
+#                                     the trip report listing itself.
+#
+# Integer         parse_workers       See main().
+#
+# Boolean         stream              See main().
+#*************************************************************************************
+def run_worker(worker_id = None, lease_size = WORK_LEASE_SIZE,
+               lease_seconds = WORK_LEASE_SECONDS, incremental = False, cache = False,
+               progress = False, report_mode = 'per-hike', parse_workers = PARSE_WORKERS,
+               stream = STREAM_PAGES):
+    """Scrapes hikes leased from the work queue into record shards until none are
+    left.
+
+    Arguments
+    ---------
+    1. worker_id {String} -- The worker's name in the work queue, or None.
+    2. lease_size {Integer} -- The number of hike URLs leased at once.
+    3. lease_seconds {Float} -- The seconds after which a lease expires.
+    4. incremental {Boolean} -- Reuse the data fields of unchanged pages.
+    5. cache {Boolean} -- Reuse fresh responses from the on-disk response cache.
+    6. progress {Boolean} -- Display a live progress line for each lease.
+    7. report_mode {String} -- How trip report data is gathered, from REPORT_MODES.
+    8. parse_workers {Integer} -- The number of parse worker processes, or 0.
+    9. stream {Boolean} -- Stream pages, stopping once every data field is found.
+
+    Raises
+    ------
+    UsageError -- No hike URLs have been published to the work queue.
+
+    Returns
+    -------
+    Integer -- The number of hikes the worker scraped.
+    """
+
+    worker_id = worker_id or '{0}-{1}'.format(socket.gethostname(), os.getpid())
+    queue = WorkQueue(WORK_QUEUE_PATH)
+    snapshot_date = queue.snapshot_date
+    if snapshot_date is None:
+        queue.close()
+        raise UsageError('No hikes published to {0}, run the coordinator first'.format(
+            WORK_QUEUE_PATH))
+
+    start_run(incremental, cache)
+    hike_count = 0
+    try:
+        shard_folder = shard_folder_path(snapshot_date)
+        os.makedirs(shard_folder, exist_ok = True)
+        print('Worker {0}: Scraping Hikes for the {1} Snapshot...'.format(
+            worker_id, snapshot_date))
+
+        # Harvesting trip report counts and dates in bulk from the trip report listing:
+        report_index = None
+        if report_mode == 'bulk':
+            with METRICS.stage('trip_reports'):
+                report_index = build_trip_report_index(snapshot_date)
+
+        while True:
+            lease_id, lease_urls = queue.lease(worker_id, lease_size, lease_seconds)
+            if not lease_urls:
+                counts = queue.counts()
+                if not counts['pending'] and not counts['leased']:
+                    break
+                # Waiting for the leases of other workers to complete or expire:
+                time.sleep(WORK_POLL_SECONDS)
+                continue
+
+            # Scraping the leased hikes into a shard, renamed once it is complete:
+            shard_path = os.path.join(shard_folder, '{0}.csv'.format(lease_id))
+            progress_display = ProgressDisplay(len(lease_urls)) if progress else None
+            written_urls = []
+            with hold_lease(queue, lease_id, lease_seconds), METRICS.stage('hike_data'):
+                hike_records = iter_hike_records(lease_urls, progress = progress_display,
+                                                 report_index = report_index,
+                                                 skip_reports = report_mode == 'skip',
+                                                 parse_workers = parse_workers,
+                                                 stream = stream)
+                hike_count += write_hike_records(hike_records, shard_path + '.partial',
+                                                 on_batch = written_urls.extend)
+            if progress_display is not None:
+                progress_display.close()
+            if os.path.exists(shard_path + '.partial'):
+                os.replace(shard_path + '.partial', shard_path)
+            # Putting the hikes that could not be retrieved back in the queue:
+            queue.complete(lease_id, written_urls)
+            METRICS.count('work_queue.shards')
+    finally:
+        queue.close()
+        report_path = os.path.join(RESULTS_PATH, '{0}_worker_{1}_run_report.json'.format(
+            snapshot_date, worker_id))
+        write_run_report(snapshot_date, report_path)
+        close_run_stores()
+
+    print('\nWorker {0}: {1} Hikes Scraped\n'.format(worker_id, hike_count))
+    return hike_count
+
+
+#*************************************************************************************
+# Method: merge_shards(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The merge step of a distributed crawl. Once every hike URL in the work queue is
+# done (or has failed), the record shards written by the workers are combined into
+# the crawl's snapshot, written in each output format and added to the history
+# store, as main() does. A hike scraped twice, by a worker whose lease expired and
+# the worker that took its hikes over, appears in two shards; one copy is kept, as
+# matched by canonical URL (see canonicalize_url()). Hikes are put back in crawl
+# order before the snapshot is sorted by title, so the snapshot does not depend on
+# which worker scraped which hike. The shard folder is removed once the snapshot is
+# written.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# DataFrame       The merged hike data, as text.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# list            output_formats      See main().
+#*************************************************************************************
+def merge_shards(output_formats = None):
+    """Combines the record shards of a distributed crawl into its snapshot.
+
+    Arguments
+    ---------
+    1. output_formats {list} -- The snapshot formats to write, from WRITERS.
+
+    Raises
+    ------
+    UsageError -- Nothing was published or, some hikes are not done yet.
+
+    Returns
+    -------
+    DataFrame -- The merged hike data, as text.
+    """
+
+    queue = WorkQueue(WORK_QUEUE_PATH)
+    snapshot_date = queue.snapshot_date
+    counts = queue.counts()
+    crawl_order = {canonicalize_url(url): position for position, url in enumerate(queue.urls())}
+    queue.close()
+    if snapshot_date is None:
+        raise UsageError('No hikes published to {0}, run the coordinator first'.format(
+            WORK_QUEUE_PATH))
+    if counts['pending'] or counts['leased']:
+        raise UsageError('{pending} hikes are pending and {leased} are leased, wait for '
+                         'the workers to finish'.format(**counts))
+
+    shard_folder = shard_folder_path(snapshot_date)
+    shard_paths = sorted(os.path.join(shard_folder, name)
+                         for name in (os.listdir(shard_folder) if os.path.exists(shard_folder) else [])
+                         if name.endswith('.csv'))
+    if not shard_paths:
+        raise UsageError('No shards found in {0}, the {1} crawl may already be merged'.format(
+            shard_folder, snapshot_date))
+
+    start_run()
+    try:
+        print('Merging {0} Shards of {1} Hikes ({2} Failed)...'.format(
+            len(shard_paths), counts['done'], counts['failed']))
+
+        # Combining the shards in crawl order, without duplicate hikes:
+        with METRICS.stage('merge'):
+            shards = [pd.read_csv(shard_path, dtype = str) for shard_path in shard_paths]
+            hike_data = pd.concat(shards, ignore_index = True)
+            hike_urls = hike_data['URL'].map(canonicalize_url, na_action = 'ignore')
+            kept = hike_urls.isin(crawl_order) & ~hike_urls.duplicated(keep = 'last')
+            hike_data, hike_urls = hike_data[kept], hike_urls[kept]
+            hike_data = hike_data.iloc[np.argsort(hike_urls.map(crawl_order).to_numpy(),
+                                                  kind = 'stable')]
+        METRICS.count('work_queue.shards', len(shard_paths))
+        METRICS.count('work_queue.failed', counts['failed'])
+
+        partial_file_path = snapshot_file_path(snapshot_date, 'csv') + '.partial'
+        hike_data[HIKE_DATA_COLUMNS].to_csv(partial_file_path, index = False)
+        print('\nAll Hikes Loaded!\n > ' + str(len(hike_data)) + ' Hikes Successfully Loaded\n')
+        with METRICS.stage('finalize'):
+            hike_data = finalize_hike_data(partial_file_path, snapshot_date,
+                                           output_formats or OUTPUT_FORMATS)
+        shutil.rmtree(shard_folder)
+
+        finish_run(hike_data, snapshot_date)
+        return hike_data
+    finally:
+        close_run_stores()
+
+
+#*************************************************************************************
+# Method: start_run(Boolean, Boolean)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Starts a crawl or refresh run: creates RESULTS_PATH, opens the state store of an
+# incremental run and the on-disk response cache when asked to, opens the redirect
+# cache kept in REDIRECT_CACHE_PATH and, resets METRICS and RATE_LIMITER.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# None
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Boolean         incremental         If True, STATE_STORE is opened.
+#
+# Boolean         cache               If True, RESPONSE_CACHE is opened.
+#*************************************************************************************
+def start_run(incremental = False, cache = False):
+    """Opens the stores used by a run and resets its metrics.
+
+    Arguments
+    ---------
+    1. incremental {Boolean} -- Open the state store of an incremental run.
+    2. cache {Boolean} -- Open the on-disk response cache.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    None
+    """
+
+    print('\n>> Washington Trail Association Web Scraper <<\n')
+
+    # Disabling insecure warnings to avoid printing multiple unnecessary warnings.
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    # Creating the results folder, which every store, journal and snapshot is kept in:
+    os.makedirs(RESULTS_PATH, exist_ok = True)
+
+    # Opening the state store for an incremental run:
+    global STATE_STORE
+    if incremental:
+        STATE_STORE = StateStore(STATE_STORE_PATH)
+
+    # Opening the on-disk response cache:
+    global RESPONSE_CACHE
+    if cache:
+        RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTLS,
+                                       max_bytes = RESPONSE_CACHE_MAX_BYTES)
+
+    # Opening the redirect targets found by earlier runs:
+    global REDIRECT_CACHE
+    REDIRECT_CACHE = RedirectCache(REDIRECT_CACHE_PATH)
+
+    METRICS.reset()
+    RATE_LIMITER.reset()
+
+
+#*************************************************************************************
+# Method: finish_run(DataFrame, Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Finishes a crawl or refresh run once its snapshot is written: adds the snapshot's
+# changes to the history store, writes the run report and, closes the state store and
+# response cache opened by start_run() with close_run_stores().
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# None
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       hike_data           The snapshot's hike data, as text.
+#
+# Date            snapshot_date       The date of the snapshot.
+#*************************************************************************************
+def finish_run(hike_data, snapshot_date):
+    """Updates the history store, writes the run report and closes the run's stores.
+
+    Arguments
+    ---------
+    1. hike_data {DataFrame} -- The snapshot's hike data, as text.
+    2. snapshot_date {Date} -- The date of the snapshot.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    None
+    """
+
+    # Adding the snapshot's changes to the history store:
+    with METRICS.stage('history'):
+        history_store = HistoryStore(HISTORY_STORE_PATH)
+        try:
+            changes = history_store.add_snapshot(hike_data, snapshot_date)
+            print(' > History Store Updated: {added} Added, {removed} Removed, '
+                  '{changed} Changed, {unchanged} Unchanged'.format(**changes))
+        except ValueError as error:
+            print(' > History Store Not Updated: {0}'.format(error))
+        finally:
+            history_store.close()
+
+    # Writing the run report:
+    print(' > Run Report Written: {0}'.format(write_run_report(snapshot_date)))
+
+    close_run_stores()
+    print('\n>> WTA Hike Data Scraping Complete <<\n')
+
+
+#*************************************************************************************
+# Method: close_run_stores()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Prints the counters of the state store and response cache opened by start_run()
+# and, closes them. New redirect targets are saved to REDIRECT_CACHE_PATH. The
+# commands that call start_run() call this method in a 'finally' block, so a failed
+# or interrupted run still closes its stores. Closed stores are skipped, so calling
+# it again does nothing.
+#*************************************************************************************
+def close_run_stores():
+    """Closes the state store, response cache and redirect cache opened by
+    start_run()."""
+
+    global STATE_STORE, RESPONSE_CACHE, REDIRECT_CACHE
+
+    if STATE_STORE is not None:
+        print('Incremental Run: {0} Pages Not Modified, {1} Pages Unchanged, {2} Pages Parsed'.format(
+            STATE_STORE.not_modified, STATE_STORE.unchanged, STATE_STORE.changed))
+        STATE_STORE.close()
+        STATE_STORE = None
+
+    if RESPONSE_CACHE is not None:
+        print('Response Cache: {hits} Hits, {misses} Misses, {evictions} Evictions, '
+              '{entries} Entries ({bytes} Bytes)'.format(**RESPONSE_CACHE.stats()))
+        RESPONSE_CACHE = None
+
+    if REDIRECT_CACHE is not None:
+        REDIRECT_CACHE.save()
+        REDIRECT_CACHE = None
+
+
+#*************************************************************************************
+# Class: CrawlScheduler
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A thread-safe scheduler that decides when each request may be sent, so concurrent
+# fetches stay fast without overloading a host. Each host is given its own:
+#   - Token bucket, refilled at requests_per_second (slowed further by a Crawl-delay
+#     or Request-rate line in the host's robots.txt) and holding up to burst tokens.
+#   - Concurrency limit, adapted with AIMD (additive increase, multiplicative
+#     decrease): halved when the host throttles (429 or 503) or slows down, and
+#     raised by AIMD_INCREASE requests per round of successful requests.
+#   - Pause, set by a throttled response's Retry-After header.
+#   - Queue of waiting requests, served in REQUEST_PRIORITIES order, then first come
+#     first served.
+# Hosts are independent, so waiting on one never delays requests to another. Each
+# decision is counted in METRICS ('scheduler.*' counters and the 'schedule_wait'
+# timer) and report() returns the state of every host for the run report.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Float           requests_per_second The maximum number of requests per second sent
+#                                     to a single host. None disables rate limiting
+#                                     unless robots.txt asks for a crawl delay.
+#
+# Integer         max_concurrency     The largest number of requests in flight to a
+#                                     single host.
+#
+# Integer         burst               The number of tokens a host's bucket holds.
+#*************************************************************************************
+class CrawlScheduler:
+    """A thread-safe, per-host request scheduler.
+
+    Arguments
+    ---------
+    1. requests_per_second {Float} -- The maximum requests per second for one host.
+    2. max_concurrency {Integer} -- The most requests in flight to one host.
+    3. burst {Integer} -- The number of tokens a host's bucket holds.
+    """
+
+    def __init__(self, requests_per_second = None, max_concurrency = MAX_WORKERS,
+                 burst = REQUEST_BURST):
+        self.requests_per_second = requests_per_second
+        self.max_concurrency = max_concurrency
+        self.burst = burst
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+        self.hosts = {}
+
+    def reset(self):
+        """Forgets every host, including its robots.txt and adapted limits."""
+
+        with self._condition:
+            self.hosts = {}
+
+    def _host(self, host):
+        """Returns the state of a host, creating it on first use. Call with the
+        condition held."""
+
+        state = self.hosts.get(host)
+        if state is None:
+            state = {'limit': float(max(1, self.max_concurrency)), 'active': 0,
+                     'tokens': float(self.burst), 'refilled': time.monotonic(),
+                     'paused_until': 0.0, 'waiting': [], 'robots': None,
+                     'crawl_delay': None, 'latency': None, 'latency_floor': None,
+                     'last_decrease': 0.0, 'requests': 0, 'throttled': 0,
+                     'decreases': 0, 'min_limit': float(max(1, self.max_concurrency))}
+            self.hosts[host] = state
+        return state
+
+    def _interval(self, state):
+        """Returns the seconds between requests to a host, or 0 when unlimited."""
+
+        intervals = [state['crawl_delay'] or 0]
+        if self.requests_per_second:
+            intervals.append(1.0 / self.requests_per_second)
+        return max(intervals)
+
+    def _load_robots(self, url, host, state):
+        """Reads the Crawl-delay and Request-rate of a host's robots.txt, once."""
+
+        with self._condition:
+            if state['robots'] is not None:
+                while state['robots'] == 'loading':
+                    self._condition.wait()
+                return
+            state['robots'] = 'loading'
+
+        from urllib.robotparser import RobotFileParser
+
+        crawl_delay = None
+        try:
+            robots_url = '{0}://{1}/robots.txt'.format(urlparse(url).scheme, host)
+            session = get_session()
+            resp = session.get(robots_url, timeout = (CONNECT_TIMEOUT, READ_TIMEOUT))
+            METRICS.count('scheduler.robots_txt')
+            if resp.status_code == 200:
+                robots = RobotFileParser()
+                robots.parse(resp.text.splitlines())
+                user_agent = session.headers.get('User-Agent', '*')
+                request_rate = robots.request_rate(user_agent)
+                delays = [float(robots.crawl_delay(user_agent) or 0)]
+                if request_rate is not None and request_rate.requests:
+                    delays.append(request_rate.seconds / request_rate.requests)
+                crawl_delay = max(delays) or None
+        except Exception:
+            # A robots.txt that cannot be retrieved or parsed asks for no crawl delay:
+            crawl_delay = None
+            METRICS.count('scheduler.robots_txt_errors')
+        finally:
+            # Waking the threads waiting for the robots.txt, whatever happened to it:
+            with self._condition:
+                state['robots'] = 'loaded'
+                state['crawl_delay'] = crawl_delay
+                self._condition.notify_all()
+
+    def acquire(self, url):
+        """Blocks until a request for the given URL may be sent. Every call must be
+        followed by a call to release().
+
+        Arguments
+        ---------
+        1. url {String} -- The URL about to be requested.
+
+        Returns
+        -------
+        None
+        """
+
+        host = urlparse(url).netloc
+        with self._condition:
+            state = self._host(host)
+        if ROBOTS_TXT and state['robots'] != 'loaded':
+            self._load_robots(url, host, state)
+
+        ticket = (request_priority(url), next(self._tickets))
+        start = time.perf_counter()
+        with self._condition:
+            heapq.heappush(state['waiting'], ticket)
+            self._condition.notify_all()
+            while True:
+                timeout = None
+                if state['waiting'][0] == ticket and state['active'] < int(state['limit']):
+                    now = time.monotonic()
+                    interval = self._interval(state)
+                    if interval:
+                        state['tokens'] = min(float(self.burst), state['tokens'] + (now - state['refilled']) / interval)
+                        state['refilled'] = now
+                    if now < state['paused_until']:
+                        timeout = state['paused_until'] - now
+                    elif not interval or state['tokens'] >= 1:
+                        break
+                    else:
+                        timeout = (1 - state['tokens']) * interval
+                self._condition.wait(timeout)
+
+            heapq.heappop(state['waiting'])
+            if self._interval(state):
+                state['tokens'] -= 1
+            state['active'] += 1
+            state['requests'] += 1
+            self._condition.notify_all()
+
+        METRICS.observe('schedule_wait', time.perf_counter() - start)
+
+    def release(self, url, seconds = None, retried = False):
+        """Marks a request as finished and adapts the host's concurrency limit.
+
+        Arguments
+        ---------
+        1. url {String} -- The URL that was requested.
+        2. seconds {Float} -- The request's latency, or None if it failed.
+        3. retried {Boolean} -- Whether the request needed retries.
+
+        Returns
+        -------
+        None
+        """
+
+        with self._condition:
+            state = self._host(urlparse(url).netloc)
+            state['active'] -= 1
+            if seconds is None:
+                self._decrease(state, 'scheduler.errors')
+            elif not retried:
+                # The latency of a retried request includes its backoff, so only
+                # requests answered at the first attempt are measured.
+                if state['latency'] is None:
+                    state['latency'] = seconds
+                else:
+                    state['latency'] = 0.8 * state['latency'] + 0.2 * seconds
+                if state['latency_floor'] is None or seconds < state['latency_floor']:
+                    state['latency_floor'] = seconds
+
+                threshold = max(AIMD_LATENCY_FACTOR * state['latency_floor'], AIMD_MIN_LATENCY)
+                if state['latency'] > threshold:
+                    self._decrease(state, 'scheduler.slowdowns')
+                elif state['limit'] < self.max_concurrency:
+                    previous = int(state['limit'])
+                    state['limit'] = min(float(self.max_concurrency),
+                                         state['limit'] + AIMD_INCREASE / state['limit'])
+                    if int(state['limit']) > previous:
+                        METRICS.count('scheduler.increases')
+            self._condition.notify_all()
+
+    def throttled(self, host, retry_after = None):
+        """Slows a host down after it answered with a THROTTLE_STATUS_CODES status.
+
+        Arguments
+        ---------
+        1. host {String} -- The host, as the network location of its URLs.
+        2. retry_after {Float} -- The seconds the host asked to wait, or None.
+
+        Returns
+        -------
+        None
+        """
+
+        with self._condition:
+            state = self._host(host)
+            state['throttled'] += 1
+            METRICS.count('scheduler.throttled')
+            if retry_after:
+                state['paused_until'] = max(state['paused_until'], time.monotonic() + retry_after)
+                METRICS.count('scheduler.pauses')
+            self._decrease(state, None)
+            self._condition.notify_all()
+
+    def _decrease(self, state, reason):
+        """Multiplies a host's concurrency limit by AIMD_DECREASE_FACTOR, at most
+        once per round trip. Call with the condition held."""
+
+        if reason is not None:
+            METRICS.count(reason)
+        now = time.monotonic()
+        if now - state['last_decrease'] < (state['latency'] or 0):
+            return
+        state['last_decrease'] = now
+        state['limit'] = max(1.0, state['limit'] * AIMD_DECREASE_FACTOR)
+        state['min_limit'] = min(state['min_limit'], state['limit'])
+        state['decreases'] += 1
+        METRICS.count('scheduler.decreases')
+
+    def report(self):
+        """Returns the state of every host as a JSON-serializable dictionary."""
+
+        with self._condition:
+            return {host: {'requests': state['requests'],
+                           'throttled': state['throttled'],
+                           'decreases': state['decreases'],
+                           'concurrency_limit': int(state['limit']),
+                           'min_concurrency_limit': int(state['min_limit']),
+                           'crawl_delay_s': state['crawl_delay'],
+                           'requests_per_second': (round(1 / self._interval(state), 3)
+                                                   if self._interval(state) else None),
+                           'latency_ms': (round(state['latency'] * 1000, 3)
+                                          if state['latency'] is not None else None),
+                           'latency_floor_ms': (round(state['latency_floor'] * 1000, 3)
+                                                if state['latency_floor'] is not None else None)}
+                    for host, state in self.hosts.items()}
+
+
+#*************************************************************************************
+# Method: request_priority(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the scheduling priority of a URL, from the first REQUEST_PRIORITIES pattern
+# it matches, or DEFAULT_REQUEST_PRIORITY. Lower priorities are sent first.
+#*************************************************************************************
+def request_priority(url):
+    """Returns the scheduling priority of a URL (lower is sent first)."""
+
+    for pattern, priority in REQUEST_PRIORITIES:
+        if re.search(pattern, url):
+            return priority
+    return DEFAULT_REQUEST_PRIORITY
+
+
+#*************************************************************************************
+# Method: get_retry_class()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns ThrottleAwareRetry, the urllib3 retry policy of the shared session. It
+# retries like Retry and, tells RATE_LIMITER about every THROTTLE_STATUS_CODES
+# response as soon as it arrives, so the host's other requests are slowed down while
+# this one waits to be retried. The class is defined the first time it is needed,
+# since urllib3 is only imported once a request is sent.
+#*************************************************************************************
+def get_retry_class():
+    """Returns the ThrottleAwareRetry class, defining it on first use."""
+
+    global ThrottleAwareRetry
+    if ThrottleAwareRetry is not None:
+        return ThrottleAwareRetry
+
+    from urllib3.util.retry import Retry
+
+    class ThrottleAwareRetry(Retry):
+        """A urllib3 Retry that reports throttled responses to RATE_LIMITER."""
+
+        def increment(self, method = None, url = None, response = None, error = None,
+                      _pool = None, _stacktrace = None):
+            if response is not None and _pool is not None and response.status in THROTTLE_STATUS_CODES:
+                default_port = {'http': 80, 'https': 443}.get(_pool.scheme)
+                host = _pool.host if _pool.port in (None, default_port) else \
+                    '{0}:{1}'.format(_pool.host, _pool.port)
+                RATE_LIMITER.throttled(host, self.get_retry_after(response))
+
+            return super().increment(method, url, response, error, _pool, _stacktrace)
+
+    return ThrottleAwareRetry
+
+
+# Initializing the retry policy class of the shared session, defined by
+# get_retry_class():
+ThrottleAwareRetry = None
+
+
+# Initializing the scheduler shared by every request this script sends:
+RATE_LIMITER = CrawlScheduler(REQUESTS_PER_SECOND)
+
+
+#*************************************************************************************
+# Class: RunMetrics
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Thread-safe instrumentation for a run. RunMetrics records three kinds of metrics:
+#   - Timers: latency histograms, e.g. 'fetch', 'parse' and 'extract', with fixed
+#     millisecond buckets plus count, total, min, max and approximate percentiles.
+#   - Stages: wall-clock time spent in each stage of main(), e.g. 'discovery'.
+#   - Counters: e.g. 'requests', 'bytes_downloaded', 'cache_hits' and 'retries', and
+#     per-field extraction failures, e.g. 'missing_field.GAIN' for a field not found
+#     on its page and 'invalid_field.GAIN' for a value that could not be converted.
+# Everything recorded is returned by report(), which write_run_report() saves as
+# JSON at the end of a run. The metrics recorded in another process are sent back
+# with snapshot() and, added to this process's with merge().
+#*************************************************************************************
+class RunMetrics:
+    """Thread-safe timers, stage timings and counters for a run."""
+
+    # Upper bounds, in milliseconds, of the latency histogram buckets:
+    BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf')]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Clears every metric and restarts the run clock."""
+
+        self._lock = threading.Lock()
+        self.started = datetime.now()
+        self._clock = time.perf_counter()
+        self.counters = {}
+        self.stages = {}
+        self.timers = {}
+
+    def count(self, name, amount = 1):
+        """Adds an amount to a counter."""
+
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        """Records one duration, in seconds, in a timer's latency histogram."""
+
+        milliseconds = seconds * 1000
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                timer = self.timers[name] = {'count': 0, 'total_ms': 0.0, 'min_ms': milliseconds,
+                                             'max_ms': milliseconds,
+                                             'buckets': [0] * len(self.BUCKETS_MS)}
+            timer['count'] += 1
+            timer['total_ms'] += milliseconds
+            timer['min_ms'] = min(timer['min_ms'], milliseconds)
+            timer['max_ms'] = max(timer['max_ms'], milliseconds)
+            timer['buckets'][bisect.bisect_left(self.BUCKETS_MS, milliseconds)] += 1
+
+    def snapshot(self):
+        """Returns the counters and timers recorded so far, as plain dictionaries
+        that can be sent to another process and added to its metrics with merge()."""
+
+        with self._lock:
+            return {'counters': dict(self.counters),
+                    'timers': {name: dict(timer, buckets = list(timer['buckets']))
+                               for name, timer in self.timers.items()}}
+
+    def merge(self, recorded):
+        """Adds the counters and timers returned by snapshot() to these metrics."""
+
+        with self._lock:
+            for name, amount in recorded['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+            for name, other in recorded['timers'].items():
+                timer = self.timers.get(name)
+                if timer is None:
+                    self.timers[name] = dict(other, buckets = list(other['buckets']))
+                    continue
+                timer['count'] += other['count']
+                timer['total_ms'] += other['total_ms']
+                timer['min_ms'] = min(timer['min_ms'], other['min_ms'])
+                timer['max_ms'] = max(timer['max_ms'], other['max_ms'])
+                timer['buckets'] = [count + other_count for count, other_count
+                                    in zip(timer['buckets'], other['buckets'])]
+
+    @contextmanager
+    def timer(self, name):
+        """A context manager recording the duration of its block in a timer."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @contextmanager
+    def stage(self, name):
+        """A context manager adding the wall-clock time of its block to a stage."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def _percentile(self, timer, fraction):
+        # Returns the upper bound of the bucket holding the given fraction of samples.
+        target = fraction * timer['count']
+        seen = 0
+        for bound, bucket_count in zip(self.BUCKETS_MS, timer['buckets']):
+            seen += bucket_count
+            if seen >= target:
+                return round(min(bound, timer['max_ms']), 3)
+        return round(timer['max_ms'], 3)
+
+    def report(self):
+        """Returns every metric recorded as a JSON-serializable dictionary."""
+
+        with self._lock:
+            timers = {}
+            for name, timer in self.timers.items():
+                timers[name] = {
+                    'count': timer['count'],
+                    'total_s': round(timer['total_ms'] / 1000, 3),
+                    'mean_ms': round(timer['total_ms'] / timer['count'], 3),
+                    'min_ms': round(timer['min_ms'], 3),
+                    'p50_ms': self._percentile(timer, 0.5),
+                    'p90_ms': self._percentile(timer, 0.9),
+                    'p99_ms': self._percentile(timer, 0.99),
+                    'max_ms': round(timer['max_ms'], 3),
+                    'histogram_ms': {('le_' + str(bound)) if bound != float('inf') else 'le_inf': count
+                                     for bound, count in zip(self.BUCKETS_MS, timer['buckets'])}}
+
+            counters = dict(sorted(self.counters.items()))
+            field_failures = {name[len('missing_field.') : ]: count
+                              for name, count in counters.items()
+                              if name.startswith('missing_field.')}
+            invalid_fields = {name[len('invalid_field.') : ]: count
+                              for name, count in counters.items()
+                              if name.startswith('invalid_field.')}
+
+            return {'started': self.started.isoformat(timespec = 'seconds'),
+                    'finished': datetime.now().isoformat(timespec = 'seconds'),
+                    'duration_s': round(time.perf_counter() - self._clock, 3),
+                    'stages_s': {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                    'counters': {name: count for name, count in counters.items()
+                                 if not name.startswith(('missing_field.', 'invalid_field.'))},
+                    'field_failures': field_failures,
+                    'invalid_fields': invalid_fields,
+                    'timers': timers}
+
+
+# Initializing the metrics recorded by every stage of a run:
+METRICS = RunMetrics()
+
+
+#*************************************************************************************
+# Class: ProgressDisplay
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A live, single-line progress display for long runs, showing the number of hikes
+# loaded, the throughput in hikes per second and the estimated time remaining. The
+# line is redrawn at most every 'interval' seconds.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Integer         total               The number of hikes expected.
+#
+# Float           interval            The minimum number of seconds between redraws.
+#*************************************************************************************
+class ProgressDisplay:
+    """A live progress line with throughput and estimated time remaining.
+
+    Arguments
+    ---------
+    1. total {Integer} -- The number of hikes expected.
+    2. interval {Float} -- The minimum number of seconds between redraws.
+    """
+
+    def __init__(self, total, interval = 0.5):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self._start = time.perf_counter()
+        self._last_draw = 0.0
+
+    def update(self, amount = 1):
+        """Adds finished hikes and, redraws the line when it is due."""
+
+        self.done += amount
+        now = time.perf_counter()
+        if now - self._last_draw >= self.interval or self.done >= self.total:
+            self._last_draw = now
+            self.draw(now)
+
+    def draw(self, now = None):
+        """Redraws the progress line in place."""
+
+        elapsed = (now or time.perf_counter()) - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) / rate if rate > 0 else 0.0
+        sys.stdout.write('\r > {0}/{1} Hikes Loaded | {2:.1f} Hikes/s | ETA {3}   '.format(
+            self.done, self.total, rate, time.strftime('%H:%M:%S', time.gmtime(remaining))))
+        sys.stdout.flush()
+
+    def close(self):
+        """Draws the final line and, moves to the next line."""
+
+        self.draw()
+        sys.stdout.write('\n')
+        sys.stdout.flush()
+
+
+#*************************************************************************************
+# Class: StateStore
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A persistent, per-URL state store backed by SQLite and used by incremental runs.
+# For every page fetched, the store keeps the response's ETag and Last-Modified
+# headers, a hash of the response body and the data fields last extracted from the
+# page. These let get_page_fields() send conditional requests and skip re-parsing
+# pages that have not changed since the previous run.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          path                The path of the SQLite database file.
+#*************************************************************************************
+class StateStore:
+    """A persistent, per-URL state store backed by SQLite.
+
+    Arguments
+    ---------
+    1. path {String} -- The path of the SQLite database file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.not_modified = 0
+        self.unchanged = 0
+        self.changed = 0
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread = False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS url_state ('
+            'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+            'content_hash TEXT, record TEXT, fetched_at TEXT)')
+        self._connection.commit()
+
+    def get(self, url):
+        """Returns the stored state for a URL as a dictionary, or None.
+
+        Arguments
+        ---------
+        1. url {String} -- The URL of a previously fetched page.
+
+        Returns
+        -------
+        Dictionary -- The keys 'etag', 'last_modified', 'content_hash' and 'record'.
+        """
+
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT etag, last_modified, content_hash, record '
+                'FROM url_state WHERE url = ?', (url,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {'etag': row[0], 'last_modified': row[1], 'content_hash': row[2],
+                'record': decode_record(row[3])}
+
+    def put(self, url, etag, last_modified, content_hash, record):
+        """Stores the state of a freshly fetched page.
+
+        Arguments
+        ---------
+        1. url {String} -- The URL of the fetched page.
+        2. etag {String} -- The response's ETag header, or None.
+        3. last_modified {String} -- The response's Last-Modified header, or None.
+        4. content_hash {String} -- A hash of the response body.
+        5. record {Dictionary} -- The data fields extracted from the page.
+
+        Returns
+        -------
+        None
+        """
+
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO url_state VALUES (?, ?, ?, ?, ?, ?)',
+                (url, etag, last_modified, content_hash, encode_record(record),
+                 datetime.now().isoformat()))
+            # Commit in batches so that SQLite writes do not slow down the crawl.
+            self._pending_writes += 1
+            if self._pending_writes >= 100:
+                self._connection.commit()
+                self._pending_writes = 0
+
+    def close(self):
+        """Commits any pending writes and closes the database.
+
+        Returns
+        -------
+        None
+        """
+
+        with self._lock:
+            self._connection.commit()
+            self._connection.close()
+
+
+# Initializing the state store used by incremental runs. None disables the store:
+STATE_STORE = None
+
+
+#*************************************************************************************
+# Class: ResponseCache
+#
+# Description
+# ------------------------------------------------------------------------------------
+# An on-disk HTTP response cache used by fetch_response(). Each successful response
+# is stored in its own file, keyed by a hash of the URL: a single line of JSON holding
+# the URL, status, headers and time stored, followed by the zlib-compressed body.
+# Entries expire after a time-to-live chosen by the first pattern in 'ttls' that
+# matches the URL. When the cache grows past 'max_bytes', the least recently used
+# entries are evicted. Hits, misses, expirations and evictions are counted.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          path                The folder the cached responses are kept in.
+#
+# list            ttls                A list of (regular expression, seconds) pairs.
+#                                     The first pattern found in a URL sets the URL's
+#                                     time-to-live.
+#
+# Integer         default_ttl         The time-to-live, in seconds, of URLs matching
+#                                     none of the patterns.
+#
+# Integer         max_bytes           The total size cap of the cache, in bytes.
+#*************************************************************************************
+class ResponseCache:
+    """An on-disk, size-bounded LRU cache of compressed HTTP responses.
+
+    Arguments
+    ---------
+    1. path {String} -- The folder the cached responses are kept in.
+    2. ttls {list} -- (regular expression, seconds) pairs choosing each URL's TTL.
+    3. default_ttl {Integer} -- The TTL, in seconds, of URLs matching no pattern.
+    4. max_bytes {Integer} -- The total size cap of the cache, in bytes.
+    """
+
+    def __init__(self, path, ttls = (), default_ttl = 24 * 60 * 60, max_bytes = 512 * 1024 * 1024):
+        self.path = path
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in ttls]
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        # Index the entries already on disk by their last use: {key: [size, last_used]}.
+        os.makedirs(path, exist_ok = True)
+        self._entries = {}
+        for entry in os.scandir(path):
+            if entry.name.endswith('.cache'):
+                stat = entry.stat()
+                self._entries[entry.name[ : -6]] = [stat.st_size, stat.st_mtime]
+        self.total_bytes = sum(size for size, _ in self._entries.values())
+
+    def ttl(self, url):
+        """Returns the time-to-live, in seconds, for a URL."""
+
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+
+        return self.default_ttl
+
+    def _file_path(self, key):
+        return os.path.join(self.path, key + '.cache')
+
+    def get(self, url):
+        """Returns a cached, unexpired response for a URL, or None.
+
+        Arguments
+        ---------
+        1. url {String} -- The requested URL.
+
+        Returns
+        -------
+        Response -- A requests response rebuilt from the cache, or None.
+        """
+
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        try:
+            with open(self._file_path(key), 'rb') as cache_file:
+                metadata = json.loads(cache_file.readline())
+                body = cache_file.read()
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - metadata['stored_at'] > self.ttl(url):
+            with self._lock:
+                self.expired += 1
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            # Mark the entry as recently used, both in the index and on disk.
+            now = time.time()
+            if key in self._entries:
+                self._entries[key][1] = now
+            try:
+                os.utime(self._file_path(key), (now, now))
+            except OSError:
+                pass
+
+        resp = requests.Response()
+        resp.url = url
+        resp.status_code = metadata['status']
+        resp.headers = requests.structures.CaseInsensitiveDict(metadata['headers'])
+        resp._content = zlib.decompress(body)
+        return resp
+
+    def put(self, url, resp):
+        """Stores a successful response, then evicts least recently used entries
+        until the cache fits within max_bytes.
+
+        Arguments
+        ---------
+        1. url {String} -- The requested URL.
+        2. resp {Response} -- The requests response for the URL.
+
+        Returns
+        -------
+        None
+        """
+
+        if resp.status_code != 200:
+            return
+
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        headers = {name: resp.headers[name] for name in ('ETag', 'Last-Modified', 'Content-Type')
+                   if name in resp.headers}
+        metadata = json.dumps({'url': url, 'status': resp.status_code, 'headers': headers,
+                               'stored_at': time.time()}).encode('utf-8')
+        data = metadata + b'\n' + zlib.compress(resp.content)
+
+        # Write to a temporary file first so that readers never see a partial entry.
+        temporary_path = '{0}.{1}.tmp'.format(self._file_path(key), threading.get_ident())
+        with open(temporary_path, 'wb') as cache_file:
+            cache_file.write(data)
+        os.replace(temporary_path, self._file_path(key))
+
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries[key][0]
+            self._entries[key] = [len(data), time.time()]
+            self.total_bytes += len(data)
+
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = min(self._entries, key = lambda entry: self._entries[entry][1])
+                self.total_bytes -= self._entries.pop(oldest)[0]
+                self.evictions += 1
+                try:
+                    os.remove(self._file_path(oldest))
+                except OSError:
+                    pass
+
+    def stats(self):
+        """Returns the cache counters as a dictionary."""
+
+        return {'hits': self.hits, 'misses': self.misses, 'expired': self.expired,
+                'evictions': self.evictions, 'entries': len(self._entries),
+                'bytes': self.total_bytes}
+
+
+# Initializing the response cache used by fetch_response(). None disables the cache:
+RESPONSE_CACHE = None
+
+
+#*************************************************************************************
+# Class: RedirectCache
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Remembers where permanently moved pages went, so that each redirect is followed
+# once. When fetch_response() reaches a page through permanent redirects only (301 or
+# 308), every URL along the way is mapped to the final URL. Later requests for any of
+# them go straight to the final URL and, a UrlFrontier treats a hike listed under an
+# old URL as the hike it moved to. A page's views move with it: the trip report page
+# of a moved hike, '<old URL>/@@related_tripreport_listing', resolves to the same
+# view of the new URL. Temporary redirects are followed every time and never cached.
+# The redirect targets are kept as JSON in 'path', so later runs skip the redirects
+# found by earlier ones.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          path                The JSON file the redirect targets are kept in,
+#                                     or None to keep them in memory only.
+#*************************************************************************************
+class RedirectCache:
+    """A thread-safe map of permanently redirected URLs to their final URLs.
+
+    Arguments
+    ---------
+    1. path {String} -- The JSON file the redirect targets are kept in, or None.
+    """
+
+    # The statuses of permanent redirects, whose targets are cached:
+    PERMANENT_STATUS_CODES = (301, 308)
+    # The most redirects resolve() follows, in case targets form a cycle:
+    MAX_HOPS = 10
+
+    def __init__(self, path = None):
+        self.path = path
+        self.targets = {}
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            with open(path) as redirect_file:
+                self.targets.update(json.load(redirect_file))
+
+    def _target(self, url):
+        # Returns the target of a URL or, of the page a '/@@' view belongs to.
+        target = self.targets.get(url)
+        if target is None and '/@@' in url:
+            page_url, separator, view = url.partition('/@@')
+            target = self.targets.get(page_url)
+            if target is not None:
+                target = target + separator + view
+        return target
+
+    def resolve(self, url):
+        """Returns the final URL of a permanently redirected URL, or the URL itself.
+
+        Arguments
+        ---------
+        1. url {String} -- The URL to resolve.
+
+        Returns
+        -------
+        String -- The URL the redirects lead to, or the given URL.
+        """
+
+        with self._lock:
+            for _ in range(self.MAX_HOPS):
+                target = self._target(url)
+                if target is None or target == url:
+                    break
+                url = target
+        return url
+
+    def record(self, url, resp):
+        """Caches the final URL of a response reached through permanent redirects.
+
+        Arguments
+        ---------
+        1. url {String} -- The requested URL.
+        2. resp {Response} -- The requests response for the URL.
+
+        Returns
+        -------
+        None
+        """
+
+        if not resp.history or any(hop.status_code not in self.PERMANENT_STATUS_CODES
+                                   for hop in resp.history):
+            return
+
+        with self._lock:
+            for moved_url in [url] + [hop.url for hop in resp.history]:
+                if moved_url != resp.url:
+                    self.targets[moved_url] = resp.url
+            self.recorded += 1
+
+    def save(self):
+        """Merges the redirect targets into the JSON file at 'path', so that workers
+        sharing the file keep each other's targets."""
+
+        if self.path is None or not self.recorded:
+            return
+
+        targets = {}
+        if os.path.exists(self.path):
+            with open(self.path) as redirect_file:
+                targets.update(json.load(redirect_file))
+        with self._lock:
+            targets.update(self.targets)
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok = True)
+        partial_path = '{0}.{1}.partial'.format(self.path, os.getpid())
+        with open(partial_path, 'w') as redirect_file:
+            json.dump(targets, redirect_file, indent = 0, sort_keys = True)
+        os.replace(partial_path, self.path)
+
+    def stats(self):
+        """Returns the cache counters as a dictionary."""
+
+        return {'targets': len(self.targets), 'recorded': self.recorded}
+
+
+# Initializing the redirect cache used by fetch_response() and UrlFrontier, which is
+# opened by start_run(). None follows every redirect:
+REDIRECT_CACHE = None
+
+
+#*************************************************************************************
+# Method: encode_record(Dictionary) / decode_record(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Converts a dictionary of extracted data fields to and from JSON. Extracted fields
+# are raw text, so they are stored as they are; any date is stored as an ISO 8601
+# string, which normalize_hike_data() reads as well as the raw page format.
+#*************************************************************************************
+def encode_record(record):
+    """Returns a dictionary of extracted data fields encoded as a JSON string."""
+
+    return json.dumps(record, default = lambda value: value.isoformat())
+
+
+def decode_record(record_json):
+    """Returns a dictionary of extracted data fields decoded from a JSON string."""
+
+    return json.loads(record_json)
+
+
+#*************************************************************************************
+# Method: get_session()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the Requests session shared by every request this script sends, creating
+# it on first use. The session keeps a pool of HTTP keep-alive connections per host,
+# sized for MAX_WORKERS concurrent requests, so connections (and TLS handshakes) are
+# reused instead of being opened for every page. Connection errors, read errors and
+# the RETRY_STATUS_CODES responses are retried with exponential backoff and jitter,
+# honoring any Retry-After header sent by the server. Compressed responses are
+# requested and, brotli is only offered when a brotli decoder is installed.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Session         The shared Requests session.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# None
+#*************************************************************************************
+def get_session():
+    """Returns the Requests session shared by every request this script sends.
+
+    Arguments
+    ---------
+    None
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Session -- The shared Requests session.
+    """
+
+    global SESSION
+    with SESSION_LOCK:
+        if SESSION is not None:
+            return SESSION
+
+        retry_options = {'total': RETRY_TOTAL, 'backoff_factor': RETRY_BACKOFF_FACTOR,
+                         'status_forcelist': RETRY_STATUS_CODES,
+                         'allowed_methods': ['GET', 'HEAD'],
+                         'respect_retry_after_header': True}
+        retry_class = get_retry_class()
+        try:
+            retries = retry_class(backoff_jitter = RETRY_BACKOFF_JITTER, **retry_options)
+        except TypeError:
+            # urllib3 versions before 2.0 do not support jitter.
+            retries = retry_class(**retry_options)
+
+        adapter = requests.adapters.HTTPAdapter(pool_connections = 4,
+                                                pool_maxsize = max(10, 2 * MAX_WORKERS),
+                                                max_retries = retries)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.verify = False
+
+        accept_encoding = 'gzip, deflate'
+        if importlib.util.find_spec('brotli') or importlib.util.find_spec('brotlicffi'):
+            accept_encoding += ', br'
+        session.headers.update({'Accept-Encoding': accept_encoding,
+                                'Connection': 'keep-alive'})
+
+        SESSION = session
+        return SESSION
+
+
+# Initializing the shared Requests session, which is created by get_session():
+SESSION = None
+SESSION_LOCK = threading.Lock()
+
+
+#*************************************************************************************
+# Method: fetch_response(String, Dictionary)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Using the shared Requests session, this method sends a GET request for a given URL
+# and returns the response. Retryable errors are retried by the session, as set up by
+# get_session(). When RESPONSE_CACHE is set, fresh cached responses are returned without
+# a request and, successful responses are added to the cache. Every request waits
+# for RATE_LIMITER, the CrawlScheduler, first and reports its latency back to it, so
+# this method is safe to call from many threads at once. Redirects are followed and,
+# when REDIRECT_CACHE is set, the targets of permanent redirects are cached, so a URL
+# that has moved is requested at its new URL from then on. A streamed response is
+# returned as soon as its headers arrive, with its body left unread for the caller;
+# streamed responses bypass RESPONSE_CACHE and their latency covers the headers only.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Response        The requests response for the given URL.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL to request.
+#
+# Dictionary      headers             Extra request headers, such as the conditional
+#                                     'If-None-Match' and 'If-Modified-Since' headers.
+#
+# Boolean         stream              If True, the response body is not read. The
+#                                     caller must close the response.
+#*************************************************************************************
+def fetch_response(url, headers = None, stream = False):
+    """This method returns the requests response for a given URL.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL to request.
+    2. headers {Dictionary} -- Extra request headers.
+    3. stream {Boolean} -- Return the response without reading its body.
+
+    Raises
+    ------
+    requests.exceptions.RequestException -- The request failed after every retry.
+
+    Returns
+    -------
+    Response -- The requests response for the given URL.
+    """
+
+    # Requesting the new URL of a page that has moved, rather than following its
+    # redirect again:
+    if REDIRECT_CACHE is not None:
+        target_url = REDIRECT_CACHE.resolve(url)
+        if target_url != url:
+            METRICS.count('redirects_avoided')
+            url = target_url
+
+    # Serving the response from RESPONSE_CACHE, when possible:
+    if RESPONSE_CACHE is not None and not stream:
+        resp = RESPONSE_CACHE.get(url)
+        if resp is not None:
+            METRICS.count('cache_hits')
+            return resp
+        METRICS.count('cache_misses')
+
+    # Getting a requests response from the given URL over the shared session, once
+    # the scheduler allows it:
+    RATE_LIMITER.acquire(url)
+    start = time.perf_counter()
+    try:
+        with METRICS.timer('fetch'):
+            resp = get_session().get(url, headers = headers, stream = stream,
+                                     timeout = (CONNECT_TIMEOUT, READ_TIMEOUT))
+    except requests.exceptions.RequestException:
+        RATE_LIMITER.release(url)
+        raise
+
+    retries = getattr(resp.raw, 'retries', None)
+    retried = retries is not None and bool(retries.history)
+    RATE_LIMITER.release(url, time.perf_counter() - start, retried)
+
+    METRICS.count('requests')
+    METRICS.count('status.{0}'.format(resp.status_code))
+    if retried:
+        METRICS.count('retries', len(retries.history))
+    if resp.history:
+        METRICS.count('redirects', len(resp.history))
+        if REDIRECT_CACHE is not None:
+            REDIRECT_CACHE.record(url, resp)
+    if stream:
+        return resp
+
+    METRICS.count('bytes_downloaded', len(resp.content))
+    if RESPONSE_CACHE is not None:
+        RESPONSE_CACHE.put(url, resp)
+
+    return resp
+
+
+#*************************************************************************************
+# Method: fetch_url(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Retrieves the raw response body for a given URL with fetch_response().
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Bytes           The raw response body for the given URL.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL for the desired response body.
+#*************************************************************************************
+def fetch_url(url):
+    """This method returns the raw response body for a given URL.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL for the desired response body.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Bytes -- The raw response body for the given URL.
+    """
+
+    return fetch_response(url).content
+
+
+#*************************************************************************************
+# Method: get_html_rows(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Using fetch_url() and BeautifulSoup, this method retrieves HTML code for a given URL.
+# The HTML code is split by line and, each line of code is entered as a value in a
+# list. Finally, this list is returned value.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# List            Each value is a line of HTML code for the given URL.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL for the desired HTML code.
+#*************************************************************************************
+def get_html_rows(url):
+    """This method returns HTML code for a given URL as a list. Each value in the list
+    corresponds to each line of the HTML code.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL for the desired HTML code.
+    
+    Raises
+    ------
+    None
+    
+    Returns
+    -------
+    List -- The HTML code for the given URL, split by lines.
+    """
+
+    from bs4 import BeautifulSoup
+
+    # Parsing the response body for the given URL:
+    soup = BeautifulSoup(fetch_url(url), 'html5lib')
+    # Formatting the parsed response:
+    html = soup.prettify()
+    # splitting the formatted HTML code into a list of lines:
+    html_lines_list = html.splitlines()
+
+    return html_lines_list
+
+
+#*************************************************************************************
+# Method: get_html_tree(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Using fetch_url() and lxml, this method retrieves and parses the HTML code for a
+# given URL in a single pass. The parsed document tree is returned so that data
+# fields can be pulled straight from the tree with the extract_*() methods, without
+# re-serializing the document or relying on line offsets.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# HtmlElement     The root element of the parsed HTML document.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL for the desired HTML code.
+#*************************************************************************************
+def get_html_tree(url):
+    """This method returns the parsed HTML document for a given URL.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL for the desired HTML code.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    HtmlElement -- The root element of the parsed HTML document.
+    """
+
+    return parse_html(fetch_url(url), url)
+
+
+#*************************************************************************************
+# Method: parse_html(Bytes, String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Parses a raw response body with lxml's HTML parser. An empty body is parsed as an
+# empty document, so the extract_*() methods simply find no data fields.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# HtmlElement     The root element of the parsed HTML document.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Bytes           content             The raw response body.
+#
+# String          url                 The URL the body was retrieved from. Relative
+#                                     links are resolved against this URL.
+#*************************************************************************************
+def parse_html(content, url = None):
+    """This method parses a raw response body into an HTML document tree.
+
+    Arguments
+    ---------
+    1. content {Bytes} -- The raw response body.
+    2. url {String} -- The URL the body was retrieved from.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    HtmlElement -- The root element of the parsed HTML document.
+    """
+
+    if not content or not content.strip():
+        content = b'<html></html>'
+
+    with METRICS.timer('parse'):
+        return lxml.html.document_fromstring(content, base_url = url)
+
+
+#*************************************************************************************
+# Method: first_text(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the first non-blank text found within a list of elements, searching each
+# element's descendants in document order. Surrounding whitespace is removed.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# String          The first non-blank text found, or None.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# list            elements            A list of elements returned by an XPath query.
+#*************************************************************************************
+def first_text(elements):
+    """Returns the first non-blank text found within a list of elements.
+
+    Arguments
+    ---------
+    1. elements {list} -- A list of elements returned by an XPath query.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    String -- The first non-blank text found, or None.
+    """
+
+    for element in elements:
+        for text in element.itertext():
+            text = text.strip()
+            if text:
+                return text
+
+    return None
+
+
+#*************************************************************************************
+# Method: extract_hike_fields(HtmlElement)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Pulls the hike data fields found on an individual hike page straight from the
+# parsed HTML document: title, region, distance, distance type, gain, highest point,
+# rating, rating count and the geographic location held in the ld+json block. The
+# fields are kept as the raw text found on the page (e.g. a GAIN of '1,200'); they
+# are converted to numbers in batches by normalize_hike_data(), so a malformed value
+# leaves one missing field rather than raising in the middle of a crawl.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Dictionary      The hike page data fields, keyed by DataFrame column name. Any data
+#                 field that could not be found is set to None.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# HtmlElement     tree                The parsed HTML document of a hike page.
+#*************************************************************************************
+def extract_hike_fields(tree):
+    """Pulls the hike data fields found on an individual hike page.
+
+    Arguments
+    ---------
+    1. tree {HtmlElement} -- The parsed HTML document of a hike page.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Dictionary -- The hike page data fields, keyed by DataFrame column name.
+    """
+
+    hike_fields = dict.fromkeys(HIKE_PAGE_COLUMNS)
+
+    # Retrieving the hike title...
+    hike_fields['TITLE'] = first_text(tree.xpath('//*[@*="documentFirstHeading"]'))
+
+    # Retrieving the hike region...
+    hike_fields['REGION'] = first_text(tree.xpath('//*[@*="hike-region"]'))
+
+    # Retrieving the hike distance and distance type...
+    hike_distance_string = first_text(tree.xpath('//*[@*="distance"]'))
+    if hike_distance_string is not None:
+        hike_distance = hike_distance_string
+        if ' mile' in hike_distance_string:
+            hike_distance = hike_distance_string[ : hike_distance_string.find(' mile')]
+        hike_distance_type = None
+        if ',' in hike_distance_string:
+            hike_distance_type = hike_distance_string[hike_distance_string.find(', ') + 2 : ]
+        elif 'of trails' in hike_distance_string:
+            hike_distance_type = hike_distance_string[hike_distance_string.find('of trails') + 3 : ]
+        hike_fields['DISTANCE'] = hike_distance
+        hike_fields['DIST_TYPE'] = hike_distance_type
+
+    # Retrieving the hike gain and highest point. The value is held by the first
+    # element following the 'Gain:' or 'Highest Point:' label...
+    hike_fields['GAIN'] = first_text(tree.xpath('//*[text()[contains(., "Gain:")]]/*[1]'))
+    hike_fields['HIGHEST'] = first_text(tree.xpath('//*[text()[contains(., "Highest Point:")]]/*[1]'))
+
+    # Retrieving the hike rating...
+    rating_string = first_text(tree.xpath('//*[@*="current-rating"]'))
+    if rating_string is not None:
+        hike_fields['RATING'] = rating_string.partition(' out of')[0]
+
+    # Retrieving the hike rating count...
+    rating_count_string = first_text(tree.xpath('//*[@*="rating-count"]'))
+    if rating_count_string is not None:
+        hike_fields['RATING_COUNT'] = rating_count_string[rating_count_string.find('(') + 1 : ].partition(' vote')[0]
+
+    # Retrieving the hike geographic location...
+    for json_string in tree.xpath('//script[@type="application/ld+json"]/text()'):
+        try:
+            hike_json = json.loads(json_string)
+            hike_fields['LATITUDE'] = hike_json['geo']['latitude']
+            hike_fields['LONGITUDE'] = hike_json['geo']['longitude']
+            break
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    return hike_fields
+
+
+#*************************************************************************************
+# Method: extract_report_fields(HtmlElement)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Pulls the trip report count and the most recent trip report date from the parsed
+# HTML document of a hike's '@@related_tripreport_listing' page. Trip reports are
+# listed newest first, so only the first 'elapsed-time' date is read. Both fields are
+# kept as raw text, e.g. 'Apr 25, 2021', for normalize_hike_data() to convert.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Dictionary      The trip report data fields, keyed by DataFrame column name. Any
+#                 data field that could not be found is set to None.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# HtmlElement     tree                The parsed HTML document of a trip report page.
+#*************************************************************************************
+def extract_report_fields(tree):
+    """Pulls the trip report count and most recent trip report date.
+
+    Arguments
+    ---------
+    1. tree {HtmlElement} -- The parsed HTML document of a trip report page.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Dictionary -- The trip report data fields, keyed by DataFrame column name.
+    """
+
+    report_fields = dict.fromkeys(REPORT_PAGE_COLUMNS)
+
+    # Retrieving the hike trip report counts...
+    report_count = first_text(tree.xpath('//*[@*="count-data"]'))
+    report_fields['REPORT_COUNT'] = report_count
+
+    # Retrieving the most recent hike trip report date...
+    report_dates = tree.xpath('(//*[@*="elapsed-time"])[1]/@title')
+    if report_dates:
+        report_fields['REPORT_DATE'] = report_dates[0].strip() or None
+
+    return report_fields
+
+
+#*************************************************************************************
+# Method: extract_hike_links(HtmlElement)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Pulls the individual hike URLs listed on a parsed hike results page. Relative links
+# are resolved against the URL the page was retrieved from.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# list            A list of URLs that route to individual hike pages.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# HtmlElement     tree                The parsed HTML document of a hike results page.
+#*************************************************************************************
+def extract_hike_links(tree):
+    """Pulls the individual hike URLs listed on a hike results page.
+
+    Arguments
+    ---------
+    1. tree {HtmlElement} -- The parsed HTML document of a hike results page.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list -- A list of URLs that route to individual hike pages.
+    """
+
+    return [urljoin(tree.base_url or '', href)
+            for href in tree.xpath('//a[contains(@class, "listitem-title")]/@href')]
+
+
+#*************************************************************************************
+# Method: extract_trip_report_items(HtmlElement)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Pulls the hike URL and report date of each trip report listed on a parsed page of
+# the site-wide trip report listing. Each trip report links to the hike it was
+# written for. Trip reports without a hike link or a report date are skipped.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# list            A list of (hike URL, report date) tuples, in listing order.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# HtmlElement     tree                The parsed HTML document of a trip report
+#                                     listing page.
+#*************************************************************************************
+def extract_trip_report_items(tree):
+    """Pulls the hike URL and report date of each trip report on a listing page.
+
+    Arguments
+    ---------
+    1. tree {HtmlElement} -- The parsed HTML document of a trip report listing page.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list -- A list of (hike URL, report date) tuples, in listing order.
+    """
+
+    report_items = []
+    for item in tree.xpath('//*[contains(concat(" ", normalize-space(@class), " "), " item ")]'):
+        hike_links = item.xpath('.//a[contains(@href, "/go-hiking/hikes/")]/@href')
+        report_dates = item.xpath('.//*[@*="elapsed-time"]/@title')
+        if hike_links and report_dates:
+            try:
+                report_date = datetime.strptime(report_dates[0].strip(), REPORT_DATE_FORMAT)
+            except ValueError:
+                METRICS.count('invalid_field.REPORT_DATE')
+                continue
+            report_items.append((urljoin(tree.base_url or '', hike_links[0]), report_date))
+
+    return report_items
+
+
+#*************************************************************************************
+# Method: get_conditional_headers(Dictionary)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the 'If-None-Match' and 'If-Modified-Since' request headers for a URL's
+# state in STATE_STORE, so that an unchanged page is answered with '304 Not
+# Modified'. A URL with no stored state gets no conditional headers.
+#*************************************************************************************
+def get_conditional_headers(state):
+    """Returns the conditional request headers for a URL's stored state."""
+
+    headers = {}
+    if state is not None:
+        if state['etag']:
+            headers['If-None-Match'] = state['etag']
+        if state['last_modified']:
+            headers['If-Modified-Since'] = state['last_modified']
+
+    return headers
+
+
+#*************************************************************************************
+# Method: fetch_page(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Retrieves a page, reusing its stored data fields when possible. When STATE_STORE
+# is set, the request is made conditional on the ETag and Last-Modified values
+# stored for the URL. If the server answers '304 Not Modified', or the response body
+# hashes to the stored content hash, the stored data fields are returned and the
+# page does not need to be parsed again.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Tuple           (stored data fields or None, response, content hash). The data
+#                 fields are None when the page must be parsed. The content hash is
+#                 None when STATE_STORE is not set or the page was not modified.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL of the page.
+#*************************************************************************************
+def fetch_page(url):
+    """Retrieves a page and, returns its stored data fields when it has not changed.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL of the page.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Tuple -- (stored data fields or None, response, content hash or None)
+    """
+
+    if STATE_STORE is None:
+        return None, fetch_response(url), None
+
+    state = STATE_STORE.get(url)
+    resp = fetch_response(url, get_conditional_headers(state))
+
+    # The page has not changed since the previous run...
+    if state is not None and resp.status_code == 304:
+        STATE_STORE.not_modified += 1
+        METRICS.count('pages_not_modified')
+        return state['record'], resp, None
+
+    content_hash = hashlib.sha1(resp.content).hexdigest()
+    if state is not None and content_hash == state['content_hash']:
+        STATE_STORE.unchanged += 1
+        METRICS.count('pages_unchanged')
+        return state['record'], resp, content_hash
+
+    STATE_STORE.changed += 1
+    return None, resp, content_hash
+
+
+#*************************************************************************************
+# Method: fetch_page_streamed(String, String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The streaming counterpart of fetch_page() and get_page_fields(). Rather than
+# downloading a whole page and then parsing it, the body is read in chunks of
+# STREAM_CHUNK_SIZE bytes and fed to an incremental HTML parser as it arrives. Each
+# element the parser finishes is checked against the page kind's markers in
+# STREAM_FIELD_MARKERS: an attribute value (with non-blank text inside the element)
+# or label text that the extract_*() method for the page kind looks for. Once every
+# marker has been seen, the connection is closed without reading the rest of the
+# body (unless no more than STREAM_DRAIN_BYTES are left, which are read and dropped
+# to keep the connection open), the partial document is closed off by the parser
+# and, the data fields are extracted from it with the same extract_*() method as a
+# fully downloaded page. A page missing a marker is simply read to the end.
+#
+# When STATE_STORE is set, the request is conditional as in fetch_page(), and the
+# content hash covers the part of the body that was read. The bytes read and, when
+# the response has a Content-Length, the bytes skipped are counted in METRICS.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Tuple           (data fields, response, content hash). The content hash is None
+#                 when STATE_STORE is not set or the page was not modified.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL of the page.
+#
+# String          page_kind           The kind of page, 'hike' or 'report', as in
+#                                     PAGE_EXTRACTORS.
+#*************************************************************************************
+def fetch_page_streamed(url, page_kind):
+    """Streams a page through an incremental parser, stopping once every data field
+    has been found, and returns its data fields.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL of the page.
+    2. page_kind {String} -- The kind of page, 'hike' or 'report'.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Tuple -- (data fields, response, content hash or None)
+    """
+
+    state = STATE_STORE.get(url) if STATE_STORE is not None else None
+    resp = fetch_response(url, get_conditional_headers(state), stream = True)
+
+    try:
+        # The page has not changed since the previous run...
+        if state is not None and resp.status_code == 304:
+            STATE_STORE.not_modified += 1
+            METRICS.count('pages_not_modified')
+            return state['record'], resp, None
+
+        markers = set(STREAM_FIELD_MARKERS[page_kind])
+        parser = lxml.etree.HTMLPullParser(events = ('end',), base_url = url)
+        parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+        digest = hashlib.sha1()
+        bytes_skipped = None
+        with METRICS.timer('stream'):
+            chunks = resp.iter_content(STREAM_CHUNK_SIZE)
+            for chunk in chunks:
+                digest.update(chunk)
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    if markers and isinstance(element.tag, str):
+                        markers -= match_stream_markers(element, markers)
+                # Every data field has been found, the rest of the page is skipped...
+                if not markers:
+                    content_length = resp.headers.get('Content-Length', '')
+                    bytes_skipped = (max(0, int(content_length) - resp.raw.tell())
+                                     if content_length.isdigit() else None)
+                    break
+            # ...unless it is short enough to read, keeping the connection open:
+            if bytes_skipped is not None and bytes_skipped <= STREAM_DRAIN_BYTES:
+                for chunk in chunks:
+                    pass
+                bytes_skipped = 0
+            try:
+                tree = parser.close()
+            except lxml.etree.XMLSyntaxError:
+                # An empty body...
+                tree = parse_html(b'', url)
+        bytes_read = resp.raw.tell()
+    finally:
+        resp.close()
+
+    METRICS.count('stream_pages')
+    METRICS.count('bytes_downloaded', bytes_read)
+    if not markers:
+        METRICS.count('stream_early_stops')
+        METRICS.count('stream_bytes_skipped', bytes_skipped or 0)
+
+    with METRICS.timer('extract'):
+        record = PAGE_EXTRACTORS[page_kind](tree)
+
+    if STATE_STORE is None:
+        return record, resp, None
+
+    content_hash = digest.hexdigest()
+    if state is not None and content_hash == state['content_hash']:
+        STATE_STORE.unchanged += 1
+        METRICS.count('pages_unchanged')
+        return state['record'], resp, content_hash
+
+    STATE_STORE.changed += 1
+    return record, resp, content_hash
+
+
+#*************************************************************************************
+# Method: match_stream_markers(HtmlElement, Set)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the markers found on an element the incremental parser has finished: those
+# equal to one of its attribute values, when the element holds non-blank text, and
+# those contained in one of its own text nodes, such as the 'Gain:' label.
+#*************************************************************************************
+def match_stream_markers(element, markers):
+    """Returns the STREAM_FIELD_MARKERS found on a finished element."""
+
+    found = set()
+    attribute_values = element.attrib.values()
+    labels = None
+    for marker in markers:
+        if marker in attribute_values:
+            if first_text([element]) is not None:
+                found.add(marker)
+        else:
+            if labels is None:
+                labels = [element.text or ''] + [child.tail or '' for child in element]
+            if any(marker in label for label in labels):
+                found.add(marker)
+
+    return found
+
+
+#*************************************************************************************
+# Method: store_page_fields(String, Response, String, Dictionary)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Saves a page's validators, content hash and data fields in STATE_STORE, when it is
+# set, for the next incremental run. Pages that were not modified (no content hash)
+# are already stored.
+#*************************************************************************************
+def store_page_fields(url, resp, content_hash, record):
+    """Saves a page's state and data fields in STATE_STORE."""
+
+    if STATE_STORE is not None and content_hash is not None:
+        STATE_STORE.put(url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'),
+                        content_hash, record)
+
+
+#*************************************************************************************
+# Method: get_page_fields(String, Function)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Retrieves a page with fetch_page() and extracts its data fields with the given
+# extract_*() method. The stored data fields of pages that have not changed since
+# the previous incremental run are returned without parsing the page again.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Dictionary      The data fields extracted from the page.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL of the page.
+#
+# Function        extractor           The extract_*() method used to pull the data
+#                                     fields from the parsed page.
+#*************************************************************************************
+def get_page_fields(url, extractor):
+    """Retrieves a page and extracts its data fields, reusing the stored fields of
+    pages that have not changed when STATE_STORE is set.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL of the page.
+    2. extractor {Function} -- The extract_*() method for the page.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Dictionary -- The data fields extracted from the page.
+    """
+
+    record, resp, content_hash = fetch_page(url)
+    if record is None:
+        tree = parse_html(resp.content, url)
+        with METRICS.timer('extract'):
+            record = extractor(tree)
+        store_page_fields(url, resp, content_hash, record)
+    elif content_hash is not None:
+        store_page_fields(url, resp, content_hash, record)
+
+    return record
+
+
+#*************************************************************************************
+# Method: extract_results_page_urls(HtmlElement)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Reads the pagination of a parsed hike results page once and, builds the URL of
+# every hike results page from the pagination pattern. Results pages are addressed
+# by a 'b_start:int' offset, which is the page number minus one, times the number of
+# hikes listed per page. The last page number is read from the 'last' pagination
+# link or, when there is none, from the highest page number shown.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# list            The URLs of every hike results page, in page order. The first URL
+#                 is the page the tree was parsed from.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# HtmlElement     tree                The parsed HTML document of a hike results page.
+#*************************************************************************************
+def extract_results_page_urls(tree):
+    """Builds the URL of every hike results page from a results page's pagination.
+
+    Arguments
+    ---------
+    1. tree {HtmlElement} -- The parsed HTML document of a hike results page.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list -- The URLs of every hike results page, in page order.
+    """
+
+    base_url = tree.base_url or ''
+    first_page_url = re.sub(r'[?&]b_start:int=\d+', '', base_url)
+
+    # Map each page number shown in the pagination to its 'b_start:int' offset...
+    page_offsets = {}
+    for link in tree.xpath('//*[@*="pagination" or contains(@class, "pagination")]//a[@href]'
+                           ' | //*[@*="last"]/a[@href]'):
+        page_number = (link.text_content() or '').strip()
+        offset = re.search(r'b_start:int=(\d+)', link.get('href'))
+        if page_number.isdigit() and offset:
+            page_offsets[int(page_number)] = int(offset.group(1))
+
+    active_page = first_text(tree.xpath('//*[@*="active"]'))
+    if active_page is not None and active_page.isdigit():
+        page_offsets.setdefault(int(active_page), None)
+
+    # Retrieving the last page number and the number of hikes listed per page...
+    last_page = first_text(tree.xpath('//*[@*="last"]'))
+    if last_page is None or not last_page.isdigit():
+        last_page = max(page_offsets) if page_offsets else 1
+    last_page = int(last_page)
+
+    page_sizes = [offset // (page_number - 1) for page_number, offset in page_offsets.items()
+                  if offset and page_number > 1]
+    if not page_sizes:
+        return [base_url]
+    page_size = min(page_sizes)
+
+    separator = '&' if '?' in first_page_url else '?'
+    return [first_page_url] + ['{0}{1}b_start:int={2}'.format(first_page_url, separator,
+                                                              (page_number - 1) * page_size)
+                               for page_number in range(2, last_page + 1)]
+
+
+#*************************************************************************************
+# Method: canonicalize_url(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the canonical form of a URL, so that the different ways a page is linked
+# are recognized as one page. The scheme and host are lower cased, default ports are
+# dropped and, the origin is replaced as CANONICAL_ORIGINS says (e.g. 'http://wta.org'
+# becomes 'https://www.wta.org'). Repeated slashes are collapsed, path aliases in
+# CANONICAL_PATH_ALIASES are replaced (e.g. '/go-outside/hikes/<hike>' becomes
+# '/go-hiking/hikes/<hike>') and, a trailing slash is removed. The fragment and query
+# parameters matching CANONICAL_DROPPED_PARAMS, such as 'utm_source', are dropped
+# and, the remaining query parameters are sorted.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# String          The canonical URL.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 An absolute URL.
+#*************************************************************************************
+def canonicalize_url(url):
+    """Returns the canonical form of a URL.
+
+    Arguments
+    ---------
+    1. url {String} -- An absolute URL.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    String -- The canonical URL.
+    """
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = parts.netloc.lower()
+    if (scheme, host.rpartition(':')[2]) in (('http', '80'), ('https', '443')):
+        host = host.rpartition(':')[0]
+    origin = '{0}://{1}'.format(scheme, host)
+    origin = CANONICAL_ORIGINS.get(origin, origin)
+
+    path = re.sub(r'/{2,}', '/', parts.path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+    for pattern, replacement in CANONICAL_PATH_ALIASES:
+        path = re.sub(pattern, replacement, path)
+
+    params = sorted((name, value)
+                    for name, value in parse_qsl(parts.query, keep_blank_values = True)
+                    if not re.match(CANONICAL_DROPPED_PARAMS, name))
+    query = urlencode(params, safe = ':@/')
+
+    return origin + (path or '/') + ('?' + query if query else '')
+
+
+#*************************************************************************************
+# Class: BloomFilter
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A set of strings held as bits: each string sets hash_count bits of a bit array,
+# found by double hashing a BLAKE2b digest of the string. A string is reported as
+# present when all of its bits are set, so a Bloom filter never misses a string that
+# was added, but reports about error_rate of the strings that were not as present.
+# Sized for 'capacity' strings, it uses about -ln(error_rate) / ln(2)^2 bits per
+# string whatever their length: 2.4 bytes per URL at an error rate of 1e-4, against
+# 100 bytes or more for a URL in a set.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Integer         capacity            The number of strings the filter is sized for.
+#
+# Float           error_rate          The share of false positives at capacity.
+#*************************************************************************************
+class BloomFilter:
+    """A fixed-size, probabilistic set of strings.
+
+    Arguments
+    ---------
+    1. capacity {Integer} -- The number of strings the filter is sized for.
+    2. error_rate {Float} -- The share of false positives at capacity.
+    """
+
+    def __init__(self, capacity, error_rate = FRONTIER_BLOOM_ERROR_RATE):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / max(1, capacity) * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size = 16).digest()
+        first = int.from_bytes(digest[ : 8], 'little')
+        second = int.from_bytes(digest[8 : ], 'little') | 1
+        return [(first + number * second) % self.size for number in range(self.hash_count)]
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+    def add(self, item):
+        """Adds a string to the filter."""
+
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    @property
+    def nbytes(self):
+        """The number of bytes of the bit array."""
+
+        return len(self.bits)
+
+
+#*************************************************************************************
+# Class: UrlFrontier
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Deduplicates the hike URLs found while discovering hikes, so that no hike is
+# fetched twice. Each link is canonicalized with canonicalize_url() and, when it is a
+# URL that has moved permanently, replaced by its new URL from REDIRECT_CACHE. A link
+# whose URL has been seen before is dropped, with one set lookup; the URLs seen are
+# kept in a set or, with a capacity, in a BloomFilter. The links, unique URLs,
+# duplicates, links canonicalized and links redirected are counted.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Integer         capacity            The number of URLs the BloomFilter is sized for
+#                                     or, None to keep the URLs in a set.
+#
+# Float           error_rate          The BloomFilter's share of false duplicates.
+#*************************************************************************************
+class UrlFrontier:
+    """Canonicalizes hike URLs and, drops the ones seen before.
+
+    Arguments
+    ---------
+    1. capacity {Integer} -- The size of the BloomFilter, or None to use a set.
+    2. error_rate {Float} -- The BloomFilter's share of false duplicates.
+    """
+
+    def __init__(self, capacity = FRONTIER_BLOOM_CAPACITY, error_rate = FRONTIER_BLOOM_ERROR_RATE):
+        self.seen = set() if capacity is None else BloomFilter(capacity, error_rate)
+        self.links = 0
+        self.unique = 0
+        self.duplicates = 0
+        self.canonicalized = 0
+        self.redirected = 0
+
+    def __len__(self):
+        return self.unique
+
+    def add(self, url):
+        """Returns the canonical URL of a link that has not been seen or, None.
+
+        Arguments
+        ---------
+        1. url {String} -- A hike URL, as linked.
+
+        Returns
+        -------
+        String -- The canonical URL, or None for a duplicate.
+        """
+
+        self.links += 1
+        canonical_url = canonicalize_url(url)
+        if canonical_url != url:
+            self.canonicalized += 1
+        if REDIRECT_CACHE is not None:
+            target_url = REDIRECT_CACHE.resolve(canonical_url)
+            if target_url != canonical_url:
+                self.redirected += 1
+                canonical_url = canonicalize_url(target_url)
+
+        if canonical_url in self.seen:
+            self.duplicates += 1
+            return None
+        self.seen.add(canonical_url)
+        self.unique += 1
+        return canonical_url
+
+    def extend(self, urls):
+        """Returns the canonical URLs of the links that have not been seen, in order."""
+
+        return [canonical_url for canonical_url in map(self.add, urls)
+                if canonical_url is not None]
+
+    def stats(self):
+        """Returns the frontier counters as a dictionary."""
+
+        return {'links': self.links, 'unique': self.unique, 'duplicates': self.duplicates,
+                'canonicalized': self.canonicalized, 'redirected': self.redirected}
+
+    def count_metrics(self):
+        """Adds the frontier counters to METRICS, as 'frontier.*' counters."""
+
+        for name, count in self.stats().items():
+            METRICS.count('frontier.' + name, count)
+
+
+#*************************************************************************************
+# Method: discover_hike_urls(String, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Discovers every hike results page and every individual hike URL in a single pass.
+# The first hike results page is retrieved once to read its pagination and, the URLs
+# of all other results pages are built from the pagination pattern. The remaining
+# results pages are then retrieved concurrently and, the individual hike URLs listed
+# on each page are collected as the page is parsed, so no results page is retrieved
+# twice. The hike URLs go through a UrlFrontier, so each hike is listed once, under
+# its canonical URL, however many times and in whatever form it is linked.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Tuple           (list of hike results page URLs, list of individual hike URLs). Both
+#                 lists are in page order and, the hike URLs are canonical and
+#                 unique.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 This URL should be
+#                                     'https://www.wta.org/go-outside/hikes'
+#
+# Integer         max_workers         The number of results pages fetched at once.
+#*************************************************************************************
+def discover_hike_urls(url = HIKES_URL, max_workers = MAX_WORKERS):
+    """Retrieves every hike results page once and, returns the results page URLs and
+    the individual hike URLs found on them.
+
+    Arguments
+    ---------
+    1. url {String} -- This URL should be: 'https://www.wta.org/go-outside/hikes'
+    2. max_workers {Integer} -- The number of results pages fetched at once.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Tuple -- (list of hike results page URLs, list of individual hike URLs)
+    """
+
+    frontier = UrlFrontier()
+    first_page_tree = get_html_tree(url)
+    results_page_urls = extract_results_page_urls(first_page_tree)
+    hike_urls_list = frontier.extend(extract_hike_links(first_page_tree))
+    print(' > URLs to Hike Results Pages Built: {0} Total URLs'.format(len(results_page_urls)))
+
+    def get_page_hike_links(page_url):
+        return extract_hike_links(get_html_tree(page_url))
+
+    with ThreadPoolExecutor(max_workers = max(1, max_workers)) as executor:
+        for hike_links in executor.map(get_page_hike_links, results_page_urls[1 : ]):
+            hike_urls_list.extend(frontier.extend(hike_links))
+            print(' > Total Hike URLs: {0}'.format(len(hike_urls_list)))
+
+    frontier.count_metrics()
+    print(' > Duplicate Hike URLs Dropped: {duplicates} of {links} Links ({canonicalized} '
+          'Canonicalized, {redirected} Redirected)'.format(**frontier.stats()))
+
+    return [url] + results_page_urls[1 : ], hike_urls_list
+
+
+#*************************************************************************************
+# Method: get_hike_results_urls_list(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# This method will return all URLs to webpages containing lists of hikes as a list.
+# The pagination of the given page is read once and, the URLs are built from the
+# pagination pattern with extract_results_page_urls(). Note, this method does not
+# include 'https://www.wta.org/go-outside/hikes' in the returned list. So, it may be
+# best to append this URL to your final returned list.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# List            A list of all hike results page URLs.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 This URL should be
+#                                     'https://www.wta.org/go-outside/hikes'
+#*************************************************************************************
+def get_hike_results_urls_list(url):
+    """This method retrieves and returns a list of URLs. 
+    These URLs route to webpages under www.wta.org/ that contain lists of hikes.
+
+    Arguments
+    ---------
+    1. url {string} -- This URL should be: 'https://www.wta.org/go-outside/hikes'
+    
+    Raises
+    ------
+    None
+    
+    Returns
+    -------
+    list -- A list of all hike results page URLs.
+    """
+
+    return extract_results_page_urls(get_html_tree(url))[1 : ]
+
+
+#*************************************************************************************
+# Method: iter_individual_hike_urls(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A generator stage that retrieves each webpage containing a list of hikes and,
+# yields the URLs routing to individual hike pages as soon as each page is parsed.
+# The URLs go through a UrlFrontier, so each hike is yielded once, under its
+# canonical URL.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Generator       Yields URLs that route to individual hike pages.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Iterable        hike_page_urls      URLs that route to webpages containing lists of
+#                                     hikes.
+#*************************************************************************************
+def iter_individual_hike_urls(hike_page_urls):
+    """A generator that yields the individual hike URLs found on hike results pages.
+
+    Arguments
+    ---------
+    1. hike_page_urls {Iterable} -- URLs that route to webpages containing lists of hikes.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Generator -- Yields URLs that route to individual hike pages.
+    """
+
+    frontier = UrlFrontier()
+
+    # Parse through all URLs...
+    for url in hike_page_urls:
+        hike_links = frontier.extend(extract_hike_links(get_html_tree(url)))
+        print(' > Total Hike URLs: {0}'.format(len(frontier)))
+
+        yield from hike_links
+
+    frontier.count_metrics()
+
+
+#*************************************************************************************
+# Method: get_individual_hike_urls(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Using a list of URLs to webpages containing lists of hikes, this method will
+# find all URLs routing to webpages hosting information on individual hikes found on 
+# each of the URLs in the list passed to this method.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# list            A list of URLs that route to individual hike pages.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# list            hike_page_urls      This list should be a list of URLs that route to 
+#                                     webpages containing lists of hikes.
+#*************************************************************************************
+def get_individual_hike_urls(hike_page_urls):
+    """This method retrieves and returns a list of URLs to webpages. 
+    These webpages are the individual hikes hosted on www.wta.org/.
+
+    Arguments
+    ---------
+    1. hike_page_urls {list} -- A list of URLs that route to webpages containing lists of hikes.
+    
+    Raises
+    ------
+    None
+    
+    Returns
+    -------
+    list -- A list of URLs that route to individual hike pages.
+    """
+
+    print('\nGetting All URLs to Individual Hikes...')
+
+    hike_urls_list = list(iter_individual_hike_urls(hike_page_urls))
+
+    print('  >> All Individual Hike URLs Extracted: {0} Total URLs'.format(len(hike_urls_list)))
+    # Return the list containing all individual hike URLs.
+    return hike_urls_list
+
+
+#*************************************************************************************
+# Class: HikeRecord
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A memory-compact record holding the data of a single hike, as extracted from its
+# pages. Each attribute is the lower case name of a column in HIKE_DATA_COLUMNS.
+# Records are built from, and converted back to, dictionaries keyed by column name;
+# their values are converted to column types in batches by normalize_hike_data().
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Dictionary      fields              The hike data, keyed by column name. Missing
+#                                     columns are set to None.
+#*************************************************************************************
+class HikeRecord:
+    """The data of a single hike.
+
+    Arguments
+    ---------
+    1. fields {Dictionary} -- The hike data, keyed by column name.
+    """
+
+    __slots__ = ('title', 'region', 'distance', 'dist_type', 'gain', 'highest',
+                 'rating', 'rating_count', 'latitude', 'longitude',
+                 'report_date', 'report_count', 'url')
+
+    def __init__(self, fields):
+        for column in HIKE_DATA_COLUMNS:
+            setattr(self, column.lower(), fields.get(column))
+
+    def as_dict(self):
+        """Returns the hike data as a dictionary keyed by column name."""
+
+        return {column: getattr(self, column.lower()) for column in HIKE_DATA_COLUMNS}
+
+    def __repr__(self):
+        return 'HikeRecord({0!r})'.format(self.url)
+
+
+#*************************************************************************************
+# Class: TripReportIndex
+#
+# Description
+# ------------------------------------------------------------------------------------
+# An in-memory index of trip report counts and latest trip report dates, keyed by
+# canonical hike URL (see canonicalize_url()). The index is filled in bulk from the
+# site-wide trip report listing, which lists trip reports newest first, so a single
+# listing page covers up to a hundred hikes instead of one
+# '@@related_tripreport_listing' request per hike.
+#
+# The index may be seeded with the counts and dates of a previous snapshot. The
+# listing is then only walked back to the previous snapshot's date and, the newer
+# trip reports are added on top. Without a seed, the whole listing is walked and the
+# index is complete: hikes that were never seen have no trip reports. Trip reports
+# are dated by day, so reports written on the previous snapshot's date after it was
+# taken are not counted.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       seed                A previous snapshot with URL, REPORT_COUNT and
+#                                     REPORT_DATE columns, or None. Hikes whose
+#                                     REPORT_COUNT is not a number are skipped.
+#
+# Date            since               The date of the seed snapshot. Only trip reports
+#                                     dated after it are harvested.
+#*************************************************************************************
+class TripReportIndex:
+    """An in-memory index of trip report counts and latest dates by hike URL.
+
+    Arguments
+    ---------
+    1. seed {DataFrame} -- A previous snapshot to build on, or None.
+    2. since {Date} -- The date of the seed snapshot.
+    """
+
+    def __init__(self, seed = None, since = None):
+        self.counts = {}
+        self.latest = {}
+        self.since = since
+        self.complete = seed is None
+        self.pages = 0
+        self.reports = 0
+
+        if seed is not None:
+            # Skipping hikes whose trip report count is missing or not a number:
+            report_counts = pd.to_numeric(seed['REPORT_COUNT'].astype('string').str.strip()
+                                          .str.replace(',', '', regex = False),
+                                          errors = 'coerce')
+            seed = seed[seed['URL'].notna() & report_counts.notna()]
+            report_counts = report_counts[seed.index]
+            report_dates = pd.to_datetime(seed['REPORT_DATE'], errors = 'coerce')
+            for url, count, report_date in zip(seed['URL'], report_counts, report_dates):
+                self.counts[self.key(url)] = int(round(count))
+                if not pd.isna(report_date):
+                    self.latest[self.key(url)] = report_date.to_pydatetime()
+
+    @staticmethod
+    def key(url):
+        return canonicalize_url(url)
+
+    def add(self, hike_url, report_date):
+        """Counts one trip report for a hike."""
+
+        key = self.key(hike_url)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if key not in self.latest or report_date > self.latest[key]:
+            self.latest[key] = report_date
+
+    def get(self, hike_url):
+        """Returns the trip report data fields of a hike, keyed by DataFrame column
+        name or, None when the index does not know the hike."""
+
+        key = self.key(hike_url)
+        if key not in self.counts and not self.complete:
+            return None
+        return {'REPORT_DATE': self.latest.get(key), 'REPORT_COUNT': self.counts.get(key, 0)}
+
+    def harvest(self, url = TRIP_REPORTS_URL, max_workers = MAX_WORKERS):
+        """Walks the trip report listing, newest first, back to the 'since' date and,
+        adds every newer trip report to the index. Listing pages are fetched
+        max_workers at a time and the walk stops after the first batch of pages
+        that reaches the 'since' date."""
+
+        since = datetime.combine(self.since, datetime.min.time()) if self.since else None
+
+        def add_page(tree):
+            # Adds a listing page's trip reports and, returns whether the walk is done.
+            self.pages += 1
+            report_items = extract_trip_report_items(tree)
+            for hike_url, report_date in report_items:
+                if since is None or report_date > since:
+                    self.add(hike_url, report_date)
+                    self.reports += 1
+            return not report_items or (since is not None and report_items[-1][1] <= since)
+
+        first_page_tree = get_html_tree(url)
+        page_urls = extract_results_page_urls(first_page_tree)[1 : ]
+        if add_page(first_page_tree):
+            return self
+
+        with ThreadPoolExecutor(max_workers = max(1, max_workers)) as executor:
+            for batch in iter_batches(page_urls, max(1, max_workers)):
+                done = [add_page(tree) for tree in executor.map(get_html_tree, batch)]
+                print(' > Trip Report Pages Harvested: {0}'.format(self.pages))
+                if any(done):
+                    break
+
+        return self
+
+
+#*************************************************************************************
+# Method: fetch_hike_pages(String, TripReportIndex, Boolean, Boolean)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The fetch half of get_hike_page_data(). Retrieves the hike page and trip report
+# page of an individual hike, without parsing them. Data fields that are already
+# known are collected right away: stored data fields of unchanged pages, trip report
+# data fields from a TripReportIndex or, empty trip report data fields when they are
+# skipped. The raw bodies of the pages that still need to be parsed are returned so
+# that they can be parsed here, or in a parse worker process with parse_pages().
+# Streamed pages are parsed as they are read by fetch_page_streamed(), so their data
+# fields are always known right away. Pages are not streamed when RESPONSE_CACHE is
+# set, since only complete responses can be cached. A hike whose pages could not be
+# retrieved once the session's retries ran out (a 429 or 5xx status, a reset or a
+# timeout) is counted as a 'hike_fetch_errors' and returned as None, so one failed
+# hike does not stop the run and, no record is written for it.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Dictionary      'url': the hike URL, 'fields': the data fields already known,
+#                 'pages': (page kind, URL, body) tuples to parse with parse_pages()
+#                 and, 'states': the (URL, response, content hash) tuples to save in
+#                 STATE_STORE once those pages are parsed. None when the hike's pages
+#                 could not be retrieved.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL for an individual hike page.
+#
+# TripReportIndex report_index        Trip report data fields harvested in bulk, or
+#                                     None to retrieve the trip report page.
+#
+# Boolean         skip_reports        If True, the trip report data fields are left
+#                                     empty and no trip report page is retrieved.
+#
+# Boolean         stream              If True, pages are streamed and parsed with
+#                                     fetch_page_streamed().
+#*************************************************************************************
+def fetch_hike_pages(url, report_index = None, skip_reports = False, stream = False):
+    """Retrieves the hike page and trip report page of an individual hike, without
+    parsing them.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL for an individual hike page.
+    2. report_index {TripReportIndex} -- Trip report data harvested in bulk, or None.
+    3. skip_reports {Boolean} -- Leave the trip report data fields empty.
+    4. stream {Boolean} -- Stream and parse pages as they are read.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Dictionary -- The known data fields and the pages that still need parsing, or
+                  None when the hike's pages could not be retrieved.
+    """
+
+    hike_pages = {'url': url, 'fields': {}, 'pages': [], 'states': []}
+    page_urls = [('hike', url)]
+
+    # Look up the trip report data fields in the bulk index or,
+    # retrieve them from the corresponding trip report page.
+    report_fields = None
+    if report_index is not None:
+        report_fields = report_index.get(url)
+    if skip_reports:
+        report_fields = dict.fromkeys(REPORT_PAGE_COLUMNS)
+    if report_fields is None:
+        page_urls.append(('report', url + '/@@related_tripreport_listing'))
+    else:
+        hike_pages['fields'].update(report_fields)
+
+    stream = stream and RESPONSE_CACHE is None
+    try:
+        for page_kind, page_url in page_urls:
+            if stream:
+                record, resp, content_hash = fetch_page_streamed(page_url, page_kind)
+            else:
+                record, resp, content_hash = fetch_page(page_url)
+            if record is not None:
+                hike_pages['fields'].update(record)
+                store_page_fields(page_url, resp, content_hash, record)
+            else:
+                hike_pages['pages'].append((page_kind, page_url, resp.content))
+                hike_pages['states'].append((page_url, resp, content_hash))
+    except requests.exceptions.RequestException as error:
+        # Leaving the hike out and, moving on to the next hike:
+        METRICS.count('hike_fetch_errors')
+        print(' > Hike Could Not Be Retrieved: {0} ({1})'.format(url, error))
+        return None
+
+    return hike_pages
+
+
+# The extract_*() method and data field columns of each kind of hike page:
+PAGE_EXTRACTORS = {'hike': extract_hike_fields, 'report': extract_report_fields}
+PAGE_COLUMNS = {'hike': HIKE_PAGE_COLUMNS, 'report': REPORT_PAGE_COLUMNS}
+
+
+#*************************************************************************************
+# Method: parse_pages(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The parse half of get_hike_page_data(). Parses raw page bodies and extracts their
+# data fields with the extract_*() method for each page kind in PAGE_EXTRACTORS.
+# This method only depends on its arguments, so it can run in a parse worker process.
+# Each page's data fields are returned as a compact tuple of values, ordered as in
+# PAGE_COLUMNS, to keep the data sent back between processes small.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# list            A tuple of data field values for each page, in page order.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# list            pages               (page kind, URL, body) tuples, where the page
+#                                     kind is 'hike' or 'report'.
+#*************************************************************************************
+def parse_pages(pages):
+    """Parses raw page bodies and, returns the data field values of each page.
+
+    Arguments
+    ---------
+    1. pages {list} -- (page kind, URL, body) tuples.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    list -- A tuple of data field values for each page, ordered as in PAGE_COLUMNS.
+    """
+
+    page_values = []
+    for page_kind, page_url, content in pages:
+        tree = parse_html(content, page_url)
+        with METRICS.timer('extract'):
+            page_fields = PAGE_EXTRACTORS[page_kind](tree)
+        page_values.append(tuple(page_fields[column] for column in PAGE_COLUMNS[page_kind]))
+
+    return page_values
+
+
+#*************************************************************************************
+# Method: parse_chunk(list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The unit of work of a parse worker process. Runs parse_pages() on a chunk of pages
+# and, returns the metrics it recorded ('parse' and 'extract' timers and any
+# counters) along with the data field values. A worker process has its own METRICS,
+# which would otherwise be lost, so they are cleared before each chunk and, merged
+# into the parent's METRICS by iter_hike_records_multiprocess().
+#*************************************************************************************
+def parse_chunk(pages):
+    """Parses a chunk of pages in a parse worker process and, returns
+    (data field values, metrics recorded)."""
+
+    METRICS.reset()
+    page_values = parse_pages(pages)
+    return page_values, METRICS.snapshot()
+
+
+#*************************************************************************************
+# Method: finish_hike_record(Dictionary, list, Boolean)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Combines the data fields known by fetch_hike_pages() with the values returned by
+# parse_pages() for the same hike, saves the parsed pages in STATE_STORE and,
+# returns the hike data as a HikeRecord.
+#*************************************************************************************
+def finish_hike_record(hike_pages, page_values, skip_reports = False):
+    """Combines fetched and parsed data fields into a HikeRecord."""
+
+    hike_data = dict(hike_pages['fields'])
+    for (page_kind, _, _), values, (page_url, resp, content_hash) in zip(
+            hike_pages['pages'], page_values, hike_pages['states']):
+        page_fields = dict(zip(PAGE_COLUMNS[page_kind], values))
+        hike_data.update(page_fields)
+        store_page_fields(page_url, resp, content_hash, page_fields)
+
+    # We also want to include a column of the hike URLs :)
+    hike_data['URL'] = hike_pages['url']
+
+    # Counting the data fields that could not be found...
+    for column in HIKE_DATA_COLUMNS:
+        if skip_reports and column in REPORT_PAGE_COLUMNS:
+            continue
+        if hike_data.get(column) is None:
+            METRICS.count('missing_field.' + column)
+
+    return HikeRecord(hike_data)
+
+
+#*************************************************************************************
+# Method: get_hike_page_data(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Using a URL that routes to a webpage containing information on an individual hike,
+# this method retrieves the hike page and its related trip report page and, returns
+# the hike data found on both pages as a HikeRecord. Any data field that could not be
+# found is set to None. This method is the unit of work for the concurrent fetch
+# engine used by iter_hike_records(). When a TripReportIndex is given, the trip report
+# data fields are looked up in the index instead and, the trip report page is only
+# retrieved for hikes the index does not know.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# HikeRecord      The hike data found for the given URL, or None when the hike's
+#                 pages could not be retrieved.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          url                 The URL for an individual hike page.
+#
+# TripReportIndex report_index        Trip report data fields harvested in bulk, or
+#                                     None to retrieve the trip report page.
+#
+# Boolean         skip_reports        If True, the trip report data fields are left
+#                                     empty and no trip report page is retrieved.
+#
+# Boolean         stream              If True, pages are streamed and parsed with
+#                                     fetch_page_streamed().
+#*************************************************************************************
+def get_hike_page_data(url, report_index = None, skip_reports = False, stream = False):
+    """Retrieves the hike page and trip report page for an individual hike and,
+    returns the hike data found on both pages.
+
+    Arguments
+    ---------
+    1. url {String} -- The URL for an individual hike page.
+    2. report_index {TripReportIndex} -- Trip report data harvested in bulk, or None.
+    3. skip_reports {Boolean} -- Leave the trip report data fields empty.
+    4. stream {Boolean} -- Stream and parse pages as they are read.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    HikeRecord -- The hike data for the given URL, or None when it was not retrieved.
+    """
+
+    # Retrieve the hike page and trip report page, then parse them here...
+    hike_pages = fetch_hike_pages(url, report_index, skip_reports, stream)
+    if hike_pages is None:
+        return None
+    return finish_hike_record(hike_pages, parse_pages(hike_pages['pages']), skip_reports)
+
+
+#*************************************************************************************
+# Method: iter_ordered(Executor, Function, Iterable, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A generator that runs a function on each item with an executor and, yields the
+# results in the same order as the items. At most 'window' items are in flight at
+# once, so memory use stays flat no matter how many items there are.
+#*************************************************************************************
+def iter_ordered(executor, function, items, window, *args):
+    """A generator that yields function(item, *args) for each item, in order."""
+
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(function, item, *args))
+        # Yield the oldest result once the window is full...
+        if len(pending) >= window:
+            yield pending.popleft().result()
+
+    # ...and drain the window once every item has been submitted.
+    while pending:
+        yield pending.popleft().result()
+
+
+#*************************************************************************************
+# Method: iter_hike_records(Iterable, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A generator stage that fetches and parses individual hikes with a pool of worker
+# threads and, yields a HikeRecord for each hike as soon as it is ready. Records are
+# yielded in the same order as the hike URLs. Hikes whose pages could not be
+# retrieved are left out (see fetch_hike_pages()), so they are neither written nor
+# journaled and, a resumed run fetches them again. At most 2 * max_workers hikes are in
+# flight at once, so memory use stays flat no matter how many hike URLs there are.
+# With parse_workers, pages are parsed in worker processes by
+# iter_hike_records_multiprocess() instead of in the fetching threads.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Generator       Yields a HikeRecord for each hike URL that could be retrieved.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Iterable        hike_urls           URLs that route to individual hike pages.
+#
+# Integer         max_workers         The number of hikes fetched at once.
+#
+# ProgressDisplay progress            A live progress display updated for each hike.
+#                                     None prints a line every few hikes instead.
+#
+# TripReportIndex report_index        Trip report data fields harvested in bulk, or
+#                                     None to retrieve each trip report page.
+#
+# Boolean         skip_reports        If True, no trip report pages are retrieved.
+#
+# Integer         parse_workers       The number of parse worker processes. 0 parses
+#                                     pages in the fetching threads.
+#
+# Integer         chunk_size          The number of hikes sent to a parse worker
+#                                     process at once.
+#
+# Boolean         stream              If True, pages are streamed and parsed as they
+#                                     are read, see fetch_page_streamed().
+#*************************************************************************************
+def iter_hike_records(hike_urls, max_workers = MAX_WORKERS, progress = None,
+                      report_index = None, skip_reports = False,
+                      parse_workers = PARSE_WORKERS, chunk_size = PARSE_CHUNK_SIZE,
+                      stream = STREAM_PAGES):
+    """A generator that yields a HikeRecord for each individual hike URL.
+
+    Arguments
+    ---------
+    1. hike_urls {Iterable} -- URLs that route to individual hike pages.
+    2. max_workers {Integer} -- The number of hikes fetched at once.
+    3. progress {ProgressDisplay} -- A live progress display, or None.
+    4. report_index {TripReportIndex} -- Trip report data harvested in bulk, or None.
+    5. skip_reports {Boolean} -- Leave the trip report data fields empty.
+    6. parse_workers {Integer} -- The number of parse worker processes, or 0.
+    7. chunk_size {Integer} -- The number of hikes sent to a parse worker at once.
+    8. stream {Boolean} -- Stream and parse pages as they are read.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Generator -- Yields a HikeRecord for each hike URL that could be retrieved.
+    """
+
+    max_workers = max(1, max_workers)
+    if parse_workers:
+        hike_records = iter_hike_records_multiprocess(hike_urls, max_workers, parse_workers,
+                                                      chunk_size, report_index, skip_reports,
+                                                      stream)
+    else:
+        executor = ThreadPoolExecutor(max_workers = max_workers)
+        hike_records = iter_ordered(executor, get_hike_page_data, hike_urls,
+                                    2 * max_workers, report_index, skip_reports, stream)
+
+    try:
+        rownum = 0
+        for hike_record in hike_records:
+            # Leaving out the hikes whose pages could not be retrieved:
+            if hike_record is None:
+                if progress is not None:
+                    progress.update()
+                continue
+            rownum += 1
+            yield hike_record
+
+            # Print performance...
+            if progress is not None:
+                progress.update()
+            elif rownum < 6:
+                print(' > ' + str(rownum) + ' Hikes Loaded...')
+            elif rownum < 50 and rownum % 5 == 0:
+                print(' > ' + str(rownum) + ' Hikes Loaded...')
+            else:
+                if rownum % 50 == 0:
+                    print(' > ' + str(rownum) + ' Hikes Loaded...')
+    finally:
+        hike_records.close()
+        if not parse_workers:
+            executor.shutdown(cancel_futures = True)
+
+
+#*************************************************************************************
+# Method: iter_hike_records_multiprocess(Iterable, Integer, Integer, Integer,
+#                                        TripReportIndex, Boolean, Boolean)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The multi-process execution mode of iter_hike_records(). Parsing HTML is CPU-bound
+# and holds the GIL, so with a fast network the fetching threads are limited to a
+# single core. In this mode, the threads only fetch pages with fetch_hike_pages() and,
+# the raw page bodies are parsed by a pool of parse_workers processes running
+# parse_chunk(). Hikes are sent to the processes in chunks of chunk_size hikes, so
+# the cost of sending pages between processes is paid once per chunk rather than
+# once per page, and the processes return compact tuples of data field values,
+# along with the timings and counters recorded while parsing, which are merged into
+# METRICS.
+# Records are yielded in the same order as the hike URLs, with None for a hike whose
+# pages could not be retrieved. At most 2 * parse_workers chunks are being parsed at
+# once.
+#
+# Parse worker processes are started with the 'spawn' method, since forking a
+# process while fetching threads hold locks is unsafe.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Generator       Yields a HikeRecord, or None, for each hike URL.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Iterable        hike_urls           URLs that route to individual hike pages.
+#
+# Integer         max_workers         The number of hikes fetched at once.
+#
+# Integer         parse_workers       The number of parse worker processes.
+#
+# Integer         chunk_size          The number of hikes sent to a parse worker
+#                                     process at once.
+#
+# TripReportIndex report_index        Trip report data fields harvested in bulk, or
+#                                     None to retrieve each trip report page.
+#
+# Boolean         skip_reports        If True, no trip report pages are retrieved.
+#
+# Boolean         stream              If True, pages are streamed and parsed by the
+#                                     fetching threads as they are read.
+#*************************************************************************************
+def iter_hike_records_multiprocess(hike_urls, max_workers = MAX_WORKERS,
+                                   parse_workers = PARSE_WORKERS,
+                                   chunk_size = PARSE_CHUNK_SIZE, report_index = None,
+                                   skip_reports = False, stream = False):
+    """A generator that fetches hikes with threads, parses them in worker processes
+    and, yields a HikeRecord for each individual hike URL.
+
+    Arguments
+    ---------
+    1. hike_urls {Iterable} -- URLs that route to individual hike pages.
+    2. max_workers {Integer} -- The number of hikes fetched at once.
+    3. parse_workers {Integer} -- The number of parse worker processes.
+    4. chunk_size {Integer} -- The number of hikes sent to a parse worker at once.
+    5. report_index {TripReportIndex} -- Trip report data harvested in bulk, or None.
+    6. skip_reports {Boolean} -- Leave the trip report data fields empty.
+    7. stream {Boolean} -- Stream and parse pages as they are read.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Generator -- Yields a HikeRecord, or None when it was not retrieved, for each
+                 hike URL.
+    """
+
+    parse_workers = max(1, parse_workers)
+    pending = deque()
+
+    def finish_chunk(chunk, future):
+        # Splits the values parsed for a chunk back into hikes...
+        with METRICS.timer('parse_wait'):
+            page_values, recorded = future.result() if future is not None else ([], None)
+        if recorded is not None:
+            METRICS.merge(recorded)
+        page_values = iter(page_values)
+        for hike_pages in chunk:
+            if hike_pages is None:
+                yield None
+                continue
+            values = [next(page_values) for _ in hike_pages['pages']]
+            yield finish_hike_record(hike_pages, values, skip_reports)
+
+    with ThreadPoolExecutor(max_workers = max(1, max_workers)) as fetcher, \
+         ProcessPoolExecutor(max_workers = parse_workers,
+                             mp_context = multiprocessing.get_context('spawn')) as parser:
+        fetched = iter_ordered(fetcher, fetch_hike_pages, hike_urls, 2 * max_workers,
+                               report_index, skip_reports, stream)
+        for chunk in iter_batches(fetched, max(1, chunk_size)):
+            # Chunks of unchanged pages have nothing to parse...
+            pages = [page for hike_pages in chunk if hike_pages is not None
+                     for page in hike_pages['pages']]
+            if pages:
+                pending.append((chunk, parser.submit(parse_chunk, pages)))
+                METRICS.count('parse_chunks')
+            else:
+                pending.append((chunk, None))
+
+            # Yield the oldest chunk once the window is full...
+            if len(pending) >= 2 * parse_workers:
+                yield from finish_chunk(*pending.popleft())
+
+        # ...and drain the window once every hike has been fetched.
+        while pending:
+            yield from finish_chunk(*pending.popleft())
+
+
+#*************************************************************************************
+# Method: get_individual_hike_data(list, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Using a list of URLs that route to webpages containing information on individual
+# hikes, this method will return specific information for each hike in the format of a
+# DataFrame. Hike pages (and their trip report pages) are fetched concurrently by
+# iter_hike_records(), while requests to each host are paced by RATE_LIMITER.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# DataFrame       A DataFrame consisting of organized hike data.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# list            hike_urls           This list should be a list of URLs that route to
+#                                     webpages containing information on individual
+#                                     hikes
+#
+# Integer         max_workers         The number of hikes fetched at once. A value of
+#                                     1 fetches every hike sequentially.
+#
+# Integer         parse_workers       The number of parse worker processes. 0 parses
+#                                     pages in the fetching threads.
+#
+# Boolean         stream              If True, pages are streamed and parsed as they
+#                                     are read, see fetch_page_streamed().
+#*************************************************************************************
+def get_individual_hike_data(hike_urls, max_workers = MAX_WORKERS,
+                             parse_workers = PARSE_WORKERS, stream = STREAM_PAGES):
+    """Using a list of URLs that route to webpages containing information on
+    individual hikes, this method will retrieve and organize hike data. Then, it will
+    return hike data in the format of a DataFrame.
+
+    Arguments
+    ---------
+    1. hike_urls {list} -- A list of URLs routing to individual hikes.
+    2. max_workers {Integer} -- The number of hikes fetched at once.
+    3. parse_workers {Integer} -- The number of parse worker processes, or 0.
+    4. stream {Boolean} -- Stream and parse pages as they are read.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    DataFrame -- Clean, organized and actionable hike data :)
+    """
+
+    print('\nGetting Individual Hike Data...')
+
+    # Initialize the final DataFrame that houses all hike data in an organize fashion!
+    hike_data = pd.DataFrame([hike_record.as_dict() for hike_record
+                              in iter_hike_records(hike_urls, max_workers,
+                                                   parse_workers = parse_workers,
+                                                   stream = stream)],
+                             columns = HIKE_DATA_COLUMNS)
+    # Convert the raw extracted text to column types, all at once:
+    hike_data, failures = normalize_hike_data(hike_data)
+    count_invalid_fields(failures)
+
+    # Print more performance stuff...
+    print('\nAll Hikes Loaded!\n > ' + str(len(hike_data)) + ' Hikes Successfully Loaded\n')
+    print('----------------------------------')
+    for column in HIKE_DATA_COLUMNS:
+        print('  - {0}: '.format(column.lower()), hike_data[column].count(), 'Entries')
+    print('----------------------------------')
+
+    # Sort final DataFrame by hike title:
+    hike_data.sort_values(by=['TITLE'], inplace=True)
+    # Return final DataFrame:
+    return hike_data
+
+
+#*************************************************************************************
+# Method: write_hike_records(Iterable, String, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The writer stage of the streaming pipeline. HikeRecords are appended to a CSV file
+# in batches as they are produced, and each batch is flushed to disk before the next
+# one is started. If a run fails part way through, every completed batch has already
+# been written. The CSV header is only written when the file is new. Each batch is
+# converted from raw text to column types by normalize_hike_data() before it is
+# written, and values that could not be converted are counted per field.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Integer         The number of hike records written.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Iterable        hike_records        HikeRecords to write.
+#
+# String          path                The path of the CSV file to append to.
+#
+# Integer         batch_size          The number of records written at once.
+#
+# Function        on_batch            Called with the URLs of each batch once the
+#                                     batch is on disk, e.g. to commit a checkpoint.
+#*************************************************************************************
+def write_hike_records(hike_records, path, batch_size = WRITE_BATCH_SIZE, on_batch = None):
+    """Appends HikeRecords to a CSV file in batches and, returns the number of
+    records written.
+
+    Arguments
+    ---------
+    1. hike_records {Iterable} -- HikeRecords to write.
+    2. path {String} -- The path of the CSV file to append to.
+    3. batch_size {Integer} -- The number of records written at once.
+    4. on_batch {Function} -- Called with the URLs of each batch written.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Integer -- The number of hike records written.
+    """
+
+    record_count = 0
+
+    for batch in iter_batches(hike_records, batch_size):
+        with METRICS.timer('normalize'):
+            batch_data, failures = normalize_hike_data(pd.DataFrame(
+                [hike_record.as_dict() for hike_record in batch], columns = HIKE_DATA_COLUMNS))
+        count_invalid_fields(failures)
+
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        with METRICS.timer('write'), open(path, 'a', newline = '') as csv_file:
+            batch_data.to_csv(csv_file, header = write_header, index = False)
+            csv_file.flush()
+            os.fsync(csv_file.fileno())
+
+        record_count += len(batch)
+        if on_batch is not None:
+            on_batch([hike_record.url for hike_record in batch])
+
+    return record_count
+
+
+#*************************************************************************************
+# Method: iter_batches(Iterable, Integer)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Groups the items of an iterable into lists of at most batch_size items.
+#*************************************************************************************
+def iter_batches(items, batch_size):
+    """A generator that yields lists of at most batch_size items."""
+
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+#*************************************************************************************
+# Class: CheckpointJournal
+#
+# Description
+# ------------------------------------------------------------------------------------
+# An append-only checkpoint journal for long crawls, stored as one JSON object per
+# line. The first line records the run's snapshot date and, the discovered hike URL
+# frontier. Each following line records the URLs of one batch of hikes written
+# by write_hike_records(), so journal writes happen once per batch rather than once
+# per hike. Lines cut short by a crash are ignored when the journal is loaded.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          path                The path of the journal file.
+#*************************************************************************************
+class CheckpointJournal:
+    """An append-only checkpoint journal of a crawl's frontier and finished hikes.
+
+    Arguments
+    ---------
+    1. path {String} -- The path of the journal file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _append(self, entry, mode = 'a'):
+        with open(self.path, mode) as journal_file:
+            journal_file.write(json.dumps(entry) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def start(self, snapshot_date, frontier):
+        """Starts a new journal for a run.
+
+        Arguments
+        ---------
+        1. snapshot_date {Date} -- The date of the run's snapshot.
+        2. frontier {list} -- Every hike URL the run will load.
+
+        Returns
+        -------
+        None
+        """
+
+        self._append({'snapshot_date': str(snapshot_date), 'frontier': list(frontier)},
+                     mode = 'w')
+
+    def record_done(self, urls):
+        """Records a batch of finished hike URLs.
+
+        Arguments
+        ---------
+        1. urls {list} -- The URLs of hikes written to disk.
+
+        Returns
+        -------
+        None
+        """
+
+        self._append({'done': list(urls)})
+
+    def load(self):
+        """Returns the journaled run as a dictionary with the keys 'snapshot_date',
+        'frontier' and 'done', or None if no run is journaled.
+        """
+
+        if not os.path.exists(self.path):
+            return None
+
+        checkpoint = None
+        with open(self.path) as journal_file:
+            for line in journal_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if 'frontier' in entry:
+                    checkpoint = {'snapshot_date': entry['snapshot_date'],
+                                  'frontier': entry['frontier'], 'done': set()}
+                elif checkpoint is not None:
+                    checkpoint['done'].update(entry.get('done', []))
+
+        return checkpoint
+
+    def remove(self):
+        """Removes the journal once its run is complete."""
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+#*************************************************************************************
+# Method: get_finished_hike_urls(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the set of hike URLs already written to a partial CSV file.
+#*************************************************************************************
+def get_finished_hike_urls(partial_path):
+    """Returns the set of hike URLs already written to a partial CSV file."""
+
+    if not os.path.exists(partial_path) or os.path.getsize(partial_path) == 0:
+        return set()
+
+    return set(pd.read_csv(partial_path, usecols = ['URL'], dtype = str)['URL'].dropna())
+
+
+#*************************************************************************************
+# Class: WorkQueue
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The work queue of a distributed crawl, backed by a SQLite database that the
+# coordinator and every worker open, e.g. on a volume shared by containers. The
+# coordinator publishes the discovered hike URLs once, in crawl order. Workers then
+# lease batches of URLs: a lease marks its URLs as taken until an expiry time, which
+# the worker keeps pushing back while it works (see hold_lease()) and, completing
+# the lease marks them done. Leasing happens in a single write transaction, so two
+# workers never get the same pending URL. A worker that crashes stops renewing its
+# leases, and once they expire their URLs are leased to the next worker that asks.
+# A URL whose leases have expired WORK_MAX_ATTEMPTS times, e.g. a page that crashes
+# every worker, is marked failed rather than leased forever.
+#
+# Expiry times are wall-clock seconds, so the clocks of the machines sharing a queue
+# need to agree to within a small part of the lease time.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          path                The path of the SQLite database file.
+#*************************************************************************************
+class WorkQueue:
+    """The work queue of a distributed crawl, backed by SQLite.
+
+    Arguments
+    ---------
+    1. path {String} -- The path of the SQLite database file.
+    """
+
+    # The states of a hike URL in the queue:
+    STATES = ['pending', 'leased', 'done', 'failed']
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # Transactions are started explicitly, and other processes holding the
+        # database are waited on rather than failing right away:
+        self._connection = sqlite3.connect(path, timeout = 60, isolation_level = None,
+                                           check_same_thread = False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS work_queue ('
+            'url TEXT PRIMARY KEY, position INTEGER, state TEXT, lease_id TEXT, '
+            'worker TEXT, lease_expires REAL, attempts INTEGER)')
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS work_queue_state ON work_queue (state, position)')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS queue_info (key TEXT PRIMARY KEY, value TEXT)')
+
+    @contextmanager
+    def _transaction(self):
+        # A write transaction, holding the database's write lock from the start.
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            self._connection.execute('COMMIT')
+
+    @property
+    def snapshot_date(self):
+        """The date of the snapshot the published hike URLs belong to, or None."""
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM queue_info WHERE key = 'snapshot_date'").fetchone()
+        return row[0] if row is not None else None
+
+    def publish(self, snapshot_date, urls):
+        """Replaces the queue's hike URLs with a new crawl's, all pending.
+
+        Arguments
+        ---------
+        1. snapshot_date {Date} -- The date of the crawl's snapshot.
+        2. urls {list} -- Every hike URL of the crawl, in crawl order.
+
+        Returns
+        -------
+        Integer -- The number of hike URLs published, without duplicates.
+        """
+
+        urls = list(dict.fromkeys(urls))
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM work_queue')
+            connection.executemany(
+                "INSERT INTO work_queue VALUES (?, ?, 'pending', NULL, NULL, NULL, 0)",
+                ((url, position) for position, url in enumerate(urls)))
+            connection.execute("INSERT OR REPLACE INTO queue_info VALUES ('snapshot_date', ?)",
+                               (str(snapshot_date),))
+
+        return len(urls)
+
+    def lease(self, worker, size = WORK_LEASE_SIZE, lease_seconds = WORK_LEASE_SECONDS,
+              max_attempts = WORK_MAX_ATTEMPTS):
+        """Leases up to size hike URLs, pending ones and those of expired leases, in
+        crawl order.
+
+        Arguments
+        ---------
+        1. worker {String} -- The name of the worker taking the lease.
+        2. size {Integer} -- The most hike URLs leased at once.
+        3. lease_seconds {Float} -- The seconds until the lease expires.
+        4. max_attempts {Integer} -- The leases a hike gets before it fails.
+
+        Returns
+        -------
+        Tuple -- (lease ID, list of hike URLs). The list is empty when no hike URL
+                 can be leased right now.
+        """
+
+        lease_id = uuid.uuid4().hex
+        with self._transaction() as connection:
+            now = time.time()
+            # Giving up on hikes whose every lease has expired:
+            failed = connection.execute(
+                "UPDATE work_queue SET state = 'failed' "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, max_attempts)).rowcount
+            rows = connection.execute(
+                "SELECT url, state FROM work_queue "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY position LIMIT ?", (now, size)).fetchall()
+            connection.executemany(
+                "UPDATE work_queue SET state = 'leased', lease_id = ?, worker = ?, "
+                "lease_expires = ?, attempts = attempts + 1 WHERE url = ?",
+                ((lease_id, worker, now + lease_seconds, url) for url, _ in rows))
+
+        METRICS.count('work_queue.leases', 1 if rows else 0)
+        METRICS.count('work_queue.expired', sum(state == 'leased' for _, state in rows))
+        METRICS.count('work_queue.failed', failed)
+        return lease_id, [url for url, _ in rows]
+
+    def renew(self, lease_id, lease_seconds = WORK_LEASE_SECONDS):
+        """Pushes back the expiry of a lease.
+
+        Arguments
+        ---------
+        1. lease_id {String} -- The ID returned by lease().
+        2. lease_seconds {Float} -- The seconds until the lease expires.
+
+        Returns
+        -------
+        Boolean -- False if the lease expired and its hikes were leased again.
+        """
+
+        with self._transaction() as connection:
+            renewed = connection.execute(
+                "UPDATE work_queue SET lease_expires = ? "
+                "WHERE lease_id = ? AND state = 'leased'",
+                (time.time() + lease_seconds, lease_id)).rowcount
+
+        return renewed > 0
+
+    def complete(self, lease_id, urls = None, max_attempts = WORK_MAX_ATTEMPTS):
+        """Marks the hike URLs still held by a lease as done. When urls is given,
+        the lease's other hike URLs are put back as pending instead or, marked failed
+        once they have been leased max_attempts times.
+
+        Arguments
+        ---------
+        1. lease_id {String} -- The ID returned by lease().
+        2. urls {list} -- The hike URLs of the lease that are done, or None for all.
+        3. max_attempts {Integer} -- The leases a hike gets before it fails.
+
+        Returns
+        -------
+        Integer -- The number of hike URLs marked done.
+        """
+
+        with self._transaction() as connection:
+            if urls is None:
+                return connection.execute(
+                    "UPDATE work_queue SET state = 'done' "
+                    "WHERE lease_id = ? AND state = 'leased'", (lease_id,)).rowcount
+
+            done = sum(connection.execute(
+                "UPDATE work_queue SET state = 'done' "
+                "WHERE lease_id = ? AND state = 'leased' AND url = ?",
+                (lease_id, url)).rowcount for url in urls)
+            failed = connection.execute(
+                "UPDATE work_queue SET state = 'failed' "
+                "WHERE lease_id = ? AND state = 'leased' AND attempts >= ?",
+                (lease_id, max_attempts)).rowcount
+            retried = connection.execute(
+                "UPDATE work_queue SET state = 'pending' "
+                "WHERE lease_id = ? AND state = 'leased'", (lease_id,)).rowcount
+
+        METRICS.count('work_queue.failed', failed)
+        METRICS.count('work_queue.retried', retried)
+        return done
+
+    def counts(self):
+        """Returns the number of hike URLs in each of STATES, as a dictionary."""
+
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT state, COUNT(*) FROM work_queue GROUP BY state').fetchall()
+        counts = dict.fromkeys(self.STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def urls(self):
+        """Returns every published hike URL, in crawl order."""
+
+        with self._lock:
+            return [row[0] for row in self._connection.execute(
+                'SELECT url FROM work_queue ORDER BY position')]
+
+    def close(self):
+        """Closes the database."""
+
+        with self._lock:
+            self._connection.close()
+
+
+#*************************************************************************************
+# Method: hold_lease(WorkQueue, String, Float)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A context manager that keeps a work queue lease from expiring while its block
+# runs, by renewing it from a background thread every third of lease_seconds. If the
+# lease is lost anyway, its hikes are simply scraped twice; shards are merged by
+# hike URL, so the duplicate is dropped by merge_shards().
+#*************************************************************************************
+@contextmanager
+def hold_lease(queue, lease_id, lease_seconds = WORK_LEASE_SECONDS):
+    """A context manager renewing a work queue lease while its block runs."""
+
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lease_seconds / 3):
+            if not queue.renew(lease_id, lease_seconds):
+                METRICS.count('work_queue.lost')
+                return
+
+    thread = threading.Thread(target = renew, daemon = True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+#*************************************************************************************
+# Method: finalize_hike_data(String, Date, list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Sorts the hike data written by write_hike_records() by hike title and, writes it
+# as a snapshot with each of the requested writers in WRITERS. The streamed values
+# are read back as text, so the CSV snapshot holds them exactly as they were
+# streamed. The partial file is removed once every snapshot is written.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# DataFrame       The sorted hike data, as text.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          partial_path        The path of the streamed, unsorted CSV file.
+#
+# Date            snapshot_date       The date of the snapshot.
+#
+# list            output_formats      The names of the writers in WRITERS to use,
+#                                     e.g. ['csv', 'parquet'].
+#*************************************************************************************
+def finalize_hike_data(partial_path, snapshot_date, output_formats = OUTPUT_FORMATS):
+    """Sorts streamed hike data by title and, writes it with each requested writer.
+
+    Arguments
+    ---------
+    1. partial_path {String} -- The path of the streamed, unsorted CSV file.
+    2. snapshot_date {Date} -- The date of the snapshot.
+    3. output_formats {list} -- The names of the writers in WRITERS to use.
+
+    Raises
+    ------
+    KeyError -- An output format has no writer in WRITERS.
+
+    Returns
+    -------
+    DataFrame -- The sorted hike data, as text.
+    """
+
+    hike_data = pd.read_csv(partial_path, dtype = str)
+    hike_data.sort_values(by=['TITLE'], inplace=True)
+    hike_data.reset_index(drop = True, inplace = True)
+
+    for output_format in output_formats:
+        output_path = WRITERS[output_format](hike_data, snapshot_date)
+        print(' > Snapshot Written: {0}'.format(output_path))
+
+    os.remove(partial_path)
+
+    return hike_data
+
+
+#*************************************************************************************
+# Method: snapshot_file_path(Date, String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the path of a single-file snapshot in RESULTS_PATH, for example
+# 'Results/2021-04-25_wta_hike_data.csv'.
+#*************************************************************************************
+def snapshot_file_path(snapshot_date, extension):
+    """Returns the path of a single-file snapshot in RESULTS_PATH."""
+
+    return os.path.join(RESULTS_PATH, '{0}_wta_hike_data.{1}'.format(snapshot_date, extension))
+
+
+#*************************************************************************************
+# Method: hike_table_path(Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the folder of a snapshot's HikeTable in RESULTS_PATH, for example
+# 'Results/2021-04-25_wta_hike_table'.
+#*************************************************************************************
+def hike_table_path(snapshot_date):
+    """Returns the folder of a snapshot's HikeTable."""
+
+    return os.path.join(RESULTS_PATH, '{0}_wta_hike_table'.format(snapshot_date))
+
+
+#*************************************************************************************
+# Method: shard_folder_path(Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the folder of the record shards of a distributed crawl, in SHARD_PATH, for
+# example 'Results/shards/2021-04-25'.
+#*************************************************************************************
+def shard_folder_path(snapshot_date):
+    """Returns the folder of a distributed crawl's record shards."""
+
+    return os.path.join(SHARD_PATH, str(snapshot_date))
+
+
+#*************************************************************************************
+# Method: set_results_path(String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Moves the project results folder and, every store, journal and queue kept in it:
+# STATE_STORE_PATH, RESPONSE_CACHE_PATH, HISTORY_STORE_PATH, CHECKPOINT_PATH,
+# WORK_QUEUE_PATH, SHARD_PATH and REDIRECT_CACHE_PATH. The folder is not created
+# here, but by start_run() and the commands that write to it. Used by the
+# '--results-path' option.
+#*************************************************************************************
+def set_results_path(path):
+    """Sets RESULTS_PATH and, the paths of every file kept in it."""
+
+    global RESULTS_PATH, STATE_STORE_PATH, RESPONSE_CACHE_PATH, HISTORY_STORE_PATH
+    global CHECKPOINT_PATH, WORK_QUEUE_PATH, SHARD_PATH, REDIRECT_CACHE_PATH
+    RESULTS_PATH = os.path.abspath(path)
+    STATE_STORE_PATH = os.path.join(RESULTS_PATH, 'wta_state.sqlite')
+    RESPONSE_CACHE_PATH = os.path.join(RESULTS_PATH, 'response_cache')
+    HISTORY_STORE_PATH = os.path.join(RESULTS_PATH, 'wta_history.sqlite')
+    CHECKPOINT_PATH = os.path.join(RESULTS_PATH, 'wta_crawl.checkpoint')
+    WORK_QUEUE_PATH = os.path.join(RESULTS_PATH, 'wta_work_queue.sqlite')
+    SHARD_PATH = os.path.join(RESULTS_PATH, 'shards')
+    REDIRECT_CACHE_PATH = os.path.join(RESULTS_PATH, 'wta_redirects.json')
+
+
+#*************************************************************************************
+# Method: find_previous_snapshot(Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the date and path of the most recent CSV snapshot in RESULTS_PATH taken
+# before the given date or, None when there is no earlier snapshot.
+#*************************************************************************************
+def find_previous_snapshot(snapshot_date):
+    """Returns (date, path) of the most recent earlier CSV snapshot, or None."""
+
+    if not os.path.isdir(RESULTS_PATH):
+        return None
+
+    previous = None
+    for file_name in os.listdir(RESULTS_PATH):
+        match = re.fullmatch(r'(\d{4}-\d{2}-\d{2})_wta_hike_data\.csv', file_name)
+        if match is None:
+            continue
+        file_date = datetime.strptime(match.group(1), '%Y-%m-%d').date()
+        if file_date < snapshot_date and (previous is None or file_date > previous[0]):
+            previous = (file_date, os.path.join(RESULTS_PATH, file_name))
+
+    return previous
+
+
+#*************************************************************************************
+# Method: build_trip_report_index(Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Builds a TripReportIndex for a snapshot by harvesting the site-wide trip report
+# listing at TRIP_REPORTS_URL. When an earlier CSV snapshot exists, its trip report
+# counts and dates are used as the seed and, only the trip reports written since
+# then are harvested. Otherwise, the whole listing is harvested.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# TripReportIndex The trip report counts and latest dates, keyed by hike URL.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Date            snapshot_date       The date of the snapshot being taken.
+#*************************************************************************************
+def build_trip_report_index(snapshot_date):
+    """Harvests the site-wide trip report listing into a TripReportIndex.
+
+    Arguments
+    ---------
+    1. snapshot_date {Date} -- The date of the snapshot being taken.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    TripReportIndex -- The trip report counts and latest dates, keyed by hike URL.
+    """
+
+    if isinstance(snapshot_date, str):
+        snapshot_date = datetime.strptime(snapshot_date, '%Y-%m-%d').date()
+
+    previous = find_previous_snapshot(snapshot_date)
+    if previous is None:
+        print(' > No Previous Snapshot Found, Harvesting Every Trip Report...')
+        report_index = TripReportIndex()
+    else:
+        print(' > Harvesting Trip Reports Written Since {0}...'.format(previous[0]))
+        seed = pd.read_csv(previous[1], usecols = ['URL', 'REPORT_COUNT', 'REPORT_DATE'],
+                           dtype = str)
+        report_index = TripReportIndex(seed, since = previous[0])
+
+    report_index.harvest(TRIP_REPORTS_URL)
+    METRICS.count('trip_report_pages', report_index.pages)
+    return report_index
+
+
+#*************************************************************************************
+# Method: normalize_hike_data(DataFrame)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Converts a batch of hike data, as raw text extracted from hike pages or read back
+# from a snapshot, to explicit column types with one vectorized conversion per
+# column: floats for distances, gains, highest points, ratings and coordinates,
+# nullable integers for counts, datetimes for report dates and categoricals for
+# regions and distance types. Thousands separators are dropped from numbers, and
+# report dates are read in the page format (REPORT_DATE_FORMAT), falling back to ISO
+# 8601 for dates read from snapshots. Values that are already typed pass through.
+# A value that cannot be converted, such as a DISTANCE of 'ERROR', becomes a missing
+# value and is counted as a failure of its field instead of raising.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Tuple           (DataFrame, Dictionary) -- The hike data with explicit column types
+#                 and, the number of values of each column that could not be
+#                 converted, keyed by column name.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       hike_data           Hike data with the HIKE_DATA_COLUMNS columns.
+#*************************************************************************************
+def normalize_hike_data(hike_data):
+    """Returns hike data converted to explicit column types, along with the number of
+    values of each column that could not be converted.
+
+    Arguments
+    ---------
+    1. hike_data {DataFrame} -- Hike data with the HIKE_DATA_COLUMNS columns.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Tuple -- (DataFrame with explicit column types, {column: failure count}).
+    """
+
+    typed_data = pd.DataFrame(index = hike_data.index)
+    failures = {}
+    for column in HIKE_DATA_COLUMNS:
+        values = hike_data[column]
+        if column in FLOAT_COLUMNS or column in INTEGER_COLUMNS:
+            text = values.astype('string').str.strip().str.replace(',', '', regex = False)
+            typed = pd.to_numeric(text, errors = 'coerce')
+            if column in FLOAT_COLUMNS:
+                typed = typed.astype('float64')
+            else:
+                typed = typed.round().astype('Int64')
+        elif column in DATE_COLUMNS:
+            text = values.astype(object).where(values.notna(), None)
+            typed = pd.to_datetime(text, format = REPORT_DATE_FORMAT, errors = 'coerce')
+            fallback = typed.isna() & text.notna()
+            if fallback.any():
+                typed[fallback] = pd.to_datetime(text[fallback], format = 'ISO8601',
+                                                 errors = 'coerce')
+            typed = typed.astype('datetime64[ns]')
+        elif column in CATEGORY_COLUMNS:
+            typed_data[column] = values.astype('category')
+            continue
+        else:
+            typed_data[column] = values.astype('string')
+            continue
+
+        present = values.notna() & (values.astype('string').str.strip() != '').fillna(False)
+        failures[column] = int((present & typed.isna()).sum())
+        typed_data[column] = typed
+
+    return typed_data, failures
+
+
+#*************************************************************************************
+# Method: apply_hike_data_schema(DataFrame)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Converts hike data read as text (or holding mixed types) to explicit column types
+# with normalize_hike_data(), discarding its failure counts.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# DataFrame       The hike data with explicit column types.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       hike_data           Hike data with the HIKE_DATA_COLUMNS columns.
+#*************************************************************************************
+def apply_hike_data_schema(hike_data):
+    """Returns hike data converted to explicit column types.
+
+    Arguments
+    ---------
+    1. hike_data {DataFrame} -- Hike data with the HIKE_DATA_COLUMNS columns.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    DataFrame -- The hike data with explicit column types.
+    """
+
+    return normalize_hike_data(hike_data)[0]
+
+
+#*************************************************************************************
+# Method: count_invalid_fields(Dictionary)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Records the failure counts returned by normalize_hike_data() as 'invalid_field.'
+# counters of the run metrics, which the run report lists under 'invalid_fields'.
+#*************************************************************************************
+def count_invalid_fields(failures):
+    """Records the conversion failures of each column in the run metrics."""
+
+    for column, count in failures.items():
+        if count:
+            METRICS.count('invalid_field.' + column, count)
+
+
+#*************************************************************************************
+# Method: get_arrow_schema()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the explicit Arrow schema of Parquet and Arrow IPC snapshots: float32
+# distances, gains, highest points and ratings, float64 coordinates, int32 counts,
+# date32 report dates and dictionary-encoded regions and distance types. The
+# SNAPSHOT_DATE column is used to partition snapshots. pyarrow is an optional
+# dependency, only imported when a Parquet or Arrow snapshot is written or read.
+#*************************************************************************************
+def get_arrow_schema():
+    """Returns the Arrow schema of Parquet and Arrow IPC snapshots.
+
+    Raises
+    ------
+    ImportError -- pyarrow is not installed.
+    """
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError('Writing Parquet or Arrow snapshots requires pyarrow: '
+                          'pip install pyarrow')
+
+    return pa.schema([('TITLE', pa.string()),
+                      ('REGION', pa.dictionary(pa.int32(), pa.string())),
+                      ('DISTANCE', pa.float32()),
+                      ('DIST_TYPE', pa.dictionary(pa.int32(), pa.string())),
+                      ('GAIN', pa.float32()),
+                      ('HIGHEST', pa.float32()),
+                      ('RATING', pa.float32()),
+                      ('RATING_COUNT', pa.int32()),
+                      ('LATITUDE', pa.float64()),
+                      ('LONGITUDE', pa.float64()),
+                      ('REPORT_DATE', pa.date32()),
+                      ('REPORT_COUNT', pa.int32()),
+                      ('URL', pa.string()),
+                      ('SNAPSHOT_DATE', pa.date32())])
+
+
+#*************************************************************************************
+# Method: write_csv_snapshot(DataFrame, Date) / write_json_snapshot(DataFrame, Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The CSV and JSON writers. The CSV snapshot is written as is. The JSON snapshot is a
+# list of records with lower case keys, numbers as numbers and report dates as
+# 'YYYY-MM-DD' strings. Both return the path written.
+#*************************************************************************************
+def write_csv_snapshot(hike_data, snapshot_date):
+    """Writes hike data to a CSV snapshot and, returns its path."""
+
+    path = snapshot_file_path(snapshot_date, 'csv')
+    hike_data.to_csv(path, index = False)
+    return path
+
+
+def write_json_snapshot(hike_data, snapshot_date):
+    """Writes hike data to a JSON snapshot and, returns its path."""
+
+    path = snapshot_file_path(snapshot_date, 'json')
+    json_data = apply_hike_data_schema(hike_data)
+    for column in DATE_COLUMNS:
+        json_data[column] = json_data[column].dt.strftime('%Y-%m-%d')
+    json_data.rename(columns = str.lower).to_json(path, orient = 'records')
+    return path
+
+
+#*************************************************************************************
+# Method: write_arrow_dataset(DataFrame, Date, String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Writes hike data with the schema from get_arrow_schema() to a dataset folder in
+# RESULTS_PATH, partitioned Hive-style by snapshot date and region, for example
+# 'wta_hike_data.parquet/SNAPSHOT_DATE=2021-04-25/REGION=North Cascades/'. Writing a
+# snapshot again replaces only that snapshot's partitions. Files are compressed with
+# OUTPUT_COMPRESSION when it is set.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# String          The path of the dataset folder.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       hike_data           Hike data with the HIKE_DATA_COLUMNS columns.
+#
+# Date            snapshot_date       The date of the snapshot.
+#
+# String          file_format         'parquet' or 'arrow' (Arrow IPC).
+#*************************************************************************************
+def write_arrow_dataset(hike_data, snapshot_date, file_format):
+    """Writes hike data to a dataset partitioned by snapshot date and region and,
+    returns the path of the dataset folder.
+
+    Arguments
+    ---------
+    1. hike_data {DataFrame} -- Hike data with the HIKE_DATA_COLUMNS columns.
+    2. snapshot_date {Date} -- The date of the snapshot.
+    3. file_format {String} -- 'parquet' or 'arrow' (Arrow IPC).
+
+    Raises
+    ------
+    ImportError -- pyarrow is not installed.
+
+    Returns
+    -------
+    String -- The path of the dataset folder.
+    """
+
+    schema = get_arrow_schema()
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    typed_data = apply_hike_data_schema(hike_data)
+    for column in DATE_COLUMNS:
+        typed_data[column] = typed_data[column].dt.date
+    typed_data['SNAPSHOT_DATE'] = pd.to_datetime(snapshot_date).date()
+    table = pa.Table.from_pandas(typed_data, schema = schema, preserve_index = False)
+
+    if file_format == 'parquet':
+        write_options = ds.ParquetFileFormat().make_write_options(
+            compression = OUTPUT_COMPRESSION or 'none')
+    else:
+        file_format = 'ipc'
+        write_options = ds.IpcFileFormat().make_write_options(compression = OUTPUT_COMPRESSION)
+
+    path = os.path.join(RESULTS_PATH, 'wta_hike_data.' + ('arrow' if file_format == 'ipc' else 'parquet'))
+    ds.write_dataset(table, path, format = file_format, file_options = write_options,
+                     partitioning = get_arrow_partitioning(),
+                     basename_template = 'part-{i}.' + file_format,
+                     existing_data_behavior = 'delete_matching')
+    return path
+
+
+def get_arrow_partitioning(reading = False):
+    """Returns the Hive-style snapshot date and region partitioning of datasets.
+    When reading, the region dictionary is inferred from the partition folders.
+    """
+
+    schema = get_arrow_schema()
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([schema.field('SNAPSHOT_DATE'), schema.field('REGION')]),
+                           flavor = 'hive', dictionaries = 'infer' if reading else None)
+
+
+def write_parquet_snapshot(hike_data, snapshot_date):
+    """Writes hike data to the partitioned Parquet dataset and, returns its path."""
+
+    return write_arrow_dataset(hike_data, snapshot_date, 'parquet')
+
+
+def write_arrow_snapshot(hike_data, snapshot_date):
+    """Writes hike data to the partitioned Arrow IPC dataset and, returns its path."""
+
+    return write_arrow_dataset(hike_data, snapshot_date, 'arrow')
+
+
+#*************************************************************************************
+# Method: write_table_snapshot(DataFrame, Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The 'table' writer. Saves hike data as a memory-mappable HikeTable folder, for
+# example 'Results/2021-04-25_wta_hike_table', and returns its path.
+#*************************************************************************************
+def write_table_snapshot(hike_data, snapshot_date):
+    """Writes hike data to a HikeTable folder and, returns its path."""
+
+    return HikeTable(hike_data).save(hike_table_path(snapshot_date))
+
+
+# Initializing the snapshot writers, keyed by output format:
+WRITERS = {'csv': write_csv_snapshot, 'json': write_json_snapshot,
+           'parquet': write_parquet_snapshot, 'arrow': write_arrow_snapshot,
+           'table': write_table_snapshot}
+
+
+#*************************************************************************************
+# Method: load_hike_snapshot(Date, String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Loads one snapshot from the partitioned Parquet or Arrow IPC dataset in
+# RESULTS_PATH. Only the files of the requested snapshot date are read and, the
+# columns come back with the types of get_arrow_schema(), so no types are inferred.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# DataFrame       The snapshot's hike data, sorted by hike title.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Date            snapshot_date       The date of the snapshot. None loads the latest
+#                                     snapshot in the dataset.
+#
+# String          file_format         'parquet' or 'arrow'.
+#*************************************************************************************
+def load_hike_snapshot(snapshot_date = None, file_format = 'parquet'):
+    """Loads one snapshot from a partitioned Parquet or Arrow IPC dataset.
+
+    Arguments
+    ---------
+    1. snapshot_date {Date} -- The date of the snapshot, or None for the latest.
+    2. file_format {String} -- 'parquet' or 'arrow'.
+
+    Raises
+    ------
+    ImportError -- pyarrow is not installed.
+
+    Returns
+    -------
+    DataFrame -- The snapshot's hike data, sorted by hike title.
+    """
+
+    get_arrow_schema()
+    import pyarrow.dataset as ds
+
+    path = os.path.join(RESULTS_PATH, 'wta_hike_data.' + file_format)
+    dataset = ds.dataset(path, format = 'parquet' if file_format == 'parquet' else 'ipc',
+                         partitioning = get_arrow_partitioning(reading = True))
+
+    if snapshot_date is None:
+        snapshot_date = max(dataset.to_table(columns = ['SNAPSHOT_DATE'])
+                            .column('SNAPSHOT_DATE').to_pylist())
+    snapshot_date = pd.to_datetime(snapshot_date).date()
+
+    table = dataset.to_table(columns = HIKE_DATA_COLUMNS,
+                             filter = ds.field('SNAPSHOT_DATE') == snapshot_date)
+    hike_data = table.to_pandas()
+    hike_data.sort_values(by=['TITLE'], inplace=True)
+    return hike_data.reset_index(drop = True)
+
+
+#*************************************************************************************
+# Class: HistoryStore
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A SQLite history of every snapshot, kept as slowly changing rows keyed by hike URL.
+# Each row holds every data field of a hike along with the snapshot date it first
+# appeared in (valid_from) and the snapshot date it was changed or removed in
+# (valid_to, or NULL while it is current). Adding a snapshot only closes the rows of
+# hikes that changed or were removed and, inserts rows for hikes that changed or
+# were added. Unchanged hikes are not stored again, so the store grows with the
+# number of changes rather than the number of snapshots. Hikes are compared by a
+# hash of their typed data fields (see row_hashes()), with floats rounded to
+# DIFF_FLOAT_TOLERANCE, so values that diff_hike_data() treats as equal, such as '6'
+# and '6.0', do not count as changes. Rows are indexed by URL and by snapshot date,
+# so any snapshot can be read back with a single range query.
+#
+# Snapshots must be added in date order. Adding the latest snapshot date again
+# replaces it.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# String          path                The path of the SQLite database file.
+#*************************************************************************************
+class HistoryStore:
+    """A slowly changing history of every snapshot, backed by SQLite.
+
+    Arguments
+    ---------
+    1. path {String} -- The path of the SQLite database file.
+    """
+
+    # The data field columns, as lowercase SQL column names, other than the URL:
+    FIELD_COLUMNS = [column.lower() for column in HIKE_DATA_COLUMNS if column != 'URL']
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(
+            'CREATE TABLE IF NOT EXISTS snapshots ('
+            'snapshot_date TEXT PRIMARY KEY, row_count INTEGER, added_at TEXT);'
+            'CREATE TABLE IF NOT EXISTS hike_history ('
+            'url TEXT NOT NULL, valid_from TEXT NOT NULL, valid_to TEXT, row_hash TEXT, '
+            + ', '.join('{0} TEXT'.format(column) for column in self.FIELD_COLUMNS) + ', '
+            'PRIMARY KEY (url, valid_from));'
+            'CREATE INDEX IF NOT EXISTS hike_history_valid_from ON hike_history (valid_from);'
+            'CREATE INDEX IF NOT EXISTS hike_history_valid_to ON hike_history (valid_to);')
+        self._connection.commit()
+
+    def snapshot_dates(self):
+        """Returns the dates of every stored snapshot, oldest first."""
+
+        return [row[0] for row in self._connection.execute(
+            'SELECT snapshot_date FROM snapshots ORDER BY snapshot_date')]
+
+    def row_count(self):
+        """Returns the number of rows stored for all snapshots."""
+
+        return self._connection.execute('SELECT COUNT(*) FROM hike_history').fetchone()[0]
+
+    @staticmethod
+    def row_hashes(hike_data):
+        """Returns a hash of each hike's data fields, as a list. The fields are
+        converted to column types with apply_hike_data_schema() and, floats are
+        rounded to the decimals of DIFF_FLOAT_TOLERANCE before they are hashed."""
+
+        typed_data = apply_hike_data_schema(hike_data[HIKE_DATA_COLUMNS])
+        digits = max(0, round(-math.log10(DIFF_FLOAT_TOLERANCE)))
+        for column in FLOAT_COLUMNS:
+            typed_data[column] = typed_data[column].round(digits)
+        typed_data = typed_data.astype(object)
+        typed_data = typed_data.where(typed_data.notna(), None)
+        return [hashlib.sha1('\x1f'.join('' if value is None else str(value)
+                                         for value in row).encode()).hexdigest()[ : 16]
+                for row in typed_data.itertuples(index = False)]
+
+    def snapshot_hike_count(self, snapshot_date):
+        """Returns the number of hikes in a stored snapshot or, None when it is not
+        stored."""
+
+        row = self._connection.execute('SELECT row_count FROM snapshots WHERE snapshot_date = ?',
+                                       (str(snapshot_date), )).fetchone()
+        return row[0] if row is not None else None
+
+    def add_snapshot(self, hike_data, snapshot_date):
+        """Adds a snapshot to the history and, returns the number of hikes 'added',
+        'removed', 'changed' and 'unchanged' since the previous snapshot.
+
+        Arguments
+        ---------
+        1. hike_data {DataFrame} -- Hike data with the HIKE_DATA_COLUMNS columns.
+        2. snapshot_date {Date} -- The date of the snapshot.
+
+        Raises
+        ------
+        ValueError -- The snapshot is older than the latest stored snapshot.
+
+        Returns
+        -------
+        Dictionary -- The number of hikes added, removed, changed and unchanged.
+        """
+
+        snapshot_date = str(snapshot_date)
+        snapshot_dates = self.snapshot_dates()
+        if snapshot_dates and snapshot_date < snapshot_dates[-1]:
+            raise ValueError('Snapshot {0} is older than the latest stored snapshot, {1}. '
+                             'Rebuild the history store with: wta-scraper '
+                             'history --rebuild'.format(snapshot_date, snapshot_dates[-1]))
+        if snapshot_date in snapshot_dates:
+            self.remove_latest_snapshot()
+
+        # Hashing each hike's typed data fields to find the hikes that changed. The
+        # current rows are hashed again, so stores written before the hashes were
+        # typed are compared the same way...
+        new_rows = hike_data[HIKE_DATA_COLUMNS].drop_duplicates(subset = ['URL'])
+        new_rows = new_rows[new_rows['URL'].notna()].astype(object)
+        new_rows = new_rows.where(new_rows.notna(), None)
+        new_rows.insert(0, 'ROW_HASH', self.row_hashes(new_rows))
+
+        current_rows = pd.read_sql('SELECT url, {0} FROM hike_history '
+                                   'WHERE valid_to IS NULL'.format(', '.join(self.FIELD_COLUMNS)),
+                                   self._connection)
+        current_rows.columns = [column.upper() for column in current_rows.columns]
+        current_rows = pd.DataFrame({'URL': current_rows['URL'],
+                                     'CURRENT_HASH': self.row_hashes(current_rows)})
+        merged = current_rows.merge(new_rows, on = 'URL', how = 'outer', indicator = True)
+        in_both = merged['_merge'] == 'both'
+        changed = in_both & (merged['CURRENT_HASH'] != merged['ROW_HASH'])
+        removed = merged['_merge'] == 'left_only'
+        added = merged['_merge'] == 'right_only'
+
+        closed_urls = merged.loc[changed | removed, 'URL']
+        inserted_rows = merged.loc[changed | added, ['URL', 'ROW_HASH'] + [
+            column for column in HIKE_DATA_COLUMNS if column != 'URL']].astype(object)
+        inserted_rows = inserted_rows.where(inserted_rows.notna(), None)
+
+        with self._connection:
+            self._connection.executemany(
+                'UPDATE hike_history SET valid_to = ? WHERE url = ? AND valid_to IS NULL',
+                ((snapshot_date, url) for url in closed_urls))
+            self._connection.executemany(
+                'INSERT INTO hike_history (url, valid_from, valid_to, row_hash, {0}) '
+                'VALUES (?, ?, NULL, ?, {1})'.format(
+                    ', '.join(self.FIELD_COLUMNS), ', '.join('?' * len(self.FIELD_COLUMNS))),
+                ((row[0], snapshot_date) + tuple(row[1 : ])
+                 for row in inserted_rows.itertuples(index = False)))
+            self._connection.execute('INSERT INTO snapshots VALUES (?, ?, ?)',
+                                     (snapshot_date, len(new_rows), datetime.now().isoformat()))
+
+        return {'added': int(added.sum()), 'removed': int(removed.sum()),
+                'changed': int(changed.sum()), 'unchanged': int((in_both & ~changed).sum())}
+
+    def remove_latest_snapshot(self):
+        """Removes the latest snapshot, reopening the rows it closed."""
+
+        snapshot_dates = self.snapshot_dates()
+        if not snapshot_dates:
+            return
+
+        with self._connection:
+            self._connection.execute('DELETE FROM hike_history WHERE valid_from = ?',
+                                     (snapshot_dates[-1],))
+            self._connection.execute('UPDATE hike_history SET valid_to = NULL WHERE valid_to = ?',
+                                     (snapshot_dates[-1],))
+            self._connection.execute('DELETE FROM snapshots WHERE snapshot_date = ?',
+                                     (snapshot_dates[-1],))
+
+    def load_snapshot(self, snapshot_date):
+        """Returns a stored snapshot as text, with the HIKE_DATA_COLUMNS columns,
+        sorted by hike title or, None when the snapshot is not stored.
+
+        Arguments
+        ---------
+        1. snapshot_date {Date} -- The date of the snapshot.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        DataFrame -- The hike data of the snapshot, or None.
+        """
+
+        snapshot_date = str(snapshot_date)
+        if snapshot_date not in self.snapshot_dates():
+            return None
+
+        hike_data = pd.read_sql(
+            'SELECT {0}, url FROM hike_history '
+            'WHERE valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)'.format(
+                ', '.join(self.FIELD_COLUMNS)),
+            self._connection, params = (snapshot_date, snapshot_date))
+        hike_data.columns = HIKE_DATA_COLUMNS
+        hike_data.sort_values(by = ['TITLE'], inplace = True)
+        return hike_data.reset_index(drop = True)
+
+    def close(self):
+        """Closes the database."""
+
+        self._connection.close()
+
+
+#*************************************************************************************
+# Method: load_snapshot_data(Date, HistoryStore)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the hike data of a snapshot as text, read from the history store when it
+# holds the snapshot or, from the snapshot's CSV file in RESULTS_PATH otherwise.
+#*************************************************************************************
+def load_snapshot_data(snapshot_date, history_store = None):
+    """Returns the hike data of a snapshot as text.
+
+    Raises
+    ------
+    UsageError -- The snapshot is neither in the history store nor in RESULTS_PATH.
+    """
+
+    if history_store is not None:
+        hike_data = history_store.load_snapshot(snapshot_date)
+        if hike_data is not None:
+            return hike_data
+
+    path = snapshot_file_path(snapshot_date, 'csv')
+    if not os.path.exists(path):
+        raise UsageError('No snapshot found for {0}'.format(snapshot_date))
+    return pd.read_csv(path, dtype = str)
+
+
+#*************************************************************************************
+# Method: list_snapshot_dates(HistoryStore)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the dates of every snapshot in the history store or in RESULTS_PATH as CSV
+# files, oldest first.
+#*************************************************************************************
+def list_snapshot_dates(history_store = None):
+    """Returns the dates of every available snapshot, oldest first."""
+
+    snapshot_dates = set(history_store.snapshot_dates()) if history_store is not None else set()
+    if os.path.isdir(RESULTS_PATH):
+        for file_name in os.listdir(RESULTS_PATH):
+            match = re.fullmatch(r'(\d{4}-\d{2}-\d{2})_wta_hike_data\.csv', file_name)
+            if match is not None:
+                snapshot_dates.add(match.group(1))
+
+    return sorted(snapshot_dates)
+
+
+#*************************************************************************************
+# Method: diff_hike_data(DataFrame, DataFrame)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Works out which hikes were added, removed or changed between two snapshots in one
+# vectorized pass. Both snapshots are aligned on their hike URLs and, every data field
+# is compared at once as typed values (see apply_hike_data_schema()), so '6' and
+# '6.0' are equal, two missing values are equal and, floats within
+# DIFF_FLOAT_TOLERANCE of each other are equal. The changes are returned as a
+# compact delta holding only the changed hikes: added hikes with all of their data
+# fields, removed hikes with their URL only and, changed hikes with only the data
+# fields that changed, listed in CHANGED_FIELDS.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Tuple           (delta DataFrame, summary Dictionary). The delta has the columns
+#                 CHANGE, URL, CHANGED_FIELDS and the other HIKE_DATA_COLUMNS. The
+#                 summary holds the number of hikes 'added', 'removed', 'changed' and
+#                 'unchanged' and, the number of changed hikes per data field.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       old_data            The hike data of the older snapshot.
+#
+# DataFrame       new_data            The hike data of the newer snapshot.
+#*************************************************************************************
+def diff_hike_data(old_data, new_data):
+    """Works out the hikes added, removed and changed between two snapshots.
+
+    Arguments
+    ---------
+    1. old_data {DataFrame} -- The hike data of the older snapshot.
+    2. new_data {DataFrame} -- The hike data of the newer snapshot.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    Tuple -- (delta DataFrame, summary Dictionary)
+    """
+
+    field_columns = [column for column in HIKE_DATA_COLUMNS if column != 'URL']
+
+    def align(hike_data, urls):
+        # Indexes text and typed copies of the hike data by URL, on the same URLs.
+        text = hike_data[HIKE_DATA_COLUMNS].drop_duplicates(subset = ['URL']).set_index('URL')
+        typed = apply_hike_data_schema(text.reset_index()).set_index('URL')
+        for column in CATEGORY_COLUMNS:
+            typed[column] = typed[column].astype('string')
+        return text.reindex(urls), typed.reindex(urls)
+
+    old_urls = pd.Index(old_data['URL'].dropna().unique())
+    new_urls = pd.Index(new_data['URL'].dropna().unique())
+    urls = old_urls.union(new_urls).rename('URL')
+    _, old_typed = align(old_data, urls)
+    new_text, new_typed = align(new_data, urls)
+
+    # Comparing every data field of every hike at once. Floats within
+    # DIFF_FLOAT_TOLERANCE of each other are equal, which ignores rounding noise in
+    # coordinates such as -121.48289999999996 and -121.4829...
+    same = pd.DataFrame({column: (old_typed[column].sub(new_typed[column]).abs()
+                                  <= DIFF_FLOAT_TOLERANCE
+                                  if column in FLOAT_COLUMNS
+                                  else old_typed[column].eq(new_typed[column])).fillna(False)
+                                 | (old_typed[column].isna() & new_typed[column].isna())
+                         for column in field_columns}, index = urls).astype(bool)
+    in_old = urls.isin(old_urls)
+    in_new = urls.isin(new_urls)
+    changed_fields = (~same).mul(in_old & in_new, axis = 0).astype(bool)
+    changed = changed_fields.any(axis = 1).to_numpy()
+
+    change = pd.Series('', index = urls)
+    change[~in_old] = 'added'
+    change[~in_new] = 'removed'
+    change[changed] = 'changed'
+
+    # Building the compact delta of the changed hikes only...
+    delta = new_text[field_columns].where(changed_fields.add(~in_old, axis = 0).astype(bool))
+    delta.insert(0, 'CHANGED_FIELDS', changed_fields.apply(
+        lambda row: '|'.join(row.index[row]), axis = 1).where(changed))
+    delta.insert(0, 'CHANGE', change)
+    delta = delta[change != ''].reset_index()
+    delta = delta[['CHANGE', 'URL', 'CHANGED_FIELDS'] + field_columns]
+
+    summary = {'added': int((~in_old).sum()), 'removed': int((~in_new).sum()),
+               'changed': int(changed.sum()),
+               'unchanged': int((in_old & in_new).sum() - changed.sum()),
+               'fields': {column: int(count) for column, count
+                          in changed_fields.sum().items() if count}}
+
+    return delta, summary
+
+
+#*************************************************************************************
+# Method: diff_snapshots(Date, Date, String)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The 'diff' command. Loads two snapshots, from the history store or from their CSV
+# files, works out their differences with diff_hike_data() and, writes the delta to
+# a CSV file, for example 'Results/2019-11-16_2021-04-25_wta_hike_delta.csv'. When no
+# dates are given, the two most recent snapshots are compared.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Tuple           (delta DataFrame, summary Dictionary), see diff_hike_data().
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Date            old_date            The date of the older snapshot, or None.
+#
+# Date            new_date            The date of the newer snapshot, or None.
+#
+# String          delta_path          The path of the delta file. None writes it to
+#                                     RESULTS_PATH and, '' does not write it.
+#*************************************************************************************
+def diff_snapshots(old_date = None, new_date = None, delta_path = None):
+    """Compares two snapshots and, writes the hikes that changed to a delta file.
+
+    Arguments
+    ---------
+    1. old_date {Date} -- The date of the older snapshot, or None.
+    2. new_date {Date} -- The date of the newer snapshot, or None.
+    3. delta_path {String} -- The path of the delta file, None or ''.
+
+    Raises
+    ------
+    UsageError -- Fewer than two snapshots are available or, a snapshot is missing.
+
+    Returns
+    -------
+    Tuple -- (delta DataFrame, summary Dictionary)
+    """
+
+    history_store = HistoryStore(HISTORY_STORE_PATH) if os.path.exists(HISTORY_STORE_PATH) else None
+    try:
+        if old_date is None or new_date is None:
+            snapshot_dates = list_snapshot_dates(history_store)
+            if len(snapshot_dates) < 2:
+                raise UsageError('At least two snapshots are needed to diff')
+            old_date, new_date = snapshot_dates[-2 : ]
+
+        with METRICS.timer('diff'):
+            delta, summary = diff_hike_data(load_snapshot_data(old_date, history_store),
+                                            load_snapshot_data(new_date, history_store))
+    finally:
+        if history_store is not None:
+            history_store.close()
+
+    print('\nChanges From {0} To {1}:'.format(old_date, new_date))
+    print('  - {added} Hikes Added, {removed} Hikes Removed, {changed} Hikes Changed, '
+          '{unchanged} Hikes Unchanged'.format(**summary))
+    for column, count in summary['fields'].items():
+        print('  - {0}: {1} Hikes Changed'.format(column.lower(), count))
+
+    if delta_path is None:
+        delta_path = os.path.join(RESULTS_PATH, '{0}_{1}_wta_hike_delta.csv'.format(
+            old_date, new_date))
+    if delta_path:
+        delta.to_csv(delta_path, index = False)
+        print(' > Delta Written: {0} ({1} Rows)'.format(delta_path, len(delta)))
+
+    return delta, summary
+
+
+#*************************************************************************************
+# Method: rebuild_history_store()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The 'history --rebuild' command. Rebuilds the history store from every CSV snapshot
+# in RESULTS_PATH, oldest first.
+#*************************************************************************************
+def rebuild_history_store():
+    """Rebuilds the history store from the CSV snapshots in RESULTS_PATH."""
+
+    if os.path.exists(HISTORY_STORE_PATH):
+        os.remove(HISTORY_STORE_PATH)
+
+    history_store = HistoryStore(HISTORY_STORE_PATH)
+    for snapshot_date in list_snapshot_dates():
+        changes = history_store.add_snapshot(load_snapshot_data(snapshot_date), snapshot_date)
+        print(' > Snapshot {0} Added: {added} Added, {removed} Removed, {changed} Changed, '
+              '{unchanged} Unchanged'.format(snapshot_date, **changes))
+    print_history_store(history_store)
+    history_store.close()
+
+
+def print_history_store(history_store):
+    """Prints the snapshots and number of rows in a history store."""
+
+    snapshot_dates = history_store.snapshot_dates()
+    print('History Store: {0} Snapshots ({1}), {2} Rows'.format(
+        len(snapshot_dates), ', '.join(snapshot_dates) or 'None', history_store.row_count()))
+
+
+#*************************************************************************************
+# Method: export_snapshot(Date, list)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The 'export' command. Writes a snapshot, from the history store or its CSV file,
+# again with each of the requested writers in WRITERS, for example to add a Parquet
+# dataset to a snapshot that was only written as CSV.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# list            The paths written.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Date            snapshot_date       The date of the snapshot to export or, None for
+#                                     the most recent snapshot.
+#
+# list            output_formats      The snapshot formats to write, from WRITERS.
+#                                     None writes OUTPUT_FORMATS.
+#*************************************************************************************
+def export_snapshot(snapshot_date = None, output_formats = None):
+    """Writes a stored snapshot with each of the requested writers.
+
+    Arguments
+    ---------
+    1. snapshot_date {Date} -- The date of the snapshot, or None.
+    2. output_formats {list} -- The snapshot formats to write, from WRITERS.
+
+    Raises
+    ------
+    UsageError -- There are no snapshots or, the snapshot is missing.
+
+    Returns
+    -------
+    list -- The paths written.
+    """
+
+    history_store = HistoryStore(HISTORY_STORE_PATH) if os.path.exists(HISTORY_STORE_PATH) else None
+    try:
+        if snapshot_date is None:
+            snapshot_dates = list_snapshot_dates(history_store)
+            if not snapshot_dates:
+                raise UsageError('No snapshots found in {0}'.format(RESULTS_PATH))
+            snapshot_date = snapshot_dates[-1]
+        hike_data = load_snapshot_data(snapshot_date, history_store)
+    finally:
+        if history_store is not None:
+            history_store.close()
+
+    output_paths = []
+    for output_format in output_formats or OUTPUT_FORMATS:
+        output_paths.append(WRITERS[output_format](hike_data, snapshot_date))
+        print(' > Snapshot Written: {0}'.format(output_paths[-1]))
+
+    return output_paths
+
+
+#*************************************************************************************
+# Method: get_run_stats()
+#
+# Description
+# ------------------------------------------------------------------------------------
+# The 'stats' command. Summarizes what is in RESULTS_PATH: the snapshots and the
+# number of hikes in the most recent one, its run report, the work queue of a
+# distributed crawl and, whether an interrupted run can be resumed. Only the standard
+# library is used, so the command answers without importing pandas.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# Dictionary      The 'results_path', 'snapshots', 'latest_snapshot', 'hikes',
+#                 'run_report', 'work_queue' and 'checkpoint' of the results folder.
+#                 Missing parts are None.
+#*************************************************************************************
+def get_run_stats():
+    """Returns a summary of the snapshots, run report, work queue and checkpoint in
+    RESULTS_PATH."""
+
+    history_store = HistoryStore(HISTORY_STORE_PATH) if os.path.exists(HISTORY_STORE_PATH) else None
+    try:
+        snapshot_dates = list_snapshot_dates(history_store)
+        latest_date = snapshot_dates[-1] if snapshot_dates else None
+        hike_count = None
+        if history_store is not None and latest_date is not None:
+            hike_count = history_store.snapshot_hike_count(latest_date)
+    finally:
+        if history_store is not None:
+            history_store.close()
+
+    csv_path = snapshot_file_path(latest_date, 'csv')
+    if hike_count is None and latest_date is not None and os.path.exists(csv_path):
+        with open(csv_path, newline = '') as csv_file:
+            hike_count = sum(1 for _ in csv.reader(csv_file)) - 1
+
+    run_report = None
+    report_path = os.path.join(RESULTS_PATH, '{0}_run_report.json'.format(latest_date))
+    if latest_date is not None and os.path.exists(report_path):
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+        run_report = {key: report[key] for key in ('finished', 'duration_s', 'counters',
+                                                   'invalid_fields', 'fetches_avoided')
+                      if key in report}
+
+    work_queue = None
+    if os.path.exists(WORK_QUEUE_PATH):
+        queue = WorkQueue(WORK_QUEUE_PATH)
+        work_queue = {'snapshot_date': queue.snapshot_date, 'counts': queue.counts()}
+        queue.close()
+
+    return {'results_path': RESULTS_PATH, 'snapshots': snapshot_dates,
+            'latest_snapshot': latest_date, 'hikes': hike_count, 'run_report': run_report,
+            'work_queue': work_queue, 'checkpoint': os.path.exists(CHECKPOINT_PATH)}
+
+
+def print_run_stats(stats):
+    """Prints the summary returned by get_run_stats()."""
+
+    print('Results Path: {0}'.format(stats['results_path']))
+    print('Snapshots: {0} ({1})'.format(len(stats['snapshots']),
+                                        ', '.join(stats['snapshots']) or 'None'))
+    if stats['latest_snapshot'] is not None:
+        print('Latest Snapshot: {0}, {1} Hikes'.format(stats['latest_snapshot'], stats['hikes']))
+    if stats['run_report'] is not None:
+        run_report = stats['run_report']
+        print('Run Report: Finished {0}, {1:.1f} Seconds, {2} Requests, '
+              '{3} Invalid Fields'.format(run_report.get('finished'),
+                                          run_report.get('duration_s', 0),
+                                          run_report.get('counters', {}).get('requests', 0),
+                                          sum(run_report.get('invalid_fields', {}).values())))
+        if 'fetches_avoided' in run_report:
+            print('Fetches Avoided: {duplicate_hike_urls} Duplicate Hike URLs, '
+                  '{redirected_hike_urls} Redirected Hike URLs, {redirects} Redirects'.format(
+                      **run_report['fetches_avoided']))
+    if stats['work_queue'] is not None:
+        work_queue = stats['work_queue']
+        print('Work Queue: {0} ({1})'.format(work_queue['snapshot_date'], ', '.join(
+            '{0} {1}'.format(count, state) for state, count in work_queue['counts'].items())))
+    print('Checkpoint: {0}'.format('Resumable' if stats['checkpoint'] else 'None'))
+
+
+#*************************************************************************************
+# Class: HikeIndex
+#
+# Description
+# ------------------------------------------------------------------------------------
+# An in-memory query layer over a snapshot's hike data, built once so that questions
+# such as "hikes within 30 km of this point with under 1,000 ft of gain" are answered
+# without scanning every hike. It holds:
+#   - A spatial grid: every hike with valid coordinates is placed in a cell of about
+#     cell_km by cell_km, and the hikes are sorted by cell, so the hikes of a row of
+#     cells are one contiguous slice found with a binary search. A radius query only
+#     measures the great-circle distance to the hikes in the cells the circle
+#     touches.
+#   - Sorted numeric indexes on the INDEXED_COLUMNS, so a range filter is two binary
+#     searches.
+# nearby() and filter() return rows of the typed hike data (see
+# apply_hike_data_schema()). Ranges are given as keyword arguments named after lower
+# case columns, e.g. gain = (None, 1000), with None for an open end; both ends are
+# included. Distances are in miles, gains and highest points in feet and, radii in
+# kilometers.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       hike_data           Hike data, as text or typed values, with the
+#                                     HIKE_DATA_COLUMNS columns.
+#
+# Float           cell_km             The size of a grid cell, in kilometers.
+#*************************************************************************************
+class HikeIndex:
+    """A spatial grid and sorted numeric indexes over a snapshot's hike data.
+
+    Arguments
+    ---------
+    1. hike_data {DataFrame} -- Hike data with the HIKE_DATA_COLUMNS columns.
+    2. cell_km {Float} -- The size of a grid cell, in kilometers.
+    """
+
+    # The columns with a sorted numeric index:
+    INDEXED_COLUMNS = ['DISTANCE', 'GAIN', 'HIGHEST', 'RATING', 'RATING_COUNT', 'REPORT_COUNT']
+
+    def __init__(self, hike_data, cell_km = HIKE_INDEX_CELL_KM):
+        self.hike_data = apply_hike_data_schema(hike_data.reset_index(drop = True))
+        self.cell_km = cell_km
+
+        # Building the numeric indexes: each column's values, sorted, along with the
+        # positions of their rows. Missing values are left out.
+        self.columns = {}
+        self.sorted_indexes = {}
+        for column in self.INDEXED_COLUMNS:
+            values = self.hike_data[column].astype('float64').to_numpy()
+            self.columns[column] = values
+            positions = np.flatnonzero(~np.isnan(values))
+            order = positions[np.argsort(values[positions], kind = 'stable')]
+            self.sorted_indexes[column] = (values[order], order)
+
+        # Building the spatial grid over the hikes with valid coordinates:
+        latitudes = self.hike_data['LATITUDE'].to_numpy(dtype = 'float64', na_value = np.nan)
+        longitudes = self.hike_data['LONGITUDE'].to_numpy(dtype = 'float64', na_value = np.nan)
+        valid = (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+        self.latitudes = np.radians(latitudes)
+        self.longitudes = np.radians(longitudes)
+
+        self.cell_degrees = cell_km / EARTH_RADIUS_KM * 180 / np.pi
+        positions = np.flatnonzero(valid)
+        keys = self._cell_keys(latitudes[positions], longitudes[positions])
+        order = np.argsort(keys, kind = 'stable')
+        self.cell_keys = keys[order]
+        self.cell_positions = positions[order]
+
+    def _cell_keys(self, latitudes, longitudes):
+        """Returns the grid cell keys of coordinates, in degrees."""
+
+        rows = np.floor((np.asarray(latitudes) + 90) / self.cell_degrees).astype('int64')
+        columns = np.floor((np.asarray(longitudes) + 180) / self.cell_degrees).astype('int64')
+        return rows * GRID_ROW_STRIDE + columns
+
+    def _range_positions(self, column, low = None, high = None):
+        """Returns the positions of the rows whose value of column is within [low,
+        high], in value order."""
+
+        values, order = self.sorted_indexes[column]
+        start = 0 if low is None else np.searchsorted(values, low, side = 'left')
+        stop = len(values) if high is None else np.searchsorted(values, high, side = 'right')
+        return order[start : stop]
+
+    def _filter_positions(self, positions, ranges):
+        """Returns the positions, among the given ones, of the rows within every
+        range."""
+
+        keep = np.ones(len(positions), dtype = bool)
+        for column, (low, high) in ranges.items():
+            values = self.columns[column][positions]
+            if low is not None:
+                keep &= values >= low
+            if high is not None:
+                keep &= values <= high
+        return positions[keep]
+
+    def _parse_ranges(self, ranges):
+        """Returns keyword ranges keyed by upper case column name."""
+
+        parsed = {}
+        for name, bounds in ranges.items():
+            column = name.upper()
+            if column not in self.sorted_indexes:
+                raise ValueError('{0} is not an indexed column, use one of: {1}'.format(
+                    name, ', '.join(column.lower() for column in self.INDEXED_COLUMNS)))
+            low, high = bounds
+            parsed[column] = (low, high)
+        return parsed
+
+    def filter_positions(self, **ranges):
+        """Returns the positions of the rows within every range, in row order.
+
+        Arguments
+        ---------
+        1. ranges {Tuple} -- (low, high) bounds keyed by lower case column name.
+
+        Raises
+        ------
+        ValueError -- A range names a column without a numeric index.
+
+        Returns
+        -------
+        ndarray -- The row positions.
+        """
+
+        ranges = self._parse_ranges(ranges)
+        if not ranges:
+            return np.arange(len(self.hike_data))
+
+        # Starting from the narrowest range, then checking the others on its rows:
+        candidates = min((self._range_positions(column, low, high)
+                          for column, (low, high) in ranges.items()), key = len)
+        return np.sort(self._filter_positions(candidates, ranges))
+
+    def nearby_positions(self, latitude, longitude, radius_km, **ranges):
+        """Returns the positions of the rows within radius_km of a point and every
+        range, along with their distances in kilometers, nearest first.
+
+        Arguments
+        ---------
+        1. latitude {Float} -- The latitude of the point, in degrees.
+        2. longitude {Float} -- The longitude of the point, in degrees.
+        3. radius_km {Float} -- The search radius, in kilometers.
+        4. ranges {Tuple} -- (low, high) bounds keyed by lower case column name.
+
+        Raises
+        ------
+        ValueError -- A range names a column without a numeric index.
+
+        Returns
+        -------
+        Tuple -- (ndarray of row positions, ndarray of distances in kilometers).
+        """
+
+        ranges = self._parse_ranges(ranges)
+
+        # Collecting the hikes of every grid cell the circle touches, one contiguous
+        # slice per row of cells:
+        radius_degrees = radius_km / EARTH_RADIUS_KM * 180 / np.pi
+        low_latitude = max(-90.0, latitude - radius_degrees)
+        high_latitude = min(90.0, latitude + radius_degrees)
+        # Longitude degrees shrink towards the poles, so the range is widened for the
+        # latitude nearest to a pole (and covers every longitude around a pole):
+        widest = np.cos(np.radians(max(abs(low_latitude), abs(high_latitude))))
+        if widest * 180 <= radius_degrees:
+            low_longitude, high_longitude = -180.0, 180.0
+        else:
+            low_longitude = longitude - radius_degrees / widest
+            high_longitude = longitude + radius_degrees / widest
+
+        slices = []
+        for low, high in wrap_longitudes(low_longitude, high_longitude):
+            low_key, high_key = self._cell_keys([low_latitude, high_latitude], [low, high])
+            for row in range(low_key // GRID_ROW_STRIDE, high_key // GRID_ROW_STRIDE + 1):
+                row_start = row * GRID_ROW_STRIDE
+                start = np.searchsorted(self.cell_keys, row_start + low_key % GRID_ROW_STRIDE, side = 'left')
+                stop = np.searchsorted(self.cell_keys, row_start + high_key % GRID_ROW_STRIDE, side = 'right')
+                if stop > start:
+                    slices.append(self.cell_positions[start : stop])
+        candidates = np.concatenate(slices) if slices else np.empty(0, dtype = 'int64')
+        if ranges:
+            candidates = self._filter_positions(candidates, ranges)
+
+        # Measuring the great-circle distance to the candidates only:
+        distances = haversine_km(np.radians(latitude), np.radians(longitude),
+                                 self.latitudes[candidates], self.longitudes[candidates])
+        within = distances <= radius_km
+        candidates, distances = candidates[within], distances[within]
+        order = np.argsort(distances, kind = 'stable')
+        return candidates[order], distances[order]
+
+    def filter(self, **ranges):
+        """Returns the hikes within every range, e.g. filter(gain = (None, 1000)).
+
+        Arguments
+        ---------
+        1. ranges {Tuple} -- (low, high) bounds keyed by lower case column name.
+
+        Raises
+        ------
+        ValueError -- A range names a column without a numeric index.
+
+        Returns
+        -------
+        DataFrame -- The matching hikes, typed, in row order.
+        """
+
+        return self.hike_data.iloc[self.filter_positions(**ranges)]
+
+    def nearby(self, latitude, longitude, radius_km, limit = None, **ranges):
+        """Returns the hikes within radius_km of a point and every range, nearest
+        first, with their distance in a DISTANCE_KM column.
+
+        Arguments
+        ---------
+        1. latitude {Float} -- The latitude of the point, in degrees.
+        2. longitude {Float} -- The longitude of the point, in degrees.
+        3. radius_km {Float} -- The search radius, in kilometers.
+        4. limit {Integer} -- The most hikes returned, or None for all of them.
+        5. ranges {Tuple} -- (low, high) bounds keyed by lower case column name.
+
+        Raises
+        ------
+        ValueError -- A range names a column without a numeric index.
+
+        Returns
+        -------
+        DataFrame -- The matching hikes, typed, nearest first.
+        """
+
+        positions, distances = self.nearby_positions(latitude, longitude, radius_km, **ranges)
+        return self.hike_data.iloc[positions[ : limit]].assign(DISTANCE_KM = distances[ : limit])
+
+    @classmethod
+    def from_snapshot(cls, snapshot_date = None, cell_km = HIKE_INDEX_CELL_KM):
+        """Returns a HikeIndex over a snapshot, by default the latest one.
+
+        Raises
+        ------
+        ValueError -- There is no snapshot for the date, or no snapshot at all.
+        """
+
+        if snapshot_date is None:
+            snapshot_dates = list_snapshot_dates()
+            if not snapshot_dates:
+                raise ValueError('No snapshot found in {0}'.format(RESULTS_PATH))
+            snapshot_date = snapshot_dates[-1]
+        return cls(load_snapshot_data(snapshot_date), cell_km)
+
+
+#*************************************************************************************
+# Method: haversine_km(Float, Float, ndarray, ndarray)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Returns the great-circle distances, in kilometers, from one point to many, with
+# every coordinate in radians.
+#*************************************************************************************
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Returns great-circle distances in kilometers between radian coordinates."""
+
+    a = (np.sin((latitudes - latitude) / 2) ** 2
+         + np.cos(latitude) * np.cos(latitudes) * np.sin((longitudes - longitude) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+#*************************************************************************************
+# Method: wrap_longitudes(Float, Float)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Splits a longitude range that crosses the antimeridian into ranges within -180 to
+# 180 degrees.
+#*************************************************************************************
+def wrap_longitudes(low, high):
+    """Returns a longitude range as a list of (low, high) ranges within -180..180."""
+
+    if high - low >= 360:
+        return [(-180.0, 180.0)]
+    if low < -180:
+        return [(low + 360, 180.0), (-180.0, high)]
+    if high > 180:
+        return [(low, 180.0), (-180.0, high - 360)]
+    return [(low, high)]
+
+
+#*************************************************************************************
+# Class: HikeTable
+#
+# Description
+# ------------------------------------------------------------------------------------
+# A compact, read-only table of a snapshot's hike data for processes that keep
+# snapshots in memory, such as a long-running API service. Every column is held in a
+# flat NumPy array instead of Python objects:
+#   - REGION and DIST_TYPE are dictionary-encoded: one small integer code per hike
+#     and, each distinct string once.
+#   - URL is split after its last '/': the prefixes, nearly all
+#     'https://www.wta.org/go-hiking/hikes/', are dictionary-encoded and, the slugs
+#     are stored as UTF-8 bytes with offsets. TITLE is stored the same way.
+#   - Numbers use the types of get_arrow_schema(): float32 distances, gains, highest
+#     points and ratings and, float64 coordinates. Counts use the smallest integer
+#     type that holds them, with -1 for a missing count, and report dates are days
+#     since 1970-01-01 as int32, with MISSING_DAY for a missing date.
+#
+# save() writes the arrays to a folder of .npy files and, load() maps them back with
+# np.load(mmap_mode = 'r'), so loading copies nothing and, every process that loads
+# the same folder shares one copy of it in the page cache. column(), row() and
+# to_dataframe() decode the values on demand, with the types of
+# apply_hike_data_schema(); float32 values are widened through their shortest
+# decimal form, so they read back as they were scraped. A missing TITLE or URL
+# reads back as None, as do empty strings. For vectorized queries, the arrays
+# themselves are in arrays, keyed by column.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# DataFrame       hike_data           Hike data, as text or typed values, with the
+#                                     HIKE_DATA_COLUMNS columns.
+#*************************************************************************************
+class HikeTable:
+    """A compact table of hike data in flat, memory-mappable NumPy arrays.
+
+    Arguments
+    ---------
+    1. hike_data {DataFrame} -- Hike data with the HIKE_DATA_COLUMNS columns.
+    """
+
+    # The columns of each encoding and, the NumPy type of each float column:
+    DICTIONARY_COLUMNS = ['REGION', 'DIST_TYPE']
+    STRING_COLUMNS = ['TITLE']
+    FLOAT_TYPES = {'DISTANCE': 'float32', 'GAIN': 'float32', 'HIGHEST': 'float32',
+                   'RATING': 'float32', 'LATITUDE': 'float64', 'LONGITUDE': 'float64'}
+    # The report date stored for a missing date and, the metadata file of a saved
+    # table:
+    MISSING_DAY = -2 ** 31
+    METADATA_FILE = 'hike_table.json'
+
+    def __init__(self, hike_data):
+        hike_data = apply_hike_data_schema(hike_data.reset_index(drop = True))
+        self.rows = len(hike_data)
+        self.arrays = {}
+        self.dictionaries = {}
+
+        for column in HIKE_DATA_COLUMNS:
+            values = hike_data[column]
+            if column in self.FLOAT_TYPES:
+                self.arrays[column] = values.to_numpy(dtype = self.FLOAT_TYPES[column],
+                                                      na_value = np.nan)
+            elif column in INTEGER_COLUMNS:
+                counts = values.to_numpy(dtype = 'int64', na_value = -1)
+                self.arrays[column] = counts.astype(np.promote_types(
+                    'int8', np.min_scalar_type(counts.max(initial = 0))))
+            elif column in DATE_COLUMNS:
+                days = values.to_numpy(dtype = 'datetime64[D]').astype('int64')
+                days[values.isna().to_numpy()] = self.MISSING_DAY
+                self.arrays[column] = days.astype('int32')
+            elif column in self.DICTIONARY_COLUMNS:
+                self._encode_dictionary(column, values.astype(object).where(values.notna(), None))
+            elif column in self.STRING_COLUMNS:
+                self._encode_strings(column, values.astype(object).where(values.notna(), None))
+            else:
+                urls = values.astype(object).where(values.notna(), None).tolist()
+                self._encode_dictionary(column + '.prefix',
+                                        [url[ : url.rfind('/') + 1] if url else None
+                                         for url in urls])
+                self._encode_strings(column, [url[url.rfind('/') + 1 : ] if url else None
+                                              for url in urls])
+
+    def _encode_dictionary(self, name, values):
+        """Stores the codes of values under name and, their distinct values in
+        dictionaries. Missing values have the code -1."""
+
+        categorical = pd.Categorical(values)
+        self.arrays[name] = np.asarray(categorical.codes)
+        self.dictionaries[name] = [str(value) for value in categorical.categories]
+
+    def _encode_strings(self, name, values):
+        """Stores strings as one array of UTF-8 bytes, name.data, and the offset of
+        each string in it, name.offsets."""
+
+        encoded = [value.encode('utf-8') if value else b'' for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype = 'int64')
+        np.cumsum([len(value) for value in encoded], out = offsets[1 : ])
+        self.arrays[name + '.offsets'] = offsets.astype(np.min_scalar_type(offsets[-1]))
+        self.arrays[name + '.data'] = np.frombuffer(b''.join(encoded), dtype = 'uint8')
+
+    def _decode_strings(self, name, positions):
+        """Returns the strings stored under name at the given positions."""
+
+        offsets = self.arrays[name + '.offsets']
+        data = self.arrays[name + '.data']
+        starts, stops = offsets[positions], offsets[np.asarray(positions) + 1]
+        return [bytes(data[start : stop]).decode('utf-8') if stop > start else None
+                for start, stop in zip(starts.tolist(), stops.tolist())]
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def nbytes(self):
+        """The number of bytes held in the table's arrays."""
+
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def column(self, column, positions = None):
+        """Returns the decoded values of a column.
+
+        Arguments
+        ---------
+        1. column {String} -- One of the HIKE_DATA_COLUMNS.
+        2. positions {ndarray} -- The row positions to decode, or None for all rows.
+
+        Raises
+        ------
+        KeyError -- The column is not one of the HIKE_DATA_COLUMNS.
+
+        Returns
+        -------
+        Series -- The values, typed as in apply_hike_data_schema().
+        """
+
+        if column not in HIKE_DATA_COLUMNS:
+            raise KeyError('{0} is not a hike data column'.format(column))
+        positions = np.arange(self.rows) if positions is None else np.asarray(positions)
+
+        if column in self.FLOAT_TYPES:
+            values = self.arrays[column][positions]
+            if values.dtype == 'float32':
+                # Widening through the shortest decimal form of each float32, so a
+                # distance of 123.3 reads back as 123.3 rather than 123.30000305:
+                values = values.astype(str).astype('float64')
+            return pd.Series(values, name = column, dtype = 'float64')
+        if column in INTEGER_COLUMNS:
+            counts = self.arrays[column][positions].astype('int64')
+            return pd.Series(pd.arrays.IntegerArray(counts, counts < 0), name = column)
+        if column in DATE_COLUMNS:
+            days = self.arrays[column][positions]
+            dates = days.astype('int64').astype('datetime64[D]')
+            dates[days == self.MISSING_DAY] = np.datetime64('NaT')
+            return pd.Series(dates.astype('datetime64[ns]'), name = column)
+        if column in self.DICTIONARY_COLUMNS:
+            return pd.Series(pd.Categorical.from_codes(self.arrays[column][positions],
+                                                       self.dictionaries[column]),
+                             name = column)
+        if column in self.STRING_COLUMNS:
+            return pd.Series(self._decode_strings(column, positions), name = column,
+                             dtype = 'string')
+
+        prefixes = self.dictionaries[column + '.prefix']
+        urls = [prefixes[code] + (slug or '') if code >= 0 else None
+                for code, slug in zip(self.arrays[column + '.prefix'][positions].tolist(),
+                                      self._decode_strings(column, positions))]
+        return pd.Series(urls, name = column, dtype = 'string')
+
+    def to_dataframe(self, positions = None):
+        """Returns the hike data of some or all rows as a typed DataFrame.
+
+        Arguments
+        ---------
+        1. positions {ndarray} -- The row positions to decode, or None for all rows.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        DataFrame -- The hike data, with the HIKE_DATA_COLUMNS columns.
+        """
+
+        return pd.DataFrame({column: self.column(column, positions)
+                             for column in HIKE_DATA_COLUMNS})
+
+    def row(self, position):
+        """Returns the hike at a row position as a dictionary keyed by column."""
+
+        hike = {}
+        for column, values in self.to_dataframe([position]).items():
+            value = values.iloc[0]
+            hike[column] = None if pd.isna(value) else getattr(value, 'item', lambda: value)()
+        return hike
+
+    def save(self, path):
+        """Writes the table to a folder of .npy files and, returns its path.
+
+        Arguments
+        ---------
+        1. path {String} -- The folder to write. Its previous contents are replaced.
+
+        Raises
+        ------
+        None
+
+        Returns
+        -------
+        String -- The path of the folder.
+        """
+
+        # Writing to a temporary folder first, so that a process mapping the folder
+        # never sees a partly written table:
+        partial_path = path + '.partial'
+        shutil.rmtree(partial_path, ignore_errors = True)
+        os.makedirs(partial_path)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(partial_path, name + '.npy'), array)
+        with open(os.path.join(partial_path, self.METADATA_FILE), 'w') as metadata_file:
+            json.dump({'rows': self.rows, 'arrays': sorted(self.arrays),
+                       'dictionaries': self.dictionaries}, metadata_file, indent = 2)
+
+        shutil.rmtree(path, ignore_errors = True)
+        os.replace(partial_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap_mode = 'r'):
+        """Returns a HikeTable saved by save(), with its arrays memory-mapped.
+
+        Arguments
+        ---------
+        1. path {String} -- The folder written by save().
+        2. mmap_mode {String} -- The np.load() memory-map mode, or None to read the
+           arrays into memory.
+
+        Raises
+        ------
+        FileNotFoundError -- The folder holds no saved table.
+
+        Returns
+        -------
+        HikeTable -- The table.
+        """
+
+        with open(os.path.join(path, cls.METADATA_FILE)) as metadata_file:
+            metadata = json.load(metadata_file)
+
+        table = cls.__new__(cls)
+        table.rows = metadata['rows']
+        table.dictionaries = metadata['dictionaries']
+        table.arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode = mmap_mode)
+                        for name in metadata['arrays']}
+        return table
+
+    @classmethod
+    def from_snapshot(cls, snapshot_date = None, mmap_mode = 'r'):
+        """Returns the HikeTable of a snapshot, by default the latest one. The table
+        saved by the 'table' snapshot writer is mapped when there is one; otherwise
+        the table is built from the snapshot's hike data.
+
+        Raises
+        ------
+        ValueError -- There is no snapshot for the date, or no snapshot at all.
+        """
+
+        if snapshot_date is None:
+            snapshot_dates = list_snapshot_dates()
+            if os.path.isdir(RESULTS_PATH):
+                snapshot_dates.extend(file_name[ : 10] for file_name in os.listdir(RESULTS_PATH)
+                                      if file_name.endswith('_wta_hike_table'))
+            if not snapshot_dates:
+                raise ValueError('No snapshot found in {0}'.format(RESULTS_PATH))
+            snapshot_date = max(snapshot_dates)
+
+        path = hike_table_path(snapshot_date)
+        if os.path.exists(os.path.join(path, cls.METADATA_FILE)):
+            return cls.load(path, mmap_mode)
+        return cls(load_snapshot_data(snapshot_date))
+
+
+#*************************************************************************************
+# Method: write_run_report(Date)
+#
+# Description
+# ------------------------------------------------------------------------------------
+# Writes everything recorded in METRICS, along with the state of each host in the
+# scheduler, the state store, response cache and redirect cache counters and, the
+# fetches avoided by deduplicating hike URLs and caching redirects, to a JSON run
+# report in RESULTS_PATH, for example 'Results/2021-04-25_run_report.json', or to the
+# given path.
+#
+#     RETurn
+#      Type                                Description
+# --------------  --------------------------------------------------------------------
+# String          The path of the run report.
+#
+# ------------------------------- Arguments ------------------------------------------
+#     Type               Name                         Description
+# --------------  ------------------  ------------------------------------------------
+# Date            snapshot_date       The date of the run's snapshot.
+#
+# String          path                The path of the run report, or None.
+#*************************************************************************************
+def write_run_report(snapshot_date, path = None):
+    """Writes the metrics recorded during a run to a JSON run report and, returns its
+    path.
+
+    Arguments
+    ---------
+    1. snapshot_date {Date} -- The date of the run's snapshot.
+    2. path {String} -- The path of the run report, or None.
+
+    Raises
+    ------
+    None
+
+    Returns
+    -------
+    String -- The path of the run report.
+    """
+
+    run_report = METRICS.report()
+    run_report['snapshot_date'] = str(snapshot_date)
+    run_report['scheduler'] = RATE_LIMITER.report()
+    if STATE_STORE is not None:
+        run_report['state_store'] = {'not_modified': STATE_STORE.not_modified,
+                                     'unchanged': STATE_STORE.unchanged,
+                                     'parsed': STATE_STORE.changed}
+    if RESPONSE_CACHE is not None:
+        run_report['response_cache'] = RESPONSE_CACHE.stats()
+    if REDIRECT_CACHE is not None:
+        run_report['redirect_cache'] = REDIRECT_CACHE.stats()
+    # The requests the frontier and redirect cache saved: hike URLs dropped as
+    # duplicates, each of which would have been fetched again, hike URLs listed under
+    # an old URL and replaced by their new one and, requests sent to a new URL
+    # instead of following a redirect again:
+    counters = run_report['counters']
+    run_report['fetches_avoided'] = {
+        'duplicate_hike_urls': counters.get('frontier.duplicates', 0),
+        'redirected_hike_urls': counters.get('frontier.redirected', 0),
+        'redirects': counters.get('redirects_avoided', 0)}
+
+    if path is None:
+        path = os.path.join(RESULTS_PATH, '{0}_run_report.json'.format(snapshot_date))
+    with open(path, 'w') as report_file:
+        json.dump(run_report, report_file, indent = 2)
+
+    return path